@@ -0,0 +1,64 @@
+# benchmarks/dataset.py
+"""
+Synthetic data for the benchmark suite.
+
+The organisation and leave histories come from hrms.seed (the generator behind
+'flask seed'); this adds the benchmark's admin login and records the dataset's volumes
+in 'bench_meta' so every results file says what it was measured against.
+
+All seeded users share one password (BENCH_PASSWORD) so the load test can log in as
+any of them.
+"""
+
+import time
+from datetime import datetime
+
+BENCH_PASSWORD = 'benchmark'
+ADMIN_USERNAME = 'bench_admin'
+
+
+def seed(db, employees=10000, years=3, seed=42, workers=1, leave_rate=1.0, batch_size=5000, log=print):
+    """
+    Writes the synthetic dataset into an (empty) database.
+
+    Args:
+        db: PyMongo database handle (use inside an app context so model helpers work).
+        employees (int): Number of employees (each with a login).
+        years (int): Years of leave history before today.
+        seed (int): Random seed; the same seed and volumes give the same data (dates are relative to today).
+        workers (int): Processes generating and inserting in parallel.
+        leave_rate (float): Multiplier on the amount of leave each employee takes.
+        batch_size (int): Documents per insert_many.
+
+    Returns:
+        dict: Volumes and timings, stored in 'bench_meta' for the results file.
+    """
+    from hrms import passwords
+    from hrms.seed import seed_database
+
+    started = time.perf_counter()
+
+    def progress(done, total, totals):
+        if done == total or done % max(1, total // 10) == 0:
+            log(f"  {done}/{total} chunks: {totals['employees']} employees, "
+                f"{totals['leave_requests']} leave requests")
+
+    totals = seed_database(employees=employees, years=years, seed=seed, workers=workers, batch_size=batch_size,
+                           leave_rate=leave_rate, password=BENCH_PASSWORD, progress=progress,
+                           force=True) # The suite only seeds an empty (or dropped) dedicated database
+    db.users.update_one(
+        {'username': ADMIN_USERNAME},
+        {'$setOnInsert': {'email': 'bench_admin@example.com', 'password_hash': passwords.hash_password(BENCH_PASSWORD),
+                          'role': 'admin', 'is_active': True}},
+        upsert=True
+    )
+    meta = {
+        'employees': totals['employees'], 'users': totals['users'] + 1, 'leave_requests': totals['leave_requests'],
+        'years': years, 'seed': seed, 'leave_rate': leave_rate, 'ledgers': totals['ledgers'],
+        'rollups': totals['rollups'], 'seeded_on': datetime.utcnow().isoformat(timespec='seconds'),
+        'seed_seconds': round(time.perf_counter() - started, 1),
+    }
+    db.bench_meta.replace_one({'_id': 'dataset'}, dict(meta, _id='dataset'), upsert=True)
+    log(f"Seeded {meta['leave_requests']} leave requests for {meta['employees']} employees "
+        f"in {meta['seed_seconds']}s: {meta['ledgers']} ledgers, {meta['rollups']} rollups.")
+    return meta
@@ -0,0 +1,205 @@
+# benchmarks/loadtest.py
+"""
+HTTP load test for comparing server setups (Flask dev server vs. gunicorn settings).
+
+Drives a running server with N concurrent logged-in clients for a fixed time and
+reports throughput and latency percentiles per server. Standard library only.
+
+Examples:
+    # Load an already running server
+    python benchmarks/loadtest.py --target gunicorn=http://127.0.0.1:8000 --username admin --password secret
+
+    # Start the dev server and gunicorn (with the current WEB_* settings) one after the
+    # other on local ports, load each the same way, and print a comparison table
+    python benchmarks/loadtest.py --compare --username admin --password secret --concurrency 32 --duration 30
+
+    # Compare gunicorn settings: any WEB_* variable can be varied per run
+    WEB_THREADS=1 python benchmarks/loadtest.py --compare --servers gunicorn ...
+    WEB_THREADS=8 python benchmarks/loadtest.py --compare --servers gunicorn ...
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = ['/dashboard', '/employees/', '/leave/history', '/leave/balances']
+
+# Commands that start each server on a given port (run from the repository root)
+SERVER_COMMANDS = {
+    'dev': lambda port: [sys.executable, '-m', 'flask', '--app', 'wsgi:app', 'run',
+                         '--port', str(port), '--no-reload', '--no-debugger', '--with-threads'],
+    'gunicorn': lambda port: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                              '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def login(base_url, username, password):
+    """Logs in once and returns the session cookies (empty if no credentials)."""
+    jar = http.cookiejar.CookieJar()
+    if username:
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+        opener.open(f'{base_url}/auth/login', data=data, timeout=30).read()
+    return list(jar)
+
+
+def make_client(cookies):
+    """Returns a urllib opener carrying its own copy of the session cookies."""
+    jar = http.cookiejar.CookieJar()
+    for cookie in cookies:
+        jar.set_cookie(cookie)
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+
+def run_load(base_url, paths, concurrency, duration, username=None, password=None, warmup=2.0):
+    """
+    Runs the load test against one server.
+
+    Each client thread loops over the paths until the duration is up. Latencies measured
+    during the warm-up period are discarded.
+
+    Returns:
+        dict: requests, errors, throughput (req/s) and latency percentiles (ms).
+    """
+    # One login shared by all clients, so the run isn't stopped by the login throttle
+    cookies = login(base_url, username, password)
+    clients = [make_client(cookies) for _ in range(concurrency)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(opener, offset):
+        local, local_errors = [], 0
+        i = offset
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= stop_at:
+                break
+            try:
+                with opener.open(base_url + paths[i % len(paths)], timeout=30) as resp:
+                    resp.read()
+                    ok = resp.status < 400
+            except Exception:
+                ok = False
+            t1 = time.perf_counter()
+            if t0 >= measure_from:
+                if ok:
+                    local.append(t1 - t0)
+                else:
+                    local_errors += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(c, n)) for n, c in enumerate(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput_rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p95_ms': round(percentile(ms, 95), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+        'max_ms': round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+def wait_for_port(port, timeout=30.0):
+    """Waits until something accepts connections on localhost:port."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+
+def start_server(name, port):
+    """Starts a server from SERVER_COMMANDS and waits for it to listen."""
+    proc = subprocess.Popen(SERVER_COMMANDS[name](port), cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port(port):
+        proc.terminate()
+        raise RuntimeError(f"Server '{name}' did not start on port {port}.")
+    return proc
+
+
+def print_table(results):
+    header = f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'requests':>10}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<12}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['max_ms']:>10}{r['requests']:>10}{r['errors']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', default=[], metavar='NAME=URL',
+                        help="Already running server to load (repeatable).")
+    parser.add_argument('--compare', action='store_true', help="Start and load each of --servers in turn.")
+    parser.add_argument('--servers', default='dev,gunicorn', help="Servers started by --compare (dev, gunicorn).")
+    parser.add_argument('--port', type=int, default=8765, help="Local port used by --compare.")
+    parser.add_argument('--paths', default=','.join(DEFAULT_PATHS), help="Comma-separated paths to request.")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients.")
+    parser.add_argument('--duration', type=float, default=20.0, help="Measured seconds per server.")
+    parser.add_argument('--username', help="Log in as this user first (most pages need a session).")
+    parser.add_argument('--password')
+    parser.add_argument('--output', help="Also write the results as JSON to this file.")
+    args = parser.parse_args(argv)
+
+    paths = [p.strip() for p in args.paths.split(',') if p.strip()]
+    results = {}
+    for spec in args.target:
+        name, _, url = spec.partition('=')
+        results[name] = run_load(url.rstrip('/'), paths, args.concurrency, args.duration, args.username, args.password)
+    if args.compare:
+        for name in [s.strip() for s in args.servers.split(',') if s.strip()]:
+            proc = start_server(name, args.port)
+            try:
+                results[name] = run_load(f'http://127.0.0.1:{args.port}', paths, args.concurrency, args.duration,
+                                         args.username, args.password)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=60)
+    if not results:
+        parser.error("Nothing to load: pass --target and/or --compare.")
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            settings = {k: v for k, v in vars(args).items() if k != 'password'}
+            json.dump({'settings': settings, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
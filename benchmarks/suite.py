@@ -0,0 +1,403 @@
+# benchmarks/suite.py
+"""
+Performance benchmark suite.
+
+Seeds a dedicated MongoDB database with synthetic data at a chosen scale, then times the
+real model methods and Flask routes (through the test client, in this process) for a set
+of scenarios, and optionally loads a running server over HTTP with benchmarks/loadtest.py.
+Each scenario reports p50/p95/p99 latency, throughput and memory; results are saved as
+JSON so two runs (before/after a change) can be compared.
+
+Examples:
+    # 1. Seed (once per scale); refuses to touch a non-empty database unless --drop is given
+    #    (about 5 leave requests per employee-year; 200k employees x 5 years is ~5M requests)
+    python benchmarks/suite.py seed --employees 200000 --years 5 --workers 8 --drop
+
+    # 2. Run every scenario and save the results
+    python benchmarks/suite.py run --iterations 200 --output before.json
+
+    #    ...optionally also drive a running server (same database) over HTTP
+    MONGO_DBNAME=hrms_bench gunicorn -c gunicorn.conf.py wsgi:app &
+    python benchmarks/suite.py run --http http://127.0.0.1:8000 --output before.json
+
+    # 3. Compare two result files
+    python benchmarks/suite.py compare before.json after.json
+
+The database is hrms_bench unless --db is given; every other setting (host, credentials,
+pool, hasher...) comes from the environment / .env as for the app.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import percentile, run_load # noqa: E402
+from dataset import ADMIN_USERNAME, BENCH_PASSWORD, seed # noqa: E402
+
+DEFAULT_DB = 'hrms_bench'
+
+
+def create_bench_app(dbname):
+    """Creates the app against the benchmark database instead of MONGO_DBNAME."""
+    os.environ['MONGO_DBNAME'] = dbname # For the servers started by loadtest.py
+    from hrms import create_app
+    from hrms.config import Config
+    Config.MONGO_DBNAME = dbname # Config has already read the environment if hrms was imported
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    return app
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / 2**20 if sys.platform == 'darwin' else peak / 2**10, 1)
+
+
+# --- Fixtures: sampled users/keys each scenario picks from ---
+
+class Fixtures:
+    """Random samples of seeded ids and keys, so iterations don't all hit the same document."""
+
+    def __init__(self, db, rng, size=200):
+        from hrms.models.employee import Employee
+        from hrms.models.pagination import encode_cursor
+        self.rng = rng
+        sample = lambda collection, query, n: [doc for doc in collection.aggregate(
+            [{'$match': query}, {'$sample': {'size': n}}])]
+        self.employees = sample(db.users, {'role': 'employee'}, size)
+        self.managers = sample(db.users, {'role': 'manager'}, size)
+        self.admin = db.users.find_one({'role': 'admin'})
+        if not self.employees or not self.managers or not self.admin:
+            raise SystemExit("The benchmark database is not seeded; run 'suite.py seed' first.")
+        self.departments = db.employees.distinct('department')
+        names = sample(db.employees, {}, size)
+        self.search_terms = [doc['last_name'][:3].lower() for doc in names] + \
+                            [doc['employee_code'][:7].lower() for doc in names]
+        # Cursor to the middle of the employee list, to time a deep page
+        total = db.employees.estimated_document_count()
+        middle = next(db.employees.find({}, {key: 1 for key, _ in Employee.LIST_SORT})
+                      .sort(Employee.LIST_SORT).skip(total // 2).limit(1), None)
+        self.deep_cursor = encode_cursor(middle, [key for key, _ in Employee.LIST_SORT]) if middle else None
+        # The last 12 months as 'YYYY-MM'
+        today = datetime.utcnow()
+        self.months = []
+        for k in range(12):
+            year, month = divmod(today.year * 12 + today.month - 1 - k, 12)
+            self.months.append(f'{year}-{month + 1:02d}')
+        self.year = today.year
+
+    def pick(self, values):
+        return self.rng.choice(values)
+
+
+def model_scenarios(fx, app):
+    """name -> callable running one model-level operation."""
+    from hrms.models.employee import Employee
+    from hrms.models.leave import LeaveRequest
+    from hrms.models.leave_balance import LeaveBalance
+    from hrms.models.absence_report import AbsenceReport
+
+    def month_args():
+        year, month = fx.pick(fx.months).split('-')
+        return int(year), int(month)
+
+    return {
+        'model.employee_page_first': lambda: Employee.find_page(page_size=25),
+        'model.employee_page_deep': lambda: Employee.find_page(page_size=25, after=fx.deep_cursor),
+        'model.employee_search': lambda: Employee.search(fx.pick(fx.search_terms)),
+        'model.leave_history_page': lambda: LeaveRequest.find_history_page(fx.pick(fx.employees)['_id'], page_size=25),
+        'model.leave_history_filtered': lambda: LeaveRequest.find_history_page(
+            fx.pick(fx.employees)['_id'], status='Approved', date_from=datetime(fx.year - 1, 1, 1), page_size=25),
+        'model.pending_approvals_manager': lambda: LeaveRequest.find_pending_approvals_enriched(fx.pick(fx.managers)['_id']),
+        'model.pending_approvals_all': lambda: LeaveRequest.find_pending_approvals_enriched(),
+        'model.calendar_department': lambda: LeaveRequest.month_view('department', fx.pick(fx.departments), *month_args()),
+        'model.calendar_team': lambda: LeaveRequest.month_view('team', str(fx.pick(fx.managers)['_id']), *month_args()),
+        'model.leave_balances': lambda: LeaveBalance.summarize(fx.pick(fx.employees)['_id'], fx.year,
+                                                               app.config['LEAVE_ENTITLEMENTS']),
+        'model.absence_report': lambda: AbsenceReport.year_report(fx.year, None, app.config['DEFAULT_HOLIDAY_REGION']),
+    }
+
+
+def route_scenarios(fx, app):
+    """name -> callable issuing one request through the test client (as a sampled user of the right role)."""
+    clients = {}
+
+    def client_for(user):
+        # Logged in by writing the Flask-Login session directly: no password hashing in the timings
+        key = str(user['_id'])
+        if key not in clients:
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = key
+                session['_fresh'] = True
+            clients[key] = client
+        return clients[key]
+
+    def get(user, path):
+        def run():
+            response = client_for(user() if callable(user) else user).get(path() if callable(path) else path)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{response.status_code} from {response.request.path}")
+            response.get_data()
+        return run
+
+    employee = lambda: fx.pick(fx.employees)
+    manager = lambda: fx.pick(fx.managers)
+    return {
+        'route.dashboard': get(employee, '/dashboard'),
+        'route.list_employees': get(fx.admin, '/employees/'),
+        'route.list_employees_deep': get(fx.admin, f'/employees/?after={fx.deep_cursor}'),
+        'route.employee_search': get(fx.admin, lambda: f'/employees/search?q={fx.pick(fx.search_terms)}'),
+        'route.view_history': get(employee, '/leave/history'),
+        'route.view_history_filtered': get(employee, f'/leave/history?status=Approved&from={fx.year - 1}-01-01'),
+        'route.view_approvals_manager': get(manager, '/leave/approvals'),
+        'route.view_approvals_admin': get(fx.admin, '/leave/approvals'),
+        'route.leave_balances': get(employee, '/leave/balances'),
+        'route.calendar_department': get(fx.admin, lambda: f'/leave/calendar/data?scope=department'
+                                                           f'&key={fx.pick(fx.departments)}&month={fx.pick(fx.months)}'),
+        'route.absence_report': get(fx.admin, f'/leave/reports/absence/data?year={fx.year}'),
+    }
+
+
+def clear_caches():
+    """Empties the per-process caches so every iteration measures the database path."""
+    from hrms.models.user import User
+    from hrms.models.employee import Employee
+    from hrms.models.leave import LeaveRequest
+    User.session_cache.clear()
+    Employee.search_cache.clear()
+    LeaveRequest.calendar_cache.clear()
+
+
+def run_scenario(func, iterations, warmup, cold, memory_iterations):
+    """
+    Times one scenario.
+
+    Returns:
+        dict: iterations, errors, throughput (ops/s, serial), latency percentiles (ms) and memory.
+    """
+    for _ in range(warmup):
+        if cold:
+            clear_caches()
+        func()
+
+    latencies, errors, busy = [], 0, 0.0
+    rss_before = rss_mb()
+    for _ in range(iterations):
+        if cold:
+            clear_caches()
+        t0 = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+            continue
+        elapsed = time.perf_counter() - t0
+        busy += elapsed
+        latencies.append(elapsed)
+    rss_after = rss_mb()
+
+    # Python allocation peak of a single operation, measured separately (tracemalloc slows everything down)
+    peak = 0
+    for _ in range(memory_iterations):
+        if cold:
+            clear_caches()
+        tracemalloc.start()
+        try:
+            func()
+        except Exception:
+            pass
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        'iterations': len(latencies),
+        'errors': errors,
+        'throughput_ops': round(len(latencies) / busy, 1) if busy else 0.0,
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(ms[-1], 3) if ms else 0.0,
+        'peak_alloc_kb': round(peak / 1024, 1),
+        'rss_mb': rss_after,
+        'rss_growth_mb': round(rss_after - rss_before, 1),
+    }
+
+
+def environment(db):
+    """What the numbers depend on besides the code: versions, hardware, dataset."""
+    import pymongo
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        server = db.client.server_info().get('version')
+    except Exception:
+        server = None
+    dataset = db.bench_meta.find_one({'_id': 'dataset'}, {'_id': 0})
+    return {
+        'git_commit': commit, 'python': platform.python_version(), 'pymongo': pymongo.version,
+        'mongodb': server, 'platform': platform.platform(), 'cpus': os.cpu_count(), 'dataset': dataset,
+    }
+
+
+def print_results(results):
+    header = f"{'scenario':<34}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'alloc KB':>10}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<34}{r['throughput_ops']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['peak_alloc_kb']:>10}{r['errors']:>8}")
+
+
+def cmd_seed(args):
+    from hrms import get_db
+    app = create_bench_app(args.db)
+    with app.app_context():
+        db = get_db()
+        if args.drop:
+            db.client.drop_database(db.name)
+            # Recreate collections and indexes before loading, as in production
+            from hrms import initialize_database
+            initialize_database(db, force=True)
+        elif db.users.estimated_document_count() or db.leave_requests.estimated_document_count():
+            raise SystemExit(f"Database '{db.name}' is not empty; pass --drop to replace its contents.")
+        seed(db, employees=args.employees, years=args.years, seed=args.seed, workers=args.workers,
+             leave_rate=args.leave_rate, batch_size=args.batch_size)
+
+
+def cmd_run(args):
+    from hrms import get_db
+    app = create_bench_app(args.db)
+    rng = random.Random(args.seed)
+    results = {}
+    with app.app_context():
+        db = get_db()
+        fx = Fixtures(db, rng)
+        scenarios = {}
+        if args.kind in ('all', 'model'):
+            scenarios.update(model_scenarios(fx, app))
+        if args.kind in ('all', 'route'):
+            scenarios.update(route_scenarios(fx, app))
+        if args.scenarios:
+            wanted = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+            scenarios = {name: func for name, func in scenarios.items() if any(w in name for w in wanted)}
+        for name, func in scenarios.items():
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = run_scenario(func, args.iterations, args.warmup, not args.warm_caches, args.memory_iterations)
+        env = environment(db)
+
+    http = None
+    if args.http:
+        paths = [p.strip() for p in args.http_paths.split(',') if p.strip()]
+        print(f"Loading {args.http}...", file=sys.stderr)
+        http = run_load(args.http.rstrip('/'), paths, args.concurrency, args.duration,
+                        args.username or ADMIN_USERNAME, args.password or BENCH_PASSWORD)
+
+    print_results(results)
+    if http:
+        print(f"\nHTTP {args.http}: {http['throughput_rps']} req/s, p50 {http['p50_ms']} ms, "
+              f"p95 {http['p95_ms']} ms, p99 {http['p99_ms']} ms, {http['errors']} errors")
+    if args.output:
+        settings = {k: v for k, v in vars(args).items() if k not in ('password', 'func')}
+        with open(args.output, 'w') as f:
+            json.dump({'run_on': datetime.utcnow().isoformat(timespec='seconds'), 'settings': settings,
+                       'environment': env, 'scenarios': results, 'http': http}, f, indent=2, default=str)
+        print(f"\nSaved results to {args.output}", file=sys.stderr)
+
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    for label, run in (('baseline', baseline), ('candidate', candidate)):
+        env = run.get('environment', {})
+        print(f"{label}: {run.get('run_on')} commit {env.get('git_commit')} dataset {env.get('dataset')}")
+    header = f"{'scenario':<34}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'ops/s':>18}"
+    print(header)
+    print('-' * len(header))
+
+    def cell(old, new):
+        change = f"{(new - old) / old * 100:+.0f}%" if old else 'n/a'
+        return f"{new:>10} {change:>7}"
+
+    for name, new in candidate['scenarios'].items():
+        old = baseline['scenarios'].get(name)
+        if old is None:
+            continue
+        print(f"{name:<34}{cell(old['p50_ms'], new['p50_ms'])}{cell(old['p95_ms'], new['p95_ms'])}"
+              f"{cell(old['p99_ms'], new['p99_ms'])}{cell(old['throughput_ops'], new['throughput_ops'])}")
+    if baseline.get('http') and candidate.get('http'):
+        old, new = baseline['http'], candidate['http']
+        print(f"{'http':<34}{cell(old['p50_ms'], new['p50_ms'])}{cell(old['p95_ms'], new['p95_ms'])}"
+              f"{cell(old['p99_ms'], new['p99_ms'])}{cell(old['throughput_rps'], new['throughput_rps'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = sub.add_parser('seed', help="Fill the benchmark database with synthetic data.")
+    seed_parser.add_argument('--db', default=DEFAULT_DB)
+    seed_parser.add_argument('--employees', type=int, default=10000)
+    seed_parser.add_argument('--years', type=int, default=3, help="Years of leave history.")
+    seed_parser.add_argument('--seed', type=int, default=42)
+    seed_parser.add_argument('--leave-rate', type=float, default=1.0, help="Multiplier on the amount of leave.")
+    seed_parser.add_argument('--workers', type=int, default=1, help="Worker processes inserting in parallel.")
+    seed_parser.add_argument('--batch-size', type=int, default=5000)
+    seed_parser.add_argument('--drop', action='store_true', help="Drop the database first.")
+    seed_parser.set_defaults(func=cmd_seed)
+
+    run_parser = sub.add_parser('run', help="Run the scenarios and report latency, throughput and memory.")
+    run_parser.add_argument('--db', default=DEFAULT_DB)
+    run_parser.add_argument('--kind', choices=['all', 'model', 'route'], default='all')
+    run_parser.add_argument('--scenarios', help="Comma-separated substrings of scenario names to run.")
+    run_parser.add_argument('--iterations', type=int, default=100)
+    run_parser.add_argument('--warmup', type=int, default=10)
+    run_parser.add_argument('--memory-iterations', type=int, default=3)
+    run_parser.add_argument('--warm-caches', action='store_true',
+                            help="Keep the in-process caches between iterations (default: clear them).")
+    run_parser.add_argument('--seed', type=int, default=1, help="Seed for picking users/keys per iteration.")
+    run_parser.add_argument('--http', metavar='URL', help="Also load this running server with loadtest.py.")
+    run_parser.add_argument('--http-paths', default='/dashboard,/employees/,/leave/history,/leave/approvals')
+    run_parser.add_argument('--concurrency', type=int, default=16)
+    run_parser.add_argument('--duration', type=float, default=20.0)
+    run_parser.add_argument('--username', help=f"HTTP login (default {ADMIN_USERNAME}).")
+    run_parser.add_argument('--password')
+    run_parser.add_argument('--output', help="Write the results as JSON to this file.")
+    run_parser.set_defaults(func=cmd_run)
+
+    compare_parser = sub.add_parser('compare', help="Compare two result files.")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# gunicorn.conf.py
+# Production server settings for: gunicorn -c gunicorn.conf.py wsgi:app
+# Every value comes from hrms/config.py (and so can be set through the environment / .env);
+# see the WEB_* settings there for the defaults and how to size them.
+
+from hrms.config import get_config
+
+_config = get_config()
+
+bind = _config.WEB_BIND
+
+# Requests spend most of their time waiting on MongoDB, which releases the GIL, so each
+# process serves several requests at once on threads. One process per core keeps the
+# CPU-bound parts (template rendering, password hashing) from contending for one GIL.
+worker_class = 'gthread'
+workers = _config.WEB_WORKERS
+threads = _config.WEB_THREADS
+
+keepalive = _config.WEB_KEEPALIVE
+timeout = _config.WEB_TIMEOUT
+graceful_timeout = _config.WEB_GRACEFUL_TIMEOUT
+
+# Recycle workers periodically to bound memory growth of the per-process caches
+max_requests = _config.WEB_MAX_REQUESTS
+max_requests_jitter = _config.WEB_MAX_REQUESTS_JITTER
+
+# Import the app once in the master so workers start quickly. create_app closes its startup
+# MongoClient and each worker opens its own on first use (see hrms.get_db).
+preload_app = _config.WEB_PRELOAD
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} started ({threads} threads).")
+
+
+def worker_exit(server, worker):
+    # Close this worker's MongoDB connections cleanly on shutdown/recycling
+    from hrms import close_db
+    close_db()
@@ -1,7 +1,11 @@
 # hrms/__init__.py
 
 import os
+import json
+import atexit
+import hashlib
 import datetime
+import threading
 import pymongo # Import base pymongo for index types
 from pymongo import MongoClient
 from pymongo.errors import CollectionInvalid, ConnectionFailure, OperationFailure # Import specific errors
@@ -10,13 +14,7 @@ from flask_login import LoginManager
 from .config import get_config # Import configuration helper
 import logging # Import Python's logging module
 
-# --- Configure logging ---
-# Configures basic logging to output INFO level messages and above
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S' # Optional: Customize date format
-)
+# Logging is configured from Config at the start of create_app (see hrms/logs.py)
 # Get a logger specifically for this module (__init__.py)
 log = logging.getLogger(__name__)
 
@@ -26,162 +24,331 @@ login_manager.login_view = 'auth.login' # Route name for login page
 login_manager.login_message_category = 'info' # Bootstrap category for flash message
 
 # --- Global Variables for Database ---
-# These will be assigned within create_app
+# The client is created lazily, once per process, by get_db(). A MongoClient must not be
+# used across fork() (its pooled sockets and monitor threads belong to the parent), so a
+# process that finds a client created under another PID - e.g. a worker forked from a
+# preloading WSGI master - opens its own.
 mongo_client = None
 db = None
+_client_pid = None # PID of the process that created mongo_client
+_client_settings = None # (MongoClient kwargs, database name), set by create_app via configure_db
+_client_lock = threading.Lock()
+
+
+def configure_db(connection_args, dbname):
+    """Stores the connection settings used by get_db() to (re)connect in each process."""
+    global _client_settings
+    _client_settings = (connection_args, dbname)
+
+
+def _connect():
+    """Creates this process's MongoClient and database handle (no-op if it already has one)."""
+    global mongo_client, db, _client_pid
+    with _client_lock:
+        if db is not None and _client_pid == os.getpid():
+            return
+        if mongo_client is not None:
+            # Inherited from the parent process: leave it alone (closing it here would
+            # act on the parent's connections) and open our own
+            log.info(f"Process {os.getpid()} inherited a MongoClient from process {_client_pid}; opening a new one.")
+        connection_args, dbname = _client_settings
+        mongo_client = MongoClient(**connection_args)
+        db = mongo_client[dbname]
+        _client_pid = os.getpid()
+        log.debug(f"Process {_client_pid} opened a MongoDB client for database '{dbname}'.")
+
 
 # --- Function to get the database instance ---
 # Ensures other modules can safely get the db handle after initialization
 def get_db():
-    """Returns the MongoDB database instance."""
-    if db is None:
-        log.error("get_db() called before database was initialized.")
-        raise RuntimeError("Database not initialized. Ensure create_app() was called and DB connection succeeded.")
+    """Returns the MongoDB database instance of the current process, connecting on first use."""
+    if db is None or _client_pid != os.getpid():
+        if _client_settings is None:
+            log.error("get_db() called before database was initialized.")
+            raise RuntimeError("Database not initialized. Ensure create_app() was called and DB connection succeeded.")
+        _connect()
     return db
 
+
+def close_db():
+    """
+    Closes the current process's MongoDB client (called at interpreter exit and by WSGI
+    server shutdown hooks). The next get_db() call reconnects.
+    """
+    global mongo_client, db, _client_pid
+    with _client_lock:
+        if mongo_client is not None and _client_pid == os.getpid():
+            mongo_client.close()
+            log.debug(f"Process {_client_pid} closed its MongoDB client.")
+        mongo_client = None
+        db = None
+        _client_pid = None
+
+
+atexit.register(close_db)
+
+# --- Build MongoClient keyword arguments from configuration ---
+def mongo_client_options(app_config):
+    """
+    Builds the MongoClient keyword arguments (host, credentials, pool and driver options)
+    from a Config object. Options left as None use the driver's defaults.
+    """
+    options = {
+        'host': app_config.MONGO_HOST,
+        'port': app_config.MONGO_PORT,
+        'serverSelectionTimeoutMS': app_config.MONGO_SERVER_SELECTION_TIMEOUT_MS, # Timeout for finding suitable server
+        'maxPoolSize': app_config.MONGO_MAX_POOL_SIZE,
+        'minPoolSize': app_config.MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': app_config.MONGO_MAX_IDLE_TIME_MS,
+        'waitQueueTimeoutMS': app_config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        'connectTimeoutMS': app_config.MONGO_CONNECT_TIMEOUT_MS,
+        'socketTimeoutMS': app_config.MONGO_SOCKET_TIMEOUT_MS,
+        'readPreference': app_config.MONGO_READ_PREFERENCE,
+        'appname': app_config.MONGO_APPNAME,
+        # Add other options like replicaSet, tls, etc., from config if needed
+        # 'tls': app_config.MONGO_TLS,
+        # 'replicaSet': app_config.MONGO_REPLICASET,
+    }
+    if app_config.MONGO_COMPRESSORS:
+        options['compressors'] = app_config.MONGO_COMPRESSORS
+    if app_config.MONGO_WRITE_CONCERN:
+        w = app_config.MONGO_WRITE_CONCERN
+        options['w'] = int(w) if w.isdigit() else w
+    if app_config.MONGO_WRITE_CONCERN_JOURNAL:
+        options['journal'] = app_config.MONGO_WRITE_CONCERN_JOURNAL.lower() in ('true', '1', 't')
+    listeners = []
+    if app_config.MONGO_POOL_METRICS:
+        from .monitoring import pool_metrics
+        listeners.append(pool_metrics)
+    if app_config.MONGO_COMMAND_METRICS:
+        from .monitoring import command_metrics
+        listeners.append(command_metrics)
+    if listeners:
+        options['event_listeners'] = listeners
+    # Add authentication credentials if provided
+    if app_config.MONGO_USERNAME and app_config.MONGO_PASSWORD:
+        options.update({
+            'username': app_config.MONGO_USERNAME,
+            'password': app_config.MONGO_PASSWORD,
+            'authSource': app_config.MONGO_AUTHSOURCE,
+            'authMechanism': 'SCRAM-SHA-256' # Default mechanism, adjust if necessary
+        })
+    return {key: value for key, value in options.items() if value is not None}
+
+
+# --- Database schema (collections and indexes) ---
+# Required collections and their essential indexes. Any change here changes SCHEMA_VERSION,
+# which makes the next initialize_database() run apply it.
+REQUIRED_COLLECTIONS = {
+    # Collection Name: List of index definitions
+    "users": [
+        # Each index definition is a tuple: ( (key_spec), {options} )
+        (("username", pymongo.ASCENDING), {"unique": True, "background": True, "name": "username_uniq_idx"}),
+        (("email", pymongo.ASCENDING), {"unique": True, "background": True, "name": "email_uniq_idx"}),
+    ],
+    "employees": [
+        (("employee_code", pymongo.ASCENDING), {"unique": True, "sparse": True, "background": True, "name": "emp_code_uniq_idx"}),
+        (("email", pymongo.ASCENDING), {"unique": True, "sparse": True, "background": True, "name": "emp_email_uniq_idx"}),
+        (("department", pymongo.ASCENDING), {"background": True, "name": "emp_dept_idx"}),
+        # Link from an employee record to its login account (used to enrich leave requests)
+        (("user_id", pymongo.ASCENDING), {"sparse": True, "background": True, "name": "emp_userid_idx"}),
+        # Compound definitions use a list of (field, direction) tuples.
+        # Serves the keyset-paginated employee list (sort + range on the same keys).
+        ([("last_name", pymongo.ASCENDING), ("first_name", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+         {"background": True, "name": "emp_name_keyset_idx"}),
+        # Typeahead search: anchored prefix lookups on normalized keys (multikey index)...
+        (("search_keys", pymongo.ASCENDING), {"background": True, "name": "emp_search_keys_idx"}),
+        # ...with a text index as the fallback for whole-word matches anywhere in a field
+        ([("first_name", pymongo.TEXT), ("last_name", pymongo.TEXT), ("email", pymongo.TEXT),
+          ("employee_code", pymongo.TEXT), ("department", pymongo.TEXT)],
+         {"background": True, "name": "emp_text_idx", "default_language": "none",
+          "weights": {"first_name": 5, "last_name": 5, "employee_code": 5, "email": 3, "department": 1}}),
+    ],
+    "leave_requests": [
+        (("user_id", pymongo.ASCENDING), {"background": True, "name": "leave_userid_idx"}),
+        (("status", pymongo.ASCENDING), {"background": True, "name": "leave_status_idx"}),
+        (("start_date", pymongo.DESCENDING), {"background": True, "name": "leave_startdate_idx"}),
+        # Per-manager approval queue: equality on status + approver, range/sort on requested_on
+        ([("status", pymongo.ASCENDING), ("approver_id", pymongo.ASCENDING), ("requested_on", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_status_approver_requested_idx"}),
+        # Company-wide (HR/admin) approval queue, oldest first
+        ([("status", pymongo.ASCENDING), ("requested_on", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_status_requested_idx"}),
+        # Leave history: equality on user, sort/keyset range on (requested_on, _id), and the
+        # optional filter fields stored in the same keys so non-matching entries are skipped
+        # without fetching documents
+        ([("user_id", pymongo.ASCENDING), ("requested_on", pymongo.DESCENDING), ("_id", pymongo.DESCENDING),
+          ("status", pymongo.ASCENDING), ("leave_type", pymongo.ASCENDING), ("start_date", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_user_history_idx"}),
+        # Absence rollup refreshes: approved leave overlapping the refreshed months
+        ([("status", pymongo.ASCENDING), ("start_date", pymongo.ASCENDING), ("end_date", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_status_start_end_idx"}),
+        # "Who's out" calendars: equality on department/team, bounded range on start_date,
+        # end_date checked from the index keys without fetching non-overlapping documents
+        ([("department", pymongo.ASCENDING), ("start_date", pymongo.ASCENDING), ("end_date", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_dept_start_end_idx"}),
+        ([("approver_id", pymongo.ASCENDING), ("start_date", pymongo.ASCENDING), ("end_date", pymongo.ASCENDING)],
+         {"background": True, "name": "leave_team_start_end_idx"}),
+    ],
+    "absence_rollups": [
+        # Report reads: one year's months, optionally for one department
+        ([("month", pymongo.ASCENDING), ("department", pymongo.ASCENDING)],
+         {"background": True, "name": "rollup_month_dept_idx"}),
+    ],
+    "login_throttle": [
+        # Shared login throttle windows (LOGIN_THROTTLE_BACKEND='mongo') expire by themselves
+        (("expires_at", pymongo.ASCENDING), {"expireAfterSeconds": 0, "name": "throttle_expires_ttl_idx"}),
+    ],
+    "leave_balances": [
+        # One ledger per user, year and leave type
+        ([("user_id", pymongo.ASCENDING), ("year", pymongo.ASCENDING), ("leave_type", pymongo.ASCENDING)],
+         {"unique": True, "background": True, "name": "balance_user_year_type_uniq_idx"}),
+    ],
+    "holidays": [
+        # A region's calendar is loaded with one query on region; a date is a holiday once per region
+        ([("region", pymongo.ASCENDING), ("date", pymongo.ASCENDING)],
+         {"unique": True, "background": True, "name": "holiday_region_date_uniq_idx"}),
+    ],
+    # Add definitions for other collections as needed:
+    # "departments": [ ... ],
+    # "attendance_records": [ ... ],
+}
+
+# Fingerprint of REQUIRED_COLLECTIONS, stored in the 'schema_meta' collection once applied
+SCHEMA_VERSION = hashlib.sha1(json.dumps(REQUIRED_COLLECTIONS, sort_keys=True, default=str).encode()).hexdigest()[:12]
+SCHEMA_MARKER_ID = 'schema'
+
+
+def schema_is_current(db_instance):
+    """True if the database's schema marker matches SCHEMA_VERSION (one find_one on '_id')."""
+    marker = db_instance.schema_meta.find_one({'_id': SCHEMA_MARKER_ID}, {'version': 1})
+    return bool(marker) and marker.get('version') == SCHEMA_VERSION
+
+
 # --- Helper function for Database Initialization ---
-def initialize_database(db_instance):
+def initialize_database(db_instance, force=False):
     """
     Ensures required collections and basic indexes exist in the database.
     This function is idempotent - safe to run multiple times.
+
+    If the schema marker already matches SCHEMA_VERSION the whole check is skipped (one
+    query instead of listCollections + listIndexes per collection), unless force is True.
+    Missing indexes of a collection are created with a single createIndexes command.
+
+    Returns:
+        bool: True if the schema is (now) current, False if any step failed.
     """
-    # Define required collections and their essential indexes
-    required_collections = {
-        # Collection Name: List of index definitions
-        "users": [
-            # Each index definition is a tuple: ( (key_spec), {options} )
-            (("username", pymongo.ASCENDING), {"unique": True, "background": True, "name": "username_uniq_idx"}),
-            (("email", pymongo.ASCENDING), {"unique": True, "background": True, "name": "email_uniq_idx"}),
-        ],
-        "employees": [
-            (("employee_code", pymongo.ASCENDING), {"unique": True, "sparse": True, "background": True, "name": "emp_code_uniq_idx"}),
-            (("email", pymongo.ASCENDING), {"unique": True, "sparse": True, "background": True, "name": "emp_email_uniq_idx"}),
-            (("department", pymongo.ASCENDING), {"background": True, "name": "emp_dept_idx"}),
-        ],
-        "leave_requests": [
-            (("user_id", pymongo.ASCENDING), {"background": True, "name": "leave_userid_idx"}),
-            (("status", pymongo.ASCENDING), {"background": True, "name": "leave_status_idx"}),
-            (("start_date", pymongo.DESCENDING), {"background": True, "name": "leave_startdate_idx"}),
-        ],
-        # Add definitions for other collections as needed:
-        # "departments": [ ... ],
-        # "attendance_records": [ ... ],
-    }
+    if not force:
+        try:
+            if schema_is_current(db_instance):
+                log.info(f"Database schema is current (version {SCHEMA_VERSION}); skipping initialization.")
+                return True
+        except OperationFailure as e:
+            log.warning(f"Could not read the schema marker ({e.details}); running the full schema check.")
 
-    log.info(f"Checking database '{db_instance.name}' for required collections and indexes...")
+    log.info(f"Checking database '{db_instance.name}' for required collections and indexes (schema version {SCHEMA_VERSION})...")
     try:
         # Get list of collections actually present in the database
-        existing_collections = db_instance.list_collection_names()
-        log.info(f"Existing collections found: {existing_collections}")
+        existing_collections = set(db_instance.list_collection_names())
+        log.debug(f"Existing collections found: {sorted(existing_collections)}")
     except OperationFailure as e:
         # This likely means the user doesn't even have permission to list collections
         log.error(f"PERMISSION ERROR listing collections in '{db_instance.name}': {e.details}")
         log.error("Please check MongoDB user permissions for 'listCollections'. Initialization cannot proceed.")
-        return # Stop initialization
+        return False # Stop initialization
     except Exception as e:
         log.error(f"Unexpected error listing collections in '{db_instance.name}': {e}", exc_info=True)
-        return # Stop initialization
+        return False # Stop initialization
 
+    ok = True
+    created_collections = 0
+    created_indexes = 0
     # Iterate through the collections defined as required by the application
-    for coll_name, indexes in required_collections.items():
-        collection_created = False
-        collection_handle = None # Initialize handle
-
+    for coll_name, indexes in REQUIRED_COLLECTIONS.items():
         # --- Ensure Collection Exists ---
         if coll_name not in existing_collections:
-            log.info(f"  - Collection '{coll_name}' not found. Attempting creation...")
             try:
-                # Explicitly create the collection
-                # MongoDB also creates collections implicitly on first insert/index creation,
-                # but explicit creation allows setting validation rules later if desired.
-                collection_handle = db_instance.create_collection(coll_name)
-                log.info(f"  - Successfully CREATED collection: '{coll_name}'")
-                collection_created = True
+                # Explicit creation allows setting validation rules later if desired
+                db_instance.create_collection(coll_name)
+                created_collections += 1
+                log.info(f"  - Created collection '{coll_name}'.")
             except CollectionInvalid:
-                # This might happen in rare concurrent cases or if list_collection_names was stale
-                log.warning(f"  - Collection '{coll_name}' already exists (or created concurrently).")
-                collection_handle = db_instance[coll_name] # Get handle to existing collection
+                # This might happen in rare concurrent cases (e.g. another worker starting up)
+                log.debug(f"  - Collection '{coll_name}' already exists (or created concurrently).")
             except OperationFailure as e:
-                # Log specific permission errors for creating collections
                 log.error(f"  - PERMISSION ERROR creating collection '{coll_name}': {e.details}")
                 log.error("    Please check MongoDB user permissions for 'createCollection'.")
+                ok = False
                 continue # Skip index creation for this collection if creation failed
             except Exception as e:
                 log.error(f"  - UNEXPECTED ERROR creating collection '{coll_name}': {e}", exc_info=True)
+                ok = False
                 continue # Skip index creation
-        else:
-             # If collection already exists, just get a handle to it
-             log.debug(f"  - Collection '{coll_name}' already exists.")
-             collection_handle = db_instance[coll_name]
+        if not indexes:
+            continue
 
         # --- Ensure Indexes Exist ---
-        # Proceed only if we successfully got a collection handle and indexes are defined
-        # ---> CORRECTED THIS LINE <---
-        if collection_handle is not None and indexes:
-        # -----------------------------
-            created_index_names = []
-            log.debug(f"  - Ensuring indexes for collection '{coll_name}'...")
-            try:
-                # Get info about indexes already present on the collection
-                existing_index_info = collection_handle.index_information()
-                existing_index_names = list(existing_index_info.keys())
-                log.debug(f"    Existing indexes on '{coll_name}': {existing_index_names}")
-
-                # Iterate through indexes defined as required for this collection
-                for index_spec, index_options in indexes:
-                    # Ensure background=True is added for non-blocking builds if not specified
-                    if "background" not in index_options:
-                        index_options["background"] = True
-                    # Ensure the index has a name for easier identification and checking
-                    # Generate a default name if one isn't provided in the definition
-                    if "name" not in index_options:
-                         index_options["name"] = "_".join([f"{k}_{v}" for k, v in index_spec]) + "_idx"
-                    idx_name = index_options["name"]
-
-                    # Check if an index with this *name* already exists
-                    if idx_name not in existing_index_names:
-                        log.info(f"    - Index '{idx_name}' not found on '{coll_name}'. Attempting creation...")
-                        try:
-                            # Create the index. pymongo's create_index is generally idempotent
-                            # based on index keys/options, but checking by name first is clearer.
-                            idx_result_name = collection_handle.create_index([index_spec], **index_options)
-                            created_index_names.append(idx_result_name)
-                            log.info(f"    - Successfully CREATED index '{idx_result_name}' on '{coll_name}'.")
-                        except OperationFailure as e:
-                            log.error(f"    - PERMISSION ERROR creating index '{idx_name}' on '{coll_name}': {e.details}")
-                            log.error("      Please check MongoDB user permissions for 'createIndex'.")
-                        except Exception as e:
-                            log.error(f"    - UNEXPECTED ERROR creating index '{idx_name}' on '{coll_name}': {e}", exc_info=True)
-                    else:
-                       log.debug(f"    - Index '{idx_name}' already exists on '{coll_name}'.")
-
-                # Log summary if new indexes were actually added
-                # if collection_created and created_index_names:
-                #    log.info(f"    - Finished creating specified indexes for new collection '{coll_name}'.")
-                # elif created_index_names: # Log if indexes were added to existing collection
-                #    log.info(f"  - Finished adding new indexes to existing collection '{coll_name}'.")
+        collection_handle = db_instance[coll_name]
+        try:
+            # A new collection only has _id_, so there is nothing to list
+            existing_index_names = set(collection_handle.index_information()) if coll_name in existing_collections else {'_id_'}
+            missing = []
+            for index_spec, index_options in indexes:
+                # Single-field definitions are a bare (field, direction) tuple,
+                # compound definitions are a list of them
+                index_keys = index_spec if isinstance(index_spec, list) else [index_spec]
+                options = dict(index_options)
+                # Ensure background=True is added for non-blocking builds if not specified
+                options.setdefault("background", True)
+                # Generate a default name if one isn't provided in the definition
+                options.setdefault("name", "_".join([f"{k}_{v}" for k, v in index_keys]) + "_idx")
+                if options["name"] not in existing_index_names:
+                    missing.append(pymongo.IndexModel(index_keys, **options))
+            if missing:
+                # One createIndexes command per collection instead of one per index
+                names = collection_handle.create_indexes(missing)
+                created_indexes += len(names)
+                log.info(f"  - Created index(es) {names} on '{coll_name}'.")
+        except OperationFailure as e:
+            log.error(f"  - ERROR ensuring indexes for '{coll_name}': {e.details}")
+            log.error("    Please check MongoDB user permissions for 'listIndexes'/'createIndex'.")
+            ok = False
+        except Exception as e:
+            # Catch other errors during index processing for this collection
+            log.error(f"  - ERROR ensuring indexes for collection '{coll_name}': {e}", exc_info=True)
+            ok = False
 
-            except OperationFailure as e:
-                 # Error trying to get index information
-                 log.error(f"  - PERMISSION ERROR accessing index info for '{coll_name}': {e.details}")
-                 log.error("    Please check MongoDB user permissions for 'listIndexes'.")
-            except Exception as e:
-                # Catch other errors during index processing for this collection
-                log.error(f"  - ERROR ensuring indexes for collection '{coll_name}': {e}", exc_info=True)
-
-    log.info("Database initialization check complete.")
+    if ok:
+        # Record the applied version so later startups skip the check
+        try:
+            db_instance.schema_meta.update_one(
+                {'_id': SCHEMA_MARKER_ID},
+                {'$set': {'version': SCHEMA_VERSION, 'applied_on': datetime.datetime.utcnow()}},
+                upsert=True
+            )
+        except OperationFailure as e:
+            log.error(f"  - PERMISSION ERROR recording the schema version in 'schema_meta': {e.details}")
+            ok = False
+        except Exception as e:
+            log.error(f"  - ERROR recording the schema version in 'schema_meta': {e}", exc_info=True)
+            ok = False
+    log.info(f"Database initialization check complete: {created_collections} collection(s) and "
+             f"{created_indexes} index(es) created" + ("." if ok else "; errors occurred, schema marker not updated."))
+    return ok
 
 
 # --- Main Application Factory ---
 def create_app():
     """Application Factory Function: Creates and configures the Flask app."""
-    global mongo_client, db
-
     # Create the Flask application instance
     app = Flask(__name__)
     # Load configuration from config.py based on FLASK_ENV
     app_config = get_config()
     app.config.from_object(app_config)
+    # --- Configure logging (JSON lines, written by a background thread) ---
+    from . import logs
+    logs.configure(app_config.LOG_LEVEL, app_config.LOG_LEVELS, app_config.LOG_FORMAT,
+                   app_config.LOG_ASYNC, app_config.LOG_QUEUE_SIZE)
     log.info(f"Flask app created. Running in '{app_config.__class__.__name__}' mode.")
 
     # Register context processor to make 'now' available in all templates
@@ -199,44 +366,42 @@ def create_app():
         mongo_password = app_config.MONGO_PASSWORD
         mongo_auth_source = app_config.MONGO_AUTHSOURCE
 
-        # Build connection arguments dictionary
-        connection_args = {
-            'host': mongo_host,
-            'port': mongo_port,
-            'serverSelectionTimeoutMS': 5000 # Timeout for finding suitable server
-            # Add other options like replicaSet, tls, etc., from config if needed
-            # 'tls': app_config.MONGO_TLS,
-            # 'replicaSet': app_config.MONGO_REPLICASET,
-            }
-        # Add authentication credentials if provided
+        # Build connection arguments dictionary (pool size, timeouts, compression, read/write concern)
+        connection_args = mongo_client_options(app_config)
+        log.info(f"MongoDB pool: maxPoolSize={app_config.MONGO_MAX_POOL_SIZE}, minPoolSize={app_config.MONGO_MIN_POOL_SIZE}, "
+                 f"waitQueueTimeoutMS={app_config.MONGO_WAIT_QUEUE_TIMEOUT_MS}, readPreference={app_config.MONGO_READ_PREFERENCE}")
         if mongo_username and mongo_password:
-            connection_args.update({
-                'username': mongo_username,
-                'password': mongo_password,
-                'authSource': mongo_auth_source,
-                'authMechanism': 'SCRAM-SHA-256' # Default mechanism, adjust if necessary
-            })
             log.info(f"Attempting MongoDB connection to {mongo_host}:{mongo_port} DB: '{mongo_dbname}' with user '{mongo_username}' (authSource: {mongo_auth_source})")
         else:
             log.info(f"Attempting MongoDB connection to {mongo_host}:{mongo_port} DB: '{mongo_dbname}' without authentication")
 
-        # Create the MongoDB client instance
-        mongo_client = MongoClient(**connection_args)
+        # Create the MongoDB client instance (per process, see get_db)
+        close_db()
+        configure_db(connection_args, mongo_dbname)
+        startup_db = get_db()
 
         # Verify connection by pinging the server (preferred over ismaster)
         log.info("Pinging MongoDB server to verify connection...")
-        mongo_client.admin.command('ping')
+        startup_db.client.admin.command('ping')
         log.info("Successfully connected to MongoDB server!")
-
-        # Get the specific database handle
-        db = mongo_client[mongo_dbname]
-        # Optionally make db directly available via app context (less common now with get_db())
-        # app.db = db
         log.info(f"Database handle obtained for '{mongo_dbname}'.")
 
         # ---> Call Initialization Function Here <---
-        # Ensure database structure (collections, indexes) is ready
-        initialize_database(db)
+        # Ensure database structure (collections, indexes) is ready - at startup (skipped when the
+        # schema marker is current), or only via 'flask migrate-db' as a separate deploy step
+        if app_config.SCHEMA_SETUP_ON_STARTUP:
+            initialize_database(startup_db)
+        else:
+            try:
+                if not schema_is_current(startup_db):
+                    log.warning(f"Database schema is not at version {SCHEMA_VERSION}. Run 'flask migrate-db' to create missing collections/indexes.")
+            except OperationFailure as e:
+                # Only a check: the app can still serve requests, so don't stop startup over it
+                log.warning(f"Could not read the schema marker ({e.details}); run 'flask migrate-db' if the schema may be outdated.")
+
+        # Close the startup client so a pre-forking server can preload the app and fork
+        # workers without sharing it; each process connects on its first get_db() call
+        close_db()
 
     except ConnectionFailure as e:
         # Specific error for connection failures (network, server down)
@@ -256,11 +421,11 @@ def create_app():
     # Define the user loader function required by Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
-        """Loads user object from DB based on user_id stored in session."""
+        """Loads user object based on user_id stored in session (cached per process)."""
         # Import User model *inside* the function to avoid circular imports during startup
         from .models.user import User
-        # Delegate loading to the User model's static method
-        return User.get_by_id(user_id)
+        # Served from the per-process user cache; only a miss queries MongoDB
+        return User.load_for_session(user_id)
 
     # --- Register Blueprints ---
     # Import blueprint objects from their respective route files
@@ -276,5 +441,41 @@ def create_app():
     # Register other blueprints as you create them...
     log.info("Registered application blueprints.")
 
+    # --- Configure In-Process Caches ---
+    from .models.employee import Employee
+    from . import passwords
+    passwords.configure(app.config['PASSWORD_HASHER'], app.config['PASSWORD_HASH_BCRYPT_ROUNDS'],
+                        app.config['PASSWORD_HASH_PBKDF2_ITERATIONS'], app.config['PASSWORD_HASH_WORKERS'],
+                        app.config['PASSWORD_HASH_MAX_PENDING'], app.config['PASSWORD_HASH_TIMEOUT'])
+    from . import throttle
+    throttle.configure(app.config['LOGIN_THROTTLE_ENABLED'], app.config['LOGIN_THROTTLE_BACKEND'],
+                       app.config['LOGIN_THROTTLE_USERNAME_LIMIT'], app.config['LOGIN_THROTTLE_USERNAME_WINDOW'],
+                       app.config['LOGIN_THROTTLE_IP_LIMIT'], app.config['LOGIN_THROTTLE_IP_WINDOW'])
+    from .models.user import User
+    User.configure_session_cache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+    Employee.configure_search_cache(app.config['SEARCH_CACHE_SIZE'], app.config['SEARCH_CACHE_TTL'])
+    from .models.leave import LeaveRequest
+    LeaveRequest.configure_calendar(app.config['CALENDAR_CACHE_SIZE'], app.config['CALENDAR_CACHE_TTL'],
+                                    app.config['LEAVE_MAX_SPAN_DAYS'])
+    from . import leave_duration
+    leave_duration.configure(app.config['DEFAULT_HOLIDAY_REGION'], app.config['WORKWEEK_MASKS'],
+                             app.config['HOLIDAY_CALENDAR_CACHE_TTL'])
+
+    from . import slow_queries
+    slow_queries.configure(app.config['SLOW_QUERY_ENABLED'], app.config['SLOW_QUERY_THRESHOLD_MS'],
+                           app.config['SLOW_QUERY_EXPLAIN'], app.config['SLOW_QUERY_EXPLAIN_INTERVAL'],
+                           app.config['SLOW_QUERY_HISTORY'])
+
+    # --- Request Ids (and access records) for the logs ---
+    logs.init_app(app)
+
+    # --- Request Metrics and /metrics Endpoint ---
+    from . import metrics
+    metrics.init_app(app)
+
+    # --- Register CLI Commands ('flask <command>') ---
+    from .commands import register_commands
+    register_commands(app)
+
     log.info("Flask app creation and configuration complete.")
     return app # Return the fully configured Flask app instance
\ No newline at end of file
@@ -0,0 +1,85 @@
+# hrms/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinel for "not in cache" so that None can be cached as a value
+MISSING = object()
+
+
+class TTLCache:
+    """
+    A small thread-safe, in-process LRU cache with per-entry time-to-live.
+
+    Each worker process has its own instance, so entries written by one worker are
+    not seen (or invalidated) by another; keep TTLs short for data that changes.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        """
+        Args:
+            maxsize (int): Maximum number of entries; the least recently used entry is evicted first.
+            ttl (float): Seconds an entry stays valid. 0 or None disables expiry.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISSING):
+        """Returns the cached value for key, or default if absent/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entry if full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Removes a single entry, if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Removes every entry whose key satisfies predicate(key)."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        """Removes all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Returns a dict of size and hit/miss counters."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,178 @@
+# hrms/commands.py
+
+import json
+import click
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+
+def register_commands(app):
+    """Registers the application's 'flask <command>' CLI commands."""
+
+    @app.cli.command('import-employees')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']), default=None,
+                  help="File format. Guessed from the file extension if omitted.")
+    @click.option('--batch-size', default=1000, show_default=True, help="Rows per bulk_write.")
+    @click.option('--report', 'report_path', type=click.Path(dir_okay=False), default=None,
+                  help="Write the full JSON report to this file.")
+    def import_employees_command(path, file_format, batch_size, report_path):
+        """Bulk-import employees from a CSV or JSONL file."""
+        from .importer import import_employees
+        if not file_format:
+            file_format = 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+        with open(path, 'rb') as f:
+            report = import_employees(f, file_format=file_format, batch_size=batch_size)
+
+        summary = report.to_dict()
+        click.echo(f"Rows: {summary['total_rows']}  Inserted: {summary['inserted']}  "
+                   f"Duplicates: {summary['duplicates']}  Invalid: {summary['invalid']}  Failed: {summary['failed']}")
+        click.echo(f"Elapsed: {summary['elapsed_seconds']}s  ({summary['rows_per_second']} rows/s)")
+        for err in summary['errors'][:20]:
+            click.echo(f"  row {err['row']}: {err['error']}")
+        if len(summary['errors']) > 20:
+            click.echo(f"  ... {len(summary['errors']) - 20} more (use --report for the full list)")
+        if report_path:
+            with open(report_path, 'w') as out:
+                json.dump(summary, out, indent=2)
+            click.echo(f"Report written to {report_path}")
+
+    @app.cli.command('rebuild-search-keys')
+    @click.option('--batch-size', default=1000, show_default=True, help="Documents per bulk_write.")
+    def rebuild_search_keys_command(batch_size):
+        """Backfill the normalized employee search keys used by typeahead search."""
+        from .models.employee import Employee
+        updated = Employee.rebuild_search_keys(batch_size=batch_size)
+        click.echo(f"Updated search keys for {updated} employee(s).")
+
+    @app.cli.command('assign-approvers')
+    @click.option('--batch-size', default=500, show_default=True, help="Updates per bulk_write.")
+    def assign_approvers_command(batch_size):
+        """Re-resolve the approving manager of all pending leave requests."""
+        from .models.leave import LeaveRequest
+        changed = LeaveRequest.assign_approvers(batch_size=batch_size)
+        click.echo(f"Updated the approver of {changed} pending leave request(s).")
+
+    @app.cli.command('backfill-leave-departments')
+    @click.option('--batch-size', default=500, show_default=True, help="Requesters per bulk_write.")
+    def backfill_leave_departments_command(batch_size):
+        """Store the requester's department on leave requests that lack it (for department calendars)."""
+        from .models.leave import LeaveRequest
+        updated = LeaveRequest.backfill_departments(batch_size=batch_size)
+        click.echo(f"Set the department of {updated} leave request(s).")
+
+    @app.cli.command('rebuild-leave-balances')
+    @click.option('--batch-size', default=1000, show_default=True, help="Ledger documents per bulk_write.")
+    def rebuild_leave_balances_command(batch_size):
+        """Recompute all leave balance ledgers from the leave requests."""
+        from .models.leave_balance import LeaveBalance
+        written = LeaveBalance.rebuild(batch_size=batch_size)
+        click.echo(f"Rebuilt {written} leave balance ledger(s).")
+
+    @app.cli.command('add-holiday')
+    @click.argument('region')
+    @click.argument('day', type=click.DateTime(formats=['%Y-%m-%d']))
+    @click.argument('name')
+    def add_holiday_command(region, day, name):
+        """Add a holiday (YYYY-MM-DD) to a region's calendar."""
+        from .models.holiday import Holiday
+        from . import leave_duration
+        if Holiday.add(region, day, name):
+            leave_duration.invalidate_calendar(region)
+            click.echo(f"Added holiday '{name}' on {day:%Y-%m-%d} for region '{region}'.")
+        else:
+            click.echo(f"Region '{region}' already has a holiday on {day:%Y-%m-%d}.")
+
+    @app.cli.command('list-holidays')
+    @click.argument('region')
+    @click.option('--year', type=int, default=None, help="Only list holidays in this year.")
+    def list_holidays_command(region, year):
+        """List a region's holidays."""
+        from datetime import datetime
+        from .models.holiday import Holiday
+        start = datetime(year, 1, 1) if year else None
+        end = datetime(year, 12, 31) if year else None
+        for holiday in Holiday.find_by_region(region, start, end):
+            click.echo(f"{holiday['date']:%Y-%m-%d}  {holiday.get('name', '')}")
+
+    @app.cli.command('refresh-absence-rollups')
+    @click.option('--all', 'full', is_flag=True, help="Backfill missing per-month days and rebuild every month.")
+    @click.option('--month', 'months', multiple=True, help="Refresh this month (YYYY-MM); can be repeated.")
+    @click.option('--batch-size', default=1000, show_default=True, help="Requests per bulk_write when backfilling.")
+    def refresh_absence_rollups_command(full, months, batch_size):
+        """Refresh the absence analytics rollups (queued months by default)."""
+        from flask import current_app
+        from .models.absence_report import AbsenceReport
+        max_span = current_app.config['LEAVE_MAX_SPAN_DAYS']
+        if full:
+            backfilled = AbsenceReport.backfill_days_by_month(batch_size=batch_size)
+            groups = AbsenceReport.refresh(None, max_span_days=max_span)
+            AbsenceReport.get_dirty_collection().delete_many({})
+            click.echo(f"Backfilled {backfilled} request(s); rebuilt {groups} rollup group(s).")
+        elif months:
+            groups = AbsenceReport.refresh(list(months), max_span_days=max_span)
+            click.echo(f"Refreshed {len(set(months))} month(s): {groups} rollup group(s).")
+        else:
+            refreshed = AbsenceReport.refresh_dirty(max_span_days=max_span)
+            click.echo(f"Refreshed {refreshed} queued month(s).")
+
+    @app.cli.command('migrate-db')
+    @click.option('--force', is_flag=True, help="Check every collection and index even if the schema version matches.")
+    def migrate_db_command(force):
+        """Create missing collections and indexes, record the schema version, and backfill derived fields."""
+        from . import get_db, initialize_database, SCHEMA_VERSION
+        from .models.leave import LeaveRequest
+        if initialize_database(get_db(), force=force):
+            click.echo(f"Database schema is at version {SCHEMA_VERSION}.")
+        else:
+            raise click.ClickException("Schema setup failed; see the log for details.")
+        # Pending requests created before approvers were recorded would otherwise be in no manager's queue
+        assigned = LeaveRequest.assign_approvers(only_missing=True)
+        click.echo(f"Resolved the approver of {assigned} pending leave request(s) created without one.")
+        # Requests created before departments were stored would be missing from department calendars
+        departments = LeaveRequest.backfill_departments()
+        click.echo(f"Set the department of {departments} leave request(s) created without one.")
+
+    @app.cli.command('seed')
+    @click.option('--employees', default=1000, show_default=True, help="Employees to generate (each with a user).")
+    @click.option('--years', default=3, show_default=True, help="Years of leave history.")
+    @click.option('--seed', 'random_seed', default=42, show_default=True, help="Random seed (same seed = same data).")
+    @click.option('--workers', default=1, show_default=True, help="Worker processes inserting in parallel.")
+    @click.option('--chunk-size', default=1000, show_default=True, help="Employees per unit of work.")
+    @click.option('--batch-size', default=5000, show_default=True, help="Leave requests per insert_many.")
+    @click.option('--leave-rate', default=1.0, show_default=True, help="Multiplier on the average amount of leave.")
+    @click.option('--password', default=None, help="Password of the users this run inserts (default: a random one, printed at the end).")
+    @click.option('--region', 'regions', multiple=True, help="Holiday region(s) to assign; can be repeated.")
+    @click.option('--domain', default='example.com', show_default=True, help="Email domain of generated users.")
+    @click.option('--code-prefix', default='EMP-', show_default=True, help="Prefix of generated employee codes.")
+    @click.option('--no-rebuild', is_flag=True, help="Skip rebuilding leave balances and absence rollups.")
+    @click.option('--force', is_flag=True, help="Seed even if the database holds users or employees not generated by seeding.")
+    def seed_command(employees, years, random_seed, workers, chunk_size, batch_size, leave_rate, password,
+                     regions, domain, code_prefix, no_rebuild, force):
+        """Generate synthetic users, employees and leave history (for staging and performance tests)."""
+        from .seed import seed_database, SeedRefused
+
+        def progress(done, total, totals):
+            if done == total or done % max(1, total // 20) == 0:
+                click.echo(f"  {done}/{total} chunks: {totals['employees']} employees, "
+                           f"{totals['leave_requests']} leave requests")
+
+        try:
+            totals = seed_database(employees=employees, years=years, seed=random_seed, workers=workers,
+                                   chunk_size=chunk_size, batch_size=batch_size, leave_rate=leave_rate,
+                                   password=password, regions=list(regions) or None, domain=domain,
+                                   code_prefix=code_prefix, rebuild=not no_rebuild, progress=progress, force=force)
+        except SeedRefused as e:
+            raise click.ClickException(f"{e} Pass --force (or set SEED_ALLOWED) if this is intended.")
+        click.echo(f"Inserted {totals['users']} users, {totals['employees']} employees and "
+                   f"{totals['leave_requests']} leave requests ({totals['docs_per_second']} docs/s); "
+                   f"skipped {totals['duplicates']} duplicate(s).")
+        if not no_rebuild:
+            click.echo(f"Rebuilt {totals['ledgers']} balance ledger(s) and {totals['rollups']} absence rollup group(s).")
+        click.echo(f"Elapsed: {totals['elapsed_seconds']}s.")
+        if password is None and totals['users']:
+            click.echo(f"The {totals['users']} user(s) inserted by this run share the random password "
+                       f"'{totals['password']}'; users from earlier runs keep their own.")
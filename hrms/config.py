@@ -3,6 +3,13 @@ from dotenv import load_dotenv
 
 load_dotenv() # Load environment variables from .env file in the root directory
 
+
+def _optional_int(name):
+    """Reads an integer environment variable, or None if it is unset/empty."""
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else None
+
+
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a_default_fallback_secret_key'
@@ -15,6 +22,120 @@ class Config:
     MONGO_PASSWORD = os.environ.get('MONGO_PASSWORD') # Returns None if not set
     MONGO_AUTHSOURCE = os.environ.get('MONGO_AUTHSOURCE', 'admin') # Default to 'admin' is common
 
+    # Create missing collections/indexes in create_app (skipped when the stored schema version matches).
+    # Set to False to do it only in a separate deploy step with 'flask migrate-db'.
+    SCHEMA_SETUP_ON_STARTUP = os.environ.get('SCHEMA_SETUP_ON_STARTUP', 'True').lower() in ('true', '1', 't')
+
+    # MongoClient connection pool and driver options (None = driver default). The pool is per
+    # worker process, so total connections to the server are about workers x MONGO_MAX_POOL_SIZE.
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)) # Connections per process
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)) # Connections kept open when idle
+    MONGO_MAX_IDLE_TIME_MS = _optional_int('MONGO_MAX_IDLE_TIME_MS') # Close connections idle this long
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int('MONGO_WAIT_QUEUE_TIMEOUT_MS') # Max wait for a free connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = _optional_int('MONGO_CONNECT_TIMEOUT_MS')
+    MONGO_SOCKET_TIMEOUT_MS = _optional_int('MONGO_SOCKET_TIMEOUT_MS')
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '') # e.g. 'zstd,snappy,zlib' (zstd/snappy need extra packages)
+    MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary') # e.g. 'secondaryPreferred'
+    MONGO_WRITE_CONCERN = os.environ.get('MONGO_WRITE_CONCERN') # 'majority', or a number of nodes; None = server default
+    MONGO_WRITE_CONCERN_JOURNAL = os.environ.get('MONGO_WRITE_CONCERN_JOURNAL') # 'true'/'false'; None = server default
+    MONGO_APPNAME = os.environ.get('MONGO_APPNAME', 'hrms') # Shown in server logs and currentOp
+    MONGO_POOL_METRICS = os.environ.get('MONGO_POOL_METRICS', 'True').lower() in ('true', '1', 't') # Register the pool listener
+    MONGO_COMMAND_METRICS = os.environ.get('MONGO_COMMAND_METRICS', 'True').lower() in ('true', '1', 't') # Per-command latency histograms
+
+    # Prometheus metrics endpoint (/metrics). Counters are per worker process.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') # Scrapers must send 'Authorization: Bearer <token>'; required outside development
+
+    # Slow query log for model reads (see hrms/slow_queries.py)
+    SLOW_QUERY_ENABLED = os.environ.get('SLOW_QUERY_ENABLED', 'True').lower() in ('true', '1', 't')
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100)) # Queries slower than this are logged
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'True').lower() in ('true', '1', 't') # Capture explain("executionStats")
+    SLOW_QUERY_EXPLAIN_INTERVAL = int(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300)) # Seconds between explains of one query shape
+    SLOW_QUERY_HISTORY = int(os.environ.get('SLOW_QUERY_HISTORY', 100)) # Recent slow queries kept per process
+
+    # Logging (see hrms/logs.py). Records are handed to a background thread through a queue,
+    # which formats and writes them, so request threads never wait on log I/O.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO') # Root level
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', 'pymongo=WARNING') # Per-logger levels, e.g. 'hrms.routes.auth=DEBUG,pymongo=WARNING'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json') # 'json' (one object per line) or 'text'
+    LOG_ASYNC = os.environ.get('LOG_ASYNC', 'True').lower() in ('true', '1', 't') # False = write on the logging thread (debugging)
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000)) # Records waiting to be written; further records are dropped
+    LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'False').lower() in ('true', '1', 't') # One 'hrms.access' line per request
+
+    # Password hashing (see hrms/passwords.py). Changing the hasher or cost upgrades stored hashes on next login.
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'bcrypt') # 'bcrypt' or 'pbkdf2'
+    PASSWORD_HASH_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_HASH_BCRYPT_ROUNDS', 12)) # bcrypt cost (log2); at least 10
+    PASSWORD_HASH_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_HASH_PBKDF2_ITERATIONS', 600000)) # PBKDF2-SHA256; at least 100000
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2)) # Concurrent hashes per process (CPU cores spent)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32)) # Queued hashes before logins get a 503
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10)) # Seconds a login waits for the pool
+
+    # Login throttling (see hrms/throttle.py): token buckets per username and per client IP
+    LOGIN_THROTTLE_ENABLED = os.environ.get('LOGIN_THROTTLE_ENABLED', 'True').lower() in ('true', '1', 't')
+    LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory') # 'memory' (per process), 'mongo' (shared) or 'module:Class'
+    LOGIN_THROTTLE_USERNAME_LIMIT = int(os.environ.get('LOGIN_THROTTLE_USERNAME_LIMIT', 10)) # Attempts per username...
+    LOGIN_THROTTLE_USERNAME_WINDOW = int(os.environ.get('LOGIN_THROTTLE_USERNAME_WINDOW', 300)) # ...per this many seconds
+    LOGIN_THROTTLE_IP_LIMIT = int(os.environ.get('LOGIN_THROTTLE_IP_LIMIT', 50)) # Attempts per client IP...
+    LOGIN_THROTTLE_IP_WINDOW = int(os.environ.get('LOGIN_THROTTLE_IP_WINDOW', 60)) # ...per this many seconds
+
+    # Production WSGI server (gunicorn.conf.py). Requests mostly wait on MongoDB, so each worker
+    # process runs several threads; MONGO_MAX_POOL_SIZE must be at least WEB_THREADS.
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:8000')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)) # Processes; one per CPU core
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8)) # Threads per worker (gthread); requests in flight per worker
+    WEB_KEEPALIVE = int(os.environ.get('WEB_KEEPALIVE', 5)) # Seconds; raise above the load balancer's idle timeout if behind one
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', 30)) # Seconds a request may block a worker before it is restarted
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30)) # Seconds to finish in-flight requests on restart/shutdown
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', 2000)) # Recycle a worker after this many requests (0 = never)
+    WEB_MAX_REQUESTS_JITTER = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 200)) # Random spread so workers don't recycle together
+    WEB_PRELOAD = os.environ.get('WEB_PRELOAD', 'True').lower() in ('true', '1', 't') # Import the app once in the master, then fork
+
+    # Pagination (keyset/cursor based list views)
+    DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 25))
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200)) # Upper bound for user-supplied page sizes
+    PAGE_SIZE_CHOICES = [10, 25, 50, 100] # Options offered in list view page-size selectors
+
+    # Flask-Login user_loader cache (per process); bounds how long a change saved by another worker goes unseen
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096)) # Number of cached users
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60)) # Seconds before a cached user is reloaded
+
+    # Employee typeahead search (per-process result cache)
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', 512)) # Number of cached prefixes
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 30)) # Seconds before a cached result is refetched
+
+    # Leave policy: days per calendar year for each leave type (None = unlimited, not tracked)
+    LEAVE_ENTITLEMENTS = {
+        'Annual': 20,
+        'Sick': 10,
+        'Unpaid': None,
+        'Maternity': 90,
+        'Paternity': 10,
+    }
+
+    # Business-day calendars for leave durations (holidays are stored per region in the 'holidays' collection)
+    DEFAULT_HOLIDAY_REGION = os.environ.get('DEFAULT_HOLIDAY_REGION', 'default') # Used when an employee has no 'region'
+    WORKWEEK_MASKS = {} # Per-region working days Mon..Sun, e.g. {'AE-DXB': '1111001'}; default is '1111100'
+    HOLIDAY_CALENDAR_CACHE_TTL = int(os.environ.get('HOLIDAY_CALENDAR_CACHE_TTL', 300)) # Seconds
+
+    # Maximum number of leave requests decided by one bulk approve/reject
+    BULK_DECISION_LIMIT = int(os.environ.get('BULK_DECISION_LIMIT', 1000))
+
+    # Team/department leave calendar
+    LEAVE_MAX_SPAN_DAYS = int(os.environ.get('LEAVE_MAX_SPAN_DAYS', 366)) # Longest allowed single request; bounds calendar index scans
+    CALENDAR_CACHE_SIZE = int(os.environ.get('CALENDAR_CACHE_SIZE', 256)) # Cached month views per process
+    CALENDAR_CACHE_TTL = int(os.environ.get('CALENDAR_CACHE_TTL', 120)) # Seconds; other workers' changes show up within this
+
+    # Absence analytics: refresh queued rollup months when a report is opened. Off by default so GET requests
+    # don't write; schedule 'flask refresh-absence-rollups' (e.g. every few minutes) instead.
+    ABSENCE_REFRESH_ON_READ = os.environ.get('ABSENCE_REFRESH_ON_READ', 'False').lower() in ('true', '1', 't')
+
+    # Registration: run one $or query for taken username/email before inserting (the unique indexes enforce it either way)
+    REGISTRATION_PRECHECK = os.environ.get('REGISTRATION_PRECHECK', 'False').lower() in ('true', '1', 't')
+
+    # 'flask seed': allow seeding a database that already holds real (non-generated) users or employees
+    SEED_ALLOWED = os.environ.get('SEED_ALLOWED', 'False').lower() in ('true', '1', 't')
+
     # Optional: Add other configs here later
     # e.g., ALLOW_REGISTRATION = os.environ.get('ALLOW_REGISTRATION', 'False').lower() in ('true', '1', 't')
 
@@ -0,0 +1,141 @@
+# hrms/export.py
+
+import csv
+import io
+import json
+from datetime import datetime, date, timedelta
+from bson import ObjectId
+from flask import Response, stream_with_context
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Rows are buffered into chunks of roughly this many characters before being
+# handed to the WSGI server, so we don't flush one tiny write per document.
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _plain_value(value):
+    """Converts BSON-specific types into plain, serializable values."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_rows(cursor, fields):
+    """Yields CSV text chunks (header first) for the documents of a cursor."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for doc in cursor:
+        writer.writerow(['' if doc.get(f) is None else _plain_value(doc.get(f)) for f in fields])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson_rows(cursor, fields):
+    """Yields newline-delimited JSON chunks for the documents of a cursor."""
+    parts = []
+    size = 0
+    for doc in cursor:
+        line = json.dumps({f: _plain_value(doc.get(f)) for f in fields}, default=str) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def stream_export(cursor, fields, export_format, filename):
+    """
+    Builds a chunked (streaming) Flask response from a live PyMongo cursor.
+
+    Documents are pulled from the cursor batch by batch while the response is being
+    sent, so memory use stays constant regardless of how many documents match and
+    the first bytes go out immediately. The cursor is closed when the client disconnects.
+
+    Args:
+        cursor: A PyMongo cursor (not a list).
+        fields (list): Column names, in output order.
+        export_format (str): One of EXPORT_FORMATS ('csv' or 'ndjson').
+        filename (str): Download filename without extension.
+
+    Returns:
+        flask.Response: A streaming response.
+    """
+    row_generator = _csv_rows if export_format == 'csv' else _ndjson_rows
+
+    def generate():
+        chunks = 0
+        try:
+            for chunk in row_generator(cursor, fields):
+                chunks += 1
+                yield chunk
+        finally:
+            cursor.close()
+            log.info(f"Export '{filename}.{export_format}' finished after {chunks} chunk(s).")
+
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    # Ask reverse proxies (e.g. nginx) not to buffer the whole stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def parse_export_args(args, allowed_fields, default_fields):
+    """
+    Parses the common export query parameters.
+
+    Args:
+        args: request.args
+        allowed_fields (list): Fields that may be exported.
+        default_fields (list): Fields used when 'fields' is not given.
+
+    Returns:
+        tuple: (export_format, fields, date_from, date_to)
+
+    Raises:
+        ValueError: On an unknown format, unknown field or malformed date.
+    """
+    export_format = args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}.")
+
+    fields_arg = args.get('fields')
+    fields = [f.strip() for f in fields_arg.split(',') if f.strip()] if fields_arg else list(default_fields)
+    unknown = [f for f in fields if f not in allowed_fields]
+    if unknown or not fields:
+        raise ValueError(f"Unknown export field(s): {', '.join(unknown) or '(none given)'}.")
+
+    date_from = date_to = None
+    if args.get('from'):
+        date_from = datetime.strptime(args['from'], '%Y-%m-%d')
+    if args.get('to'):
+        date_to = datetime.strptime(args['to'], '%Y-%m-%d')
+    return export_format, fields, date_from, date_to
+
+
+def date_range_filter(field, date_from=None, date_to=None):
+    """Builds a {field: {'$gte': from, '$lt': day after to}} filter, or {} if no bounds."""
+    bounds = {}
+    if date_from:
+        bounds['$gte'] = date_from
+    if date_to:
+        # 'to' is a calendar day, include the whole day
+        bounds['$lt'] = date_to + timedelta(days=1)
+    return {field: bounds} if bounds else {}
@@ -0,0 +1,177 @@
+# hrms/importer.py
+
+import csv
+import io
+import json
+import time
+from .models.employee import Employee
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Columns accepted by the employee import (anything else in the file is ignored)
+IMPORT_FIELDS = ['employee_code', 'first_name', 'last_name', 'email', 'department',
+                 'designation', 'date_of_joining', 'contact_no', 'status', 'region']
+REQUIRED_FIELDS = ['first_name', 'last_name', 'email']
+
+# Cap on how many per-row problems are kept in the report (counts are always complete)
+MAX_REPORTED_ERRORS = 1000
+
+
+def _iter_csv(text_stream):
+    """Yields (row_number, dict) for each data row of a CSV stream. Row 1 is the header."""
+    reader = csv.DictReader(text_stream)
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, row
+
+
+def _iter_jsonl(text_stream):
+    """Yields (line_number, dict) for each non-blank line of a JSONL stream."""
+    for line_no, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+            continue
+        yield line_no, row if isinstance(row, dict) else ValueError("Line is not a JSON object.")
+
+
+def validate_row(row):
+    """
+    Cleans one input row into an employee document.
+
+    Returns:
+        tuple: (document, None) if valid, (None, error message) otherwise.
+    """
+    doc = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if value is None:
+            continue
+        value = str(value).strip()
+        # Leave optional fields out entirely rather than storing '' - the sparse unique
+        # index on employee_code would otherwise treat every blank code as a duplicate
+        if value:
+            doc[field] = value
+    missing = [f for f in REQUIRED_FIELDS if f not in doc]
+    if missing:
+        return None, f"Missing required field(s): {', '.join(missing)}"
+    if '@' not in doc['email']:
+        return None, f"Invalid email '{doc['email']}'"
+    doc.setdefault('status', 'active')
+    return doc, None
+
+
+class ImportReport:
+    """Accumulates the outcome of an employee import."""
+
+    def __init__(self):
+        self.total_rows = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.failed = 0
+        self.errors = [] # [{'row': int, 'error': str}], capped at MAX_REPORTED_ERRORS
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'total_rows': self.total_rows,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'failed': self.failed,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors,
+            'errors_truncated': (self.duplicates + self.invalid + self.failed) > len(self.errors),
+        }
+
+
+def _flush(batch, report):
+    """Writes one batch of (row_number, doc) pairs and records the outcome."""
+    inserted, errors = Employee.bulk_create([doc for _, doc in batch])
+    report.inserted += inserted
+    for err in errors:
+        row_number, doc = batch[err['index']]
+        if err['code'] == 11000:
+            report.duplicates += 1
+            field = err['field'] or 'unique key'
+            report.add_error(row_number, f"Duplicate {field} '{doc.get(field, '')}'")
+        else:
+            report.failed += 1
+            report.add_error(row_number, err['message'])
+
+
+def import_employees(stream, file_format='csv', batch_size=1000):
+    """
+    Imports employees from a CSV or JSONL byte stream in batches.
+
+    The file is parsed incrementally; each batch of valid rows is written with one
+    unordered bulk_write, and duplicates are detected from the unique index errors.
+
+    Args:
+        stream: A binary file-like object (upload stream or open file).
+        file_format (str): 'csv' or 'jsonl'.
+        batch_size (int): Rows per bulk_write.
+
+    Returns:
+        ImportReport: The finished report.
+    """
+    if file_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unsupported import format '{file_format}'. Use 'csv' or 'jsonl'.")
+
+    report = ImportReport()
+    # 'utf-8-sig' strips the BOM that spreadsheet exports tend to add
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    rows = _iter_csv(text_stream) if file_format == 'csv' else _iter_jsonl(text_stream)
+
+    batch = []
+    try:
+        for row_number, row in rows:
+            report.total_rows += 1
+            if isinstance(row, Exception):
+                report.invalid += 1
+                report.add_error(row_number, str(row))
+                continue
+            doc, error = validate_row(row)
+            if error:
+                report.invalid += 1
+                report.add_error(row_number, error)
+                continue
+            batch.append((row_number, doc))
+            if len(batch) >= batch_size:
+                _flush(batch, report)
+                batch = []
+        if batch:
+            _flush(batch, report)
+    except (csv.Error, UnicodeDecodeError) as e:
+        log.error(f"Employee import aborted after {report.total_rows} rows: {e}")
+        report.failed += 1
+        report.add_error(report.total_rows + 1, f"Could not parse file: {e}")
+    finally:
+        # Don't let the wrapper close the caller's stream
+        text_stream.detach()
+
+    report.finish()
+    log.info(f"Employee import finished: {report.inserted} inserted, {report.duplicates} duplicates, "
+             f"{report.invalid} invalid, {report.failed} failed in {report.elapsed:.2f}s "
+             f"({report.rows_per_second:.0f} rows/s)")
+    return report
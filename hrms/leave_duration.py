@@ -0,0 +1,193 @@
+# hrms/leave_duration.py
+
+"""
+Business-day leave duration engine.
+
+Leave length is the number of working days in an inclusive [start, end] range,
+excluding weekends (per-region weekmask) and the region's holidays. Counting is
+done with numpy.busday_count against a cached numpy.busdaycalendar, so a batch of
+tens of thousands of requests is a handful of array operations rather than a
+Python loop over days.
+"""
+
+from datetime import datetime, date
+import numpy as np
+from .cache import TTLCache, MISSING
+from .models.holiday import Holiday
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+DEFAULT_WEEKMASK = '1111100' # Mon-Fri working days
+ONE_DAY = np.timedelta64(1, 'D')
+
+# Settings, replaced from Config by configure() in create_app
+_settings = {
+    'default_region': 'default',
+    'weekmasks': {}, # region -> weekmask string, e.g. {'AE-DXB': '1111001'}
+}
+# region -> numpy.busdaycalendar (weekmask + holidays), per process
+_calendar_cache = TTLCache(maxsize=64, ttl=300)
+
+
+def configure(default_region='default', weekmasks=None, cache_ttl=300):
+    """Applies configuration and resets the calendar cache."""
+    global _calendar_cache
+    _settings['default_region'] = default_region
+    _settings['weekmasks'] = dict(weekmasks or {})
+    _calendar_cache = TTLCache(maxsize=64, ttl=cache_ttl)
+
+
+def invalidate_calendar(region=None):
+    """Drops the cached calendar of a region (or all regions), e.g. after holidays change."""
+    if region is None:
+        _calendar_cache.clear()
+    else:
+        _calendar_cache.invalidate(region)
+
+
+def cache_stats():
+    """Hit/miss counters of the calendar cache."""
+    return _calendar_cache.stats()
+
+
+def get_calendar(region=None):
+    """Returns the (cached) numpy.busdaycalendar of a region."""
+    region = region or _settings['default_region']
+    calendar = _calendar_cache.get(region)
+    if calendar is MISSING:
+        weekmask = _settings['weekmasks'].get(region, DEFAULT_WEEKMASK)
+        holidays = np.array(Holiday.dates_for_region(region), dtype='datetime64[D]')
+        calendar = np.busdaycalendar(weekmask=weekmask, holidays=holidays)
+        _calendar_cache.set(region, calendar)
+        log.debug("Loaded business-day calendar for region '%s' (%s holidays).", region, len(holidays))
+    return calendar
+
+
+def to_days(values):
+    """Converts a datetime/date (or a sequence of them) to numpy datetime64[D]."""
+    if isinstance(values, (datetime, date)):
+        return np.datetime64(values.date() if isinstance(values, datetime) else values, 'D')
+    return np.array([v.date() if isinstance(v, datetime) else v for v in values], dtype='datetime64[D]')
+
+
+def business_days(start_date, end_date, region=None):
+    """Working days in the inclusive range [start_date, end_date] (0 if the range is empty)."""
+    if not start_date or not end_date or end_date < start_date:
+        return 0
+    return int(np.busday_count(to_days(start_date), to_days(end_date) + ONE_DAY, busdaycal=get_calendar(region)))
+
+
+def business_days_array(start_dates, end_dates, region=None):
+    """
+    Vectorized business_days for equally long sequences of start and end dates
+    (all in one region). Empty ranges count as 0.
+
+    Returns:
+        numpy.ndarray: int64 working-day counts.
+    """
+    starts = to_days(start_dates)
+    ends = to_days(end_dates) + ONE_DAY
+    counts = np.busday_count(starts, np.maximum(starts, ends), busdaycal=get_calendar(region))
+    return counts.astype(np.int64)
+
+
+def business_days_by_year(start_date, end_date, region=None):
+    """Splits a request's working days by calendar year, e.g. {2025: 2, 2026: 1}."""
+    if not start_date or not end_date or end_date < start_date:
+        return {}
+    return business_days_by_year_batch([start_date], [end_date], region)[0]
+
+
+def business_days_by_year_batch(start_dates, end_dates, region=None):
+    """
+    Vectorized business_days_by_year for many requests of one region.
+
+    Returns:
+        list: One {year: days} dict per request (empty for invalid ranges).
+    """
+    return [{int(year): days for year, days in split.items()}
+            for split in business_days_by_period_batch(start_dates, end_dates, region, 'Y')]
+
+
+def business_days_by_month(start_date, end_date, region=None):
+    """Splits a request's working days by calendar month, e.g. {'2025-12': 2, '2026-01': 1}."""
+    if not start_date or not end_date or end_date < start_date:
+        return {}
+    return business_days_by_period_batch([start_date], [end_date], region, 'M')[0]
+
+
+def business_days_by_period_batch(start_dates, end_dates, region=None, unit='Y'):
+    """
+    Splits the working days of many requests of one region by calendar period.
+
+    Requests within a single period (nearly all of them) are counted in one
+    busday_count call; the rare ones spanning a period boundary are split into
+    per-period segments and counted in a second call.
+
+    Args:
+        unit (str): 'Y' for years, 'M' for months.
+
+    Returns:
+        list: One {period: days} dict per request (empty for invalid ranges), keyed
+              by the period as a string, e.g. '2026' or '2026-03'.
+    """
+    if not len(start_dates):
+        return []
+    calendar = get_calendar(region)
+    period_type = f'datetime64[{unit}]'
+    starts = to_days(start_dates)
+    ends = to_days(end_dates)
+    valid = ends >= starts
+    start_periods = starts.astype(period_type)
+    end_periods = ends.astype(period_type)
+
+    results = [{} for _ in range(len(starts))]
+
+    same_period = valid & (start_periods == end_periods)
+    idx = np.nonzero(same_period)[0]
+    if len(idx):
+        counts = np.busday_count(starts[idx], ends[idx] + ONE_DAY, busdaycal=calendar)
+        for i, period, count in zip(idx.tolist(), start_periods[idx].astype(str).tolist(), counts.tolist()):
+            results[i][period] = count
+
+    multi = np.nonzero(valid & (start_periods != end_periods))[0]
+    if len(multi):
+        seg_owner, seg_period, seg_start, seg_end = [], [], [], []
+        for i in multi.tolist():
+            for period in np.arange(start_periods[i], end_periods[i] + 1):
+                seg_owner.append(i)
+                seg_period.append(str(period))
+                seg_start.append(max(starts[i], period.astype('datetime64[D]')))
+                seg_end.append(min(ends[i] + ONE_DAY, (period + 1).astype('datetime64[D]')))
+        counts = np.busday_count(np.array(seg_start), np.array(seg_end), busdaycal=calendar)
+        for i, period, count in zip(seg_owner, seg_period, counts.tolist()):
+            results[i][period] = count
+
+    return results
+
+
+def business_days_for_requests(requests, unit='Y'):
+    """
+    Computes {year: days} (or, with unit='M', {'YYYY-MM': days}) for a list of leave
+    request documents, grouping them by 'region' so each region's calendar is used once.
+
+    Returns:
+        list: One dict per request, in input order.
+    """
+    results = [{} for _ in requests]
+    by_region = {}
+    for i, req in enumerate(requests):
+        if req.get('start_date') and req.get('end_date'):
+            by_region.setdefault(req.get('region') or _settings['default_region'], []).append(i)
+    for region, indexes in by_region.items():
+        starts = [requests[i]['start_date'] for i in indexes]
+        ends = [requests[i]['end_date'] for i in indexes]
+        if unit == 'Y':
+            counts = business_days_by_year_batch(starts, ends, region)
+        else:
+            counts = business_days_by_period_batch(starts, ends, region, unit)
+        for i, days in zip(indexes, counts):
+            results[i] = days
+    return results
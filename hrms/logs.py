@@ -0,0 +1,283 @@
+# hrms/logs.py
+
+"""
+Application logging.
+
+Request threads create the log record, render its message and put it on a bounded
+in-memory queue (a QueueHandler on the root logger). A QueueListener thread takes records
+off the queue, encodes them (JSON or text) and writes them to stderr, so encoding and I/O
+are not part of request latency.
+When the queue is full (the writer cannot keep up), records are dropped and counted rather
+than making requests wait; the count is exported on /metrics.
+
+Records are written as one JSON object per line (LOG_FORMAT='json'), with the request id,
+method, path and the milliseconds since the request started when logged during a request,
+and any fields passed with extra={...}. The request id is taken from an incoming
+X-Request-ID header (if well-formed) or generated, and is returned in the response's
+X-Request-ID header. With LOG_REQUESTS, one 'hrms.access' record per request gives its
+status and duration.
+
+Messages are rendered on the logging thread when the record is queued, so the listener
+only sees plain strings and arguments may be mutated after the call. Pass values as
+%-style arguments (log.info("User '%s' logged in.", username)): nothing is rendered for
+records below the logger's level. Exception tracebacks are rendered at the same point, as
+the frames they refer to do not outlive the request.
+"""
+
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+access_log = logging.getLogger('hrms.access')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s'
+TEXT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Accepted incoming X-Request-ID values (anything else is replaced by a generated id)
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+# Fields every record has; anything else on a record came from extra={...}
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'elapsed_ms', 'method', 'path'}
+
+_lock = threading.Lock()
+_queue_handler = None # Root handler while logging asynchronously
+_output_handler = None # The handler that writes (behind the listener when asynchronous)
+_listener = None
+_queue_size = 10000
+_leveled_loggers = set() # Loggers given a level by LOG_LEVELS, reset on reconfiguration
+_counts = {'dropped': 0}
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the current request's id, method, path and elapsed time to records logged during a request."""
+
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            started = g.get('_log_started')
+            record.request_id = g.request_id
+            record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1) if started else None
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks; the listener thread only encodes and writes records."""
+
+    def prepare(self, record):
+        # Render the message and traceback now, so the queued record holds no references to
+        # caller objects (which may change or, for frames, not outlive the request)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _lock:
+                _counts['dropped'] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        if getattr(record, 'request_id', None):
+            entry.update(request_id=record.request_id, method=record.method, path=record.path,
+                         elapsed_ms=record.elapsed_ms)
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+def _build_formatter(fmt):
+    if fmt == 'json':
+        return JsonFormatter()
+    if fmt == 'text':
+        return logging.Formatter(TEXT_FORMAT, TEXT_DATE_FORMAT, defaults={'request_id': '-'})
+    raise ValueError(f"Unknown LOG_FORMAT '{fmt}' (expected 'json' or 'text').")
+
+
+def parse_levels(levels):
+    """
+    Parses per-logger levels, e.g. 'hrms.routes.auth=DEBUG,pymongo=WARNING'.
+
+    Returns:
+        dict: Logger name -> level name.
+    """
+    parsed = {}
+    for item in (levels or '').split(','):
+        if not item.strip():
+            continue
+        name, sep, level = item.partition('=')
+        if not sep or not name.strip() or not level.strip():
+            raise ValueError(f"Invalid LOG_LEVELS entry '{item.strip()}' (expected 'logger=LEVEL').")
+        parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+
+def _start_listener():
+    """Creates the queue and starts the listener thread writing to _output_handler (lock held)."""
+    global _listener
+    _queue_handler.queue = queue.Queue(_queue_size)
+    _listener = QueueListener(_queue_handler.queue, _output_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _detach():
+    """Stops the listener (writing what is queued) and removes our handlers from the root logger (lock held)."""
+    global _queue_handler, _output_handler, _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in (_queue_handler, _output_handler):
+        if handler is not None:
+            root.removeHandler(handler)
+    _queue_handler = _output_handler = None
+
+
+def configure(level='INFO', levels='', fmt='json', asynchronous=True, queue_size=10000):
+    """
+    Applies configuration from Config (called first thing in create_app; safe to call again).
+
+    Args:
+        level (str): Root logger level.
+        levels (str): Per-logger levels, 'name=LEVEL,...'.
+        fmt (str): 'json' or 'text'.
+        asynchronous (bool): Write through the queue and listener thread (False writes
+            synchronously on the logging thread, which is easier to follow when debugging).
+        queue_size (int): Records the queue holds before new records are dropped.
+    """
+    global _queue_handler, _output_handler, _queue_size
+    formatter = _build_formatter(fmt)
+    per_logger = parse_levels(levels)
+    root = logging.getLogger()
+    with _lock:
+        _detach()
+        _output_handler = logging.StreamHandler(sys.stderr)
+        _output_handler.setFormatter(formatter)
+        if asynchronous:
+            _queue_size = queue_size
+            _queue_handler = NonBlockingQueueHandler(None) # Its queue is created by _start_listener
+            _queue_handler.addFilter(RequestContextFilter())
+            _start_listener()
+            root.addHandler(_queue_handler)
+        else:
+            _output_handler.addFilter(RequestContextFilter())
+            root.addHandler(_output_handler)
+        root.setLevel(level.upper())
+        for name in _leveled_loggers - set(per_logger):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        for name, logger_level in per_logger.items():
+            logging.getLogger(name).setLevel(logger_level)
+        _leveled_loggers.clear()
+        _leveled_loggers.update(per_logger)
+    log.debug("Logging configured: level=%s levels=%s format=%s async=%s", level, per_logger, fmt, asynchronous)
+
+
+def _after_fork_in_child():
+    # The listener thread does not exist in a forked child (e.g. a worker of a preloading
+    # WSGI master), and the inherited queue may have been mid-operation; start over. The
+    # inherited lock may have been held by another thread at the fork, so replace it too
+    global _lock
+    _lock = threading.Lock()
+    with _lock:
+        if _queue_handler is not None:
+            _start_listener()
+
+
+def shutdown():
+    """
+    Writes out queued records and stops the listener thread (at interpreter exit). Later
+    records are written synchronously.
+    """
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        _output_handler.addFilter(RequestContextFilter())
+        root.addHandler(_output_handler)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(shutdown)
+
+
+def stats():
+    """Queue depth and dropped records of this process."""
+    with _lock:
+        return {
+            'queued': _queue_handler.queue.qsize() if _listener is not None else 0,
+            'queue_size': _queue_size,
+            'dropped': _counts['dropped'],
+        }
+
+
+# --- Request ids and access records ---
+def _begin_request():
+    supplied = request.headers.get('X-Request-ID', '')
+    g.request_id = supplied if REQUEST_ID_PATTERN.match(supplied) else uuid.uuid4().hex
+    g._log_started = time.perf_counter()
+
+
+def _end_request(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def _log_request(response):
+    started = g.get('_log_started')
+    if started is not None:
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        access_log.info("%s %s %s %s ms", request.method, request.path, response.status_code, duration_ms,
+                        extra={'status': response.status_code, 'duration_ms': duration_ms,
+                               'endpoint': request.endpoint})
+    return response
+
+
+def init_app(app):
+    """Registers the request id hooks, and the access record if LOG_REQUESTS."""
+    app.before_request(_begin_request)
+    if app.config.get('LOG_REQUESTS'):
+        app.after_request(_log_request)
+    app.after_request(_end_request)
@@ -0,0 +1,173 @@
+# hrms/metrics.py
+
+"""
+Request metrics and the Prometheus /metrics endpoint.
+
+before/after request hooks record each request's latency by endpoint and method and
+count responses by status. /metrics renders those, the MongoDB command and pool
+listeners (hrms/monitoring.py), the in-process caches, the login throttle and the log
+queue in the Prometheus text exposition format. Everything is kept per worker process, so each
+scrape reflects the worker that served it; label series by instance accordingly or
+scrape workers individually.
+"""
+
+import hmac
+import os
+import time
+from flask import Response, abort, current_app, g, request
+from .monitoring import Histogram, Counter, command_metrics, pool_metrics
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Bucket bounds (seconds) for HTTP request latency
+REQUEST_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+request_durations = Histogram(('endpoint', 'method'), REQUEST_BUCKETS)
+request_statuses = Counter(('endpoint', 'method', 'status'))
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        # Requests that matched no route are grouped together to keep label cardinality bounded
+        endpoint = request.endpoint or 'unmatched'
+        request_durations.observe((endpoint, request.method), time.perf_counter() - started)
+        request_statuses.inc((endpoint, request.method, str(response.status_code)))
+    return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _render_histogram(lines, name, help_text, histogram):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    bounds = [repr(float(b)) for b in histogram.buckets] + ['+Inf']
+    for labels, (cumulative, total, count) in sorted(histogram.snapshot().items()):
+        for bound, value in zip(bounds, cumulative):
+            le = 'le="' + bound + '"'
+            lines.append(f'{name}_bucket{_labels(histogram.label_names, labels, le)} {value}')
+        lines.append(f'{name}_sum{_labels(histogram.label_names, labels)} {total}')
+        lines.append(f'{name}_count{_labels(histogram.label_names, labels)} {count}')
+
+
+def _render_counter(lines, name, help_text, counter):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(counter.snapshot().items()):
+        lines.append(f'{name}{_labels(counter.label_names, labels)} {value}')
+
+
+def _render_values(lines, name, help_text, metric_type, values):
+    """values: list of (labels dict, value)."""
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {metric_type}')
+    for labels, value in values:
+        lines.append(f'{name}{_labels(labels.keys(), labels.values())} {value}')
+
+
+def render_metrics():
+    """Builds the Prometheus text exposition of this process's metrics."""
+    from .models.user import User
+    from .models.employee import Employee
+    from .models.leave import LeaveRequest
+    from . import leave_duration, logs, slow_queries, throttle
+
+    lines = []
+    _render_histogram(lines, 'hrms_http_request_duration_seconds',
+                      'Time spent handling HTTP requests, by endpoint and method.', request_durations)
+    _render_counter(lines, 'hrms_http_responses_total',
+                    'HTTP responses by endpoint, method and status code.', request_statuses)
+    _render_histogram(lines, 'hrms_mongo_command_duration_seconds',
+                      'MongoDB command latency, by collection and command.', command_metrics.durations)
+    _render_counter(lines, 'hrms_mongo_command_failures_total',
+                    'Failed MongoDB commands, by collection and command.', command_metrics.failures)
+
+    pool = pool_metrics.stats()
+    _render_values(lines, 'hrms_mongo_pool_connections_open', 'Open MongoDB connections.', 'gauge',
+                   [({}, pool['connections_open'])])
+    _render_values(lines, 'hrms_mongo_pool_checked_out', 'MongoDB connections currently in use.', 'gauge',
+                   [({}, pool['checked_out'])])
+    _render_values(lines, 'hrms_mongo_pool_checkouts_total', 'Successful MongoDB connection checkouts.', 'counter',
+                   [({}, pool['checkouts'])])
+    _render_values(lines, 'hrms_mongo_pool_checkout_failures_total',
+                   "Failed MongoDB connection checkouts by reason ('timeout' = pool exhausted).", 'counter',
+                   [({'reason': reason}, count) for reason, count in sorted(pool['checkout_failures'].items())])
+
+    caches = {
+        'user_loader': User.session_cache.stats(),
+        'employee_search': Employee.search_cache.stats(),
+        'leave_calendar': LeaveRequest.calendar_cache.stats(),
+        'holiday_calendars': leave_duration.cache_stats(),
+    }
+    _render_values(lines, 'hrms_cache_hits_total', 'In-process cache hits.', 'counter',
+                   [({'cache': name}, stats['hits']) for name, stats in caches.items()])
+    _render_values(lines, 'hrms_cache_misses_total', 'In-process cache misses.', 'counter',
+                   [({'cache': name}, stats['misses']) for name, stats in caches.items()])
+    _render_values(lines, 'hrms_cache_entries', 'In-process cache entries.', 'gauge',
+                   [({'cache': name}, stats['size']) for name, stats in caches.items()])
+
+    login = throttle.stats()
+    _render_values(lines, 'hrms_login_attempts_total', 'Login attempts seen by the throttle.', 'counter',
+                   [({}, login['attempts'])])
+    _render_values(lines, 'hrms_login_throttled_total', 'Login attempts rejected by the throttle, by limit.', 'counter',
+                   [({'limit': 'username'}, login['throttled_username']), ({'limit': 'ip'}, login['throttled_ip'])])
+
+    slow = slow_queries.stats()
+    _render_values(lines, 'hrms_slow_queries_total', 'Model queries slower than SLOW_QUERY_THRESHOLD_MS.', 'counter',
+                   [({}, slow['slow'])])
+    _render_values(lines, 'hrms_slow_query_explains_total', 'explain() captures of slow queries, by outcome.', 'counter',
+                   [({'outcome': 'captured'}, slow['explained']), ({'outcome': 'rate_limited'}, slow['explain_skipped']),
+                    ({'outcome': 'error'}, slow['explain_errors'])])
+
+    logging_stats = logs.stats()
+    _render_values(lines, 'hrms_log_queue_depth', 'Log records waiting for the writer thread.', 'gauge',
+                   [({}, logging_stats['queued'])])
+    _render_values(lines, 'hrms_log_records_dropped_total', 'Log records dropped because the log queue was full.',
+                   'counter', [({}, logging_stats['dropped'])])
+
+    _render_values(lines, 'hrms_process_info', 'Worker process serving this scrape.', 'gauge',
+                   [({'pid': os.getpid()}, 1)])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    """ Prometheus scrape endpoint. Protected by METRICS_TOKEN (optional in development). """
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        # Compared as bytes: compare_digest rejects str arguments with non-ASCII characters
+        if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+            abort(401)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """
+    Registers the request timing hooks and the /metrics endpoint (if METRICS_ENABLED, and
+    outside development only when METRICS_TOKEN is set).
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    if not app.config.get('METRICS_TOKEN') and not app.debug:
+        # Metrics expose endpoint names, collections and traffic; only serve them openly in development
+        log.warning("METRICS_TOKEN is not set; /metrics is disabled outside development.")
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    log.info("Metrics enabled at /metrics.")
@@ -0,0 +1,256 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, DeleteOne
+from .. import get_db, slow_queries
+from .. import leave_duration
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Department label for leave requests recorded without one
+UNASSIGNED_DEPARTMENT = 'Unassigned'
+
+
+class AbsenceReport:
+    # Absence analytics are served from a materialized rollup collection, 'absence_rollups',
+    # with one document per (department, month, leave_type) of Approved leave:
+    #   _id ({department, month, leave_type}), department (str), month ('YYYY-MM'), leave_type (str),
+    #   days (int) - working days of leave falling in the month, requests (int), employees (int),
+    #   refresh_id (ObjectId), refreshed_on (datetime)
+    # The rollup is written by an aggregation pipeline ending in $merge, using the department and
+    # the per-month working days stored on each leave request at creation (no join to employees).
+    # Months whose totals may have changed are queued in 'absence_rollup_dirty' ({_id: 'YYYY-MM'})
+    # when a request is approved or an approved request is cancelled, and only those months are
+    # recomputed by refresh_dirty().
+
+    @staticmethod
+    def get_collection():
+        db = get_db()
+        return db.absence_rollups
+
+    @staticmethod
+    def get_dirty_collection():
+        db = get_db()
+        return db.absence_rollup_dirty
+
+    @staticmethod
+    def months_between(start_date, end_date):
+        """Lists the 'YYYY-MM' months an inclusive date range touches."""
+        months = []
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            months.append(f'{year:04d}-{month:02d}')
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    @staticmethod
+    def mark_dirty(requests):
+        """Queues the months touched by these leave requests for the next refresh (one bulk_write)."""
+        months = set()
+        for req in requests:
+            if req.get('start_date') and req.get('end_date'):
+                months.update(AbsenceReport.months_between(req['start_date'], req['end_date']))
+        if not months:
+            return
+        now = datetime.utcnow()
+        ops = [UpdateOne({'_id': month}, {'$set': {'marked_on': now}}, upsert=True) for month in sorted(months)]
+        AbsenceReport.get_dirty_collection().bulk_write(ops, ordered=False)
+
+    @staticmethod
+    def rollup_pipeline(months, refresh_id, max_span_days, refreshed_on=None):
+        """
+        Builds the aggregation that recomputes the rollup documents of the given months
+        (all months if None) and $merges them into the rollup collection, stamped with
+        refresh_id and refreshed_on (the start of the refresh). An existing row is only
+        replaced if it was not written by a refresh that started later.
+        """
+        match = {'status': 'Approved', 'days_by_month': {'$exists': True}}
+        if months:
+            first = datetime.strptime(min(months), '%Y-%m')
+            last = datetime.strptime(max(months), '%Y-%m')
+            last_day = (last.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+            # Same bounded overlap range as the leave calendar: served by the (status, start_date, end_date) index
+            match['start_date'] = {'$gte': first - timedelta(days=max_span_days), '$lte': last_day}
+            match['end_date'] = {'$gte': first}
+
+        pipeline = [
+            {'$match': match},
+            {'$project': {
+                'user_id': 1,
+                'leave_type': 1,
+                'department': {'$ifNull': ['$department', UNASSIGNED_DEPARTMENT]},
+                'months': {'$objectToArray': '$days_by_month'},
+            }},
+            {'$unwind': '$months'},
+        ]
+        if months:
+            pipeline.append({'$match': {'months.k': {'$in': sorted(months)}}})
+        pipeline += [
+            {'$group': {
+                '_id': {'department': '$department', 'month': '$months.k', 'leave_type': '$leave_type'},
+                'days': {'$sum': '$months.v'},
+                'requests': {'$sum': 1},
+                'employees': {'$addToSet': '$user_id'},
+            }},
+            {'$project': {
+                '_id': 1,
+                'department': '$_id.department',
+                'month': '$_id.month',
+                'leave_type': '$_id.leave_type',
+                'days': 1,
+                'requests': 1,
+                'employees': {'$size': '$employees'},
+                'refresh_id': {'$literal': refresh_id},
+                'refreshed_on': {'$literal': refreshed_on or datetime.utcnow()},
+            }},
+            # Keep a row written by a refresh that started later than this one (it saw newer data)
+            {'$merge': {'into': 'absence_rollups', 'on': '_id', 'whenNotMatched': 'insert', 'whenMatched': [
+                {'$replaceWith': {'$cond': [{'$gt': ['$refreshed_on', '$$new.refreshed_on']}, '$$ROOT', '$$new']}},
+            ]}},
+        ]
+        return pipeline
+
+    @staticmethod
+    def refresh(months=None, max_span_days=366):
+        """
+        Recomputes the rollup for the given 'YYYY-MM' months (or everything if None).
+
+        Rows are stamped with the refresh's start time. When refreshes of the same months
+        overlap, the one that started last wins: the merge does not replace a row written
+        by a later-starting refresh, and groups that no longer have any approved leave
+        (e.g. the only request was cancelled) are removed after the merge only if they were
+        last written by a refresh that started before this one. One case is not covered: a
+        refresh still running when a later one removed a group can insert that group again,
+        and it stays until the month is refreshed again. (Start times come from the app
+        hosts' clocks, which should be kept in sync.)
+
+        Returns:
+            int: Number of rollup documents now stored for those months.
+        """
+        months = sorted(set(months)) if months is not None else None
+        if months == []:
+            return 0
+        collection = AbsenceReport.get_collection()
+        refresh_id = ObjectId()
+        run_started = datetime.utcnow()
+        get_db().leave_requests.aggregate(AbsenceReport.rollup_pipeline(months, refresh_id, max_span_days, run_started))
+
+        scope = {'month': {'$in': months}} if months else {}
+        stale = collection.delete_many({**scope, '$or': [{'refreshed_on': {'$lt': run_started}},
+                                                         {'refreshed_on': {'$exists': False}}]})
+        count = collection.count_documents(scope)
+        log.info(f"Refreshed absence rollups for {len(months) if months else 'all'} month(s): "
+                 f"{count} group(s), {stale.deleted_count} removed.")
+        return count
+
+    @staticmethod
+    def refresh_dirty(max_span_days=366):
+        """
+        Refreshes the months queued by mark_dirty. A month re-marked while the refresh
+        runs stays queued for the next one.
+
+        Returns:
+            int: Number of months refreshed.
+        """
+        dirty = AbsenceReport.get_dirty_collection()
+        queued = list(dirty.find({}))
+        if not queued:
+            return 0
+        AbsenceReport.refresh([doc['_id'] for doc in queued], max_span_days=max_span_days)
+        dirty.bulk_write([DeleteOne({'_id': doc['_id'], 'marked_on': {'$lte': doc['marked_on']}}) for doc in queued],
+                         ordered=False)
+        return len(queued)
+
+    @staticmethod
+    def backfill_days_by_month(batch_size=1000):
+        """
+        Stores 'days_by_month' on Approved leave requests created before it was recorded,
+        computed with the current holiday calendars. Run before a full refresh.
+
+        Returns:
+            int: Number of requests updated.
+        """
+        requests = get_db().leave_requests
+        projection = {'start_date': 1, 'end_date': 1, 'region': 1}
+        cursor = requests.find({'status': 'Approved', 'days_by_month': {'$exists': False}}, projection,
+                               batch_size=batch_size)
+        updated = 0
+
+        def flush(chunk):
+            splits = leave_duration.business_days_for_requests(chunk, unit='M')
+            ops = [UpdateOne({'_id': req['_id']}, {'$set': {'days_by_month': days}})
+                   for req, days in zip(chunk, splits)]
+            if ops:
+                requests.bulk_write(ops, ordered=False)
+            return len(ops)
+
+        chunk = []
+        for req in cursor:
+            chunk.append(req)
+            if len(chunk) >= batch_size:
+                updated += flush(chunk)
+                chunk = []
+        updated += flush(chunk)
+        log.info(f"Backfilled days_by_month on {updated} leave request(s).")
+        return updated
+
+    @staticmethod
+    def find_rollups(year, department=None):
+        """ Reads a year's rollup documents (optionally for one department), served by the (month, department) index. """
+        query = {'month': {'$gte': f'{year:04d}-01', '$lte': f'{year:04d}-12'}}
+        if department:
+            query['department'] = department
+        return slow_queries.find(AbsenceReport.get_collection(), query, {'refresh_id': 0}, source='AbsenceReport.find_rollups')
+
+    @staticmethod
+    def headcounts():
+        """ Active employees per department, as {department: count}. """
+        pipeline = [
+            {'$match': {'status': 'active'}},
+            {'$group': {'_id': {'$ifNull': ['$department', UNASSIGNED_DEPARTMENT]}, 'count': {'$sum': 1}}},
+        ]
+        docs = slow_queries.aggregate(get_db().employees, pipeline, source='AbsenceReport.headcounts')
+        return {doc['_id']: doc['count'] for doc in docs}
+
+    @staticmethod
+    def year_report(year, department=None, region=None):
+        """
+        Builds the absence report of a year from the rollup collection.
+
+        The absence rate of a department and month is leave days divided by
+        (current active headcount x working days in the month of the given holiday region).
+
+        Returns:
+            dict: {'months': ['YYYY-01', ...], 'leave_types': [...],
+                   'departments': [{'department', 'headcount', 'days': {month: n},
+                                    'rates': {month: pct or None}, 'total_days'}],
+                   'by_type': {leave_type: {month: days}}, 'trend': {month: days}}
+        """
+        months = [f'{year:04d}-{m:02d}' for m in range(1, 13)]
+        starts = [datetime(year, m, 1) for m in range(1, 13)]
+        ends = [(start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1) for start in starts]
+        working_days = dict(zip(months, leave_duration.business_days_array(starts, ends, region).tolist()))
+        headcounts = AbsenceReport.headcounts()
+
+        departments = {}
+        by_type = {}
+        trend = dict.fromkeys(months, 0)
+        for doc in AbsenceReport.find_rollups(year, department):
+            row = departments.setdefault(doc['department'], dict.fromkeys(months, 0))
+            row[doc['month']] += doc['days']
+            by_type.setdefault(doc['leave_type'], dict.fromkeys(months, 0))[doc['month']] += doc['days']
+            trend[doc['month']] += doc['days']
+
+        rows = []
+        for name in sorted(departments):
+            days = departments[name]
+            headcount = headcounts.get(name, 0)
+            rates = {}
+            for month in months:
+                capacity = headcount * working_days[month]
+                rates[month] = round(100.0 * days[month] / capacity, 2) if capacity else None
+            rows.append({'department': name, 'headcount': headcount, 'days': days, 'rates': rates,
+                         'total_days': sum(days.values())})
+        return {'months': months, 'leave_types': sorted(by_type), 'departments': rows,
+                'by_type': by_type, 'trend': trend}
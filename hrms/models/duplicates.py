@@ -0,0 +1,22 @@
+# hrms/models/duplicates.py
+
+def duplicate_field(error, unique_index_fields):
+    """
+    Maps a duplicate key error (a DuplicateKeyError's details or a bulk writeError entry)
+    to the field that collided. Returns None if it cannot be determined.
+
+    Args:
+        error (dict): The error details; 'keyPattern' is used when the server reports it,
+            otherwise the index name in 'errmsg'.
+        unique_index_fields (dict): Unique index name -> field, for the collection written.
+    """
+    if not error:
+        return None
+    key_pattern = error.get('keyPattern')
+    if key_pattern:
+        return next(iter(key_pattern))
+    errmsg = error.get('errmsg', '')
+    for index_name, field in unique_index_fields.items():
+        if f"index: {index_name}" in errmsg:
+            return field
+    return None
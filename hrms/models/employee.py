@@ -1,12 +1,30 @@
 from bson import ObjectId
 from datetime import datetime
-from .. import get_db
+import re
+import unicodedata
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from .. import get_db, slow_queries
+from ..cache import TTLCache, MISSING
+from .duplicates import duplicate_field
+from .pagination import fetch_keyset_page
+
+
+def normalize_search_text(value):
+    """Lowercases, strips accents and collapses whitespace, e.g. ' José  Díaz ' -> 'jose diaz'."""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.lower().split())
+
 
 class Employee:
     # Define fields relevant to an employee
     # Basic example:
     # Personal Info: first_name, last_name, dob, gender, contact_no, email, address
-    # Job Info: employee_id (unique), department, designation, date_of_joining, manager_id (optional ObjectId)
+    # Job Info: employee_id (unique), department, designation, date_of_joining, manager_id (optional ObjectId),
+    #           region (optional office/holiday calendar code, see hrms/leave_duration.py)
     # Status: status (active, inactive, terminated)
     # Potentially link to User model: user_id (ObjectId) if employees can log in
 
@@ -22,18 +40,210 @@ class Employee:
         # Add validation logic here
         data['date_added'] = datetime.utcnow()
         data['last_updated'] = datetime.utcnow()
+        data['search_keys'] = Employee.build_search_keys(data)
         result = collection.insert_one(data)
+        Employee.search_cache.clear()
         return str(result.inserted_id)
 
+    # --- Typeahead search ---
+    # Fields covered by search; their normalized values are kept in 'search_keys'
+    SEARCH_FIELDS = ['first_name', 'last_name', 'email', 'employee_code', 'department']
+    SEARCH_PROJECTION = {'first_name': 1, 'last_name': 1, 'email': 1, 'employee_code': 1, 'department': 1}
+    SEARCH_MAX_RESULTS = 10
+
+    # Per-process cache of recent search results, keyed by (normalized term, limit).
+    # Replaced with configured sizes by create_app (see configure_search_cache).
+    search_cache = TTLCache(maxsize=512, ttl=30)
+
+    @staticmethod
+    def configure_search_cache(maxsize, ttl):
+        """Replaces the search result cache with one of the given size/TTL."""
+        Employee.search_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def build_search_keys(doc):
+        """
+        Builds the normalized keys that prefix searches run against: each searchable
+        field, the full name in both orders, and every individual word, so that
+        'smi', 'john smi', 'eng' and 'emp-00' all hit the emp_search_keys_idx index.
+        """
+        keys = set()
+        first = normalize_search_text(doc.get('first_name'))
+        last = normalize_search_text(doc.get('last_name'))
+        if first and last:
+            keys.add(f"{first} {last}")
+            keys.add(f"{last} {first}")
+        for field in Employee.SEARCH_FIELDS:
+            value = normalize_search_text(doc.get(field))
+            if value:
+                keys.add(value)
+                keys.update(value.split(' '))
+        return sorted(keys)
+
+    @staticmethod
+    def search(term, limit=None):
+        """
+        Typeahead search over name, email, employee code and department.
+
+        Runs an anchored prefix match on the normalized 'search_keys' (an index range
+        scan), topped up with whole-word $text matches when there are too few hits.
+        Results are capped, projected to the display fields and cached per process.
+
+        Args:
+            term (str): What the user has typed so far.
+            limit (int, optional): Maximum results (capped at SEARCH_MAX_RESULTS).
+
+        Returns:
+            list: Projected employee documents (may be empty).
+        """
+        limit = max(1, min(limit or Employee.SEARCH_MAX_RESULTS, Employee.SEARCH_MAX_RESULTS))
+        normalized = normalize_search_text(term)
+        if not normalized:
+            return []
+
+        cache_key = (normalized, limit)
+        cached = Employee.search_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
+        collection = Employee.get_collection()
+        # Anchored, case-sensitive regex on lowercase keys -> bounded index scan
+        prefix_query = {'search_keys': {'$regex': '^' + re.escape(normalized)}}
+        # No explicit sort: walking the index in key order lets the limit stop the scan early
+        results = slow_queries.find(collection, prefix_query, Employee.SEARCH_PROJECTION, limit=limit,
+                                    source='Employee.search')
+
+        if len(results) < limit and len(normalized) >= 3:
+            seen_ids = [doc['_id'] for doc in results]
+            text_query = {'$text': {'$search': normalized}, '_id': {'$nin': seen_ids}}
+            projection = dict(Employee.SEARCH_PROJECTION, score={'$meta': 'textScore'})
+            text_results = slow_queries.find(collection, text_query, projection, sort=[('score', {'$meta': 'textScore'})],
+                                             limit=limit - len(results), source='Employee.search')
+            for doc in text_results:
+                doc.pop('score', None)
+                results.append(doc)
+
+        Employee.search_cache.set(cache_key, results)
+        return results
+
+    @staticmethod
+    def rebuild_search_keys(batch_size=1000):
+        """
+        Backfills 'search_keys' for all employees (e.g. records created before search existed).
+        Returns the number of documents updated.
+        """
+        collection = Employee.get_collection()
+        projection = {field: 1 for field in Employee.SEARCH_FIELDS}
+        updated = 0
+        ops = []
+        for doc in collection.find({}, projection, batch_size=batch_size):
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {'search_keys': Employee.build_search_keys(doc)}}))
+            if len(ops) >= batch_size:
+                updated += collection.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+        Employee.search_cache.clear()
+        return updated
+
+    # Unique indexes (see initialize_database) and the field each one protects
+    UNIQUE_INDEX_FIELDS = {
+        'emp_code_uniq_idx': 'employee_code',
+        'emp_email_uniq_idx': 'email',
+    }
+
+    @staticmethod
+    def duplicate_field(error):
+        """
+        Maps a duplicate key error (a DuplicateKeyError's details or a bulk writeError entry)
+        to the employee field that collided. Returns None if it cannot be determined.
+        """
+        return duplicate_field(error, Employee.UNIQUE_INDEX_FIELDS)
+
+    @staticmethod
+    def bulk_create(docs):
+        """
+        Inserts many employee documents with a single unordered bulk_write.
+
+        Uniqueness is enforced by the unique indexes instead of per-row lookups; rows
+        that collide are reported back rather than aborting the batch.
+
+        Args:
+            docs (list): Employee documents (already validated).
+
+        Returns:
+            tuple: (inserted_count, errors) where errors is a list of
+                   {'index': position in docs, 'code': int, 'field': str|None, 'message': str}
+        """
+        if not docs:
+            return 0, []
+        collection = Employee.get_collection()
+        now = datetime.utcnow()
+        for doc in docs:
+            doc['date_added'] = now
+            doc['last_updated'] = now
+            doc['search_keys'] = Employee.build_search_keys(doc)
+        Employee.search_cache.clear()
+        try:
+            result = collection.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+            return result.inserted_count, []
+        except BulkWriteError as e:
+            errors = [{
+                'index': err['index'],
+                'code': err.get('code'),
+                'field': Employee.duplicate_field(err) if err.get('code') == 11000 else None,
+                'message': err.get('errmsg', ''),
+            } for err in e.details.get('writeErrors', [])]
+            return e.details.get('nInserted', 0), errors
+
     @staticmethod
     def find_all(query={}, projection=None, sort=None):
         """ Finds multiple employees based on query. """
         collection = Employee.get_collection()
-        cursor = collection.find(query, projection)
-        if sort:
-             # sort should be a list of tuples, e.g., [('last_name', 1)]
-             cursor = cursor.sort(sort)
-        return list(cursor) # Convert cursor to list
+        # sort should be a list of tuples, e.g., [('last_name', 1)]
+        return slow_queries.find(collection, query, projection, sort=sort, source='Employee.find_all')
+
+    # Sort order of the employee list; must match 'emp_name_keyset_idx' in initialize_database
+    LIST_SORT = [('last_name', 1), ('first_name', 1), ('_id', 1)]
+
+    @staticmethod
+    def find_page(query=None, page_size=25, after=None, before=None, projection=None):
+        """
+        Finds one page of employees ordered by name using keyset (cursor) pagination.
+
+        Args:
+            query (dict, optional): Additional filter.
+            page_size (int): Number of employees per page.
+            after (str, optional): Opaque cursor returned as 'next_cursor' by a previous call.
+            before (str, optional): Opaque cursor returned as 'prev_cursor' by a previous call.
+            projection (dict, optional): Fields to return.
+
+        Returns:
+            dict: {'items': [...], 'next_cursor': str|None, 'prev_cursor': str|None}
+
+        Raises:
+            InvalidCursor: If a cursor cannot be decoded.
+        """
+        collection = Employee.get_collection()
+        return fetch_keyset_page(collection, query or {}, Employee.LIST_SORT, page_size,
+                                 projection=projection, after=after, before=before, source='Employee.find_page')
+
+    # Fields offered by the employee export, in default column order
+    EXPORT_FIELDS = ['_id', 'employee_code', 'first_name', 'last_name', 'email', 'department',
+                     'designation', 'date_of_joining', 'contact_no', 'status', 'date_added', 'last_updated']
+
+    @staticmethod
+    def export_cursor(query=None, fields=None, batch_size=1000):
+        """
+        Returns a live, projected cursor over employees for streaming exports.
+        The cursor is NOT materialized into a list; the caller must iterate and close it.
+        """
+        collection = Employee.get_collection()
+        fields = fields or Employee.EXPORT_FIELDS
+        projection = {f: 1 for f in fields}
+        if '_id' not in fields:
+            projection['_id'] = 0
+        return collection.find(query or {}, projection, batch_size=batch_size)
 
     @staticmethod
     def find_by_id(employee_id):
@@ -59,10 +269,19 @@ class Employee:
         data.pop('date_added', None)
         data['last_updated'] = datetime.utcnow()
         try:
+            if any(field in data for field in Employee.SEARCH_FIELDS):
+                # Partial updates need the stored values of the other searchable fields
+                if not all(field in data for field in Employee.SEARCH_FIELDS):
+                    current = collection.find_one({'_id': ObjectId(employee_id)},
+                                                  {field: 1 for field in Employee.SEARCH_FIELDS}) or {}
+                    data['search_keys'] = Employee.build_search_keys({**current, **data})
+                else:
+                    data['search_keys'] = Employee.build_search_keys(data)
             result = collection.update_one(
                 {'_id': ObjectId(employee_id)},
                 {'$set': data}
             )
+            Employee.search_cache.clear()
             return result.modified_count > 0 # Return True if updated, False otherwise
         except Exception:
             return False
@@ -74,8 +293,72 @@ class Employee:
         collection = Employee.get_collection()
         try:
             result = collection.delete_one({'_id': ObjectId(employee_id)})
+            Employee.search_cache.clear()
             return result.deleted_count > 0 # Return True if deleted
         except Exception:
             return False
 
-    # Add methods for specific queries: find_by_department, find_by_manager etc.
\ No newline at end of file
+    # --- Reporting hierarchy ---
+    # An employee's 'manager_id' is the _id of the manager's employee record; the
+    # manager's login account is found through that record's 'user_id' link (or email).
+
+    @staticmethod
+    def find_for_user(user_id, email=None, projection=None):
+        """ Finds the employee record linked to a user account (by user_id, falling back to email). """
+        collection = Employee.get_collection()
+        emp = collection.find_one({'user_id': ObjectId(user_id)}, projection)
+        if not emp and email:
+            emp = collection.find_one({'email': email}, projection)
+        return emp
+
+    @staticmethod
+    def find_by_manager(manager_employee_id, projection=None):
+        """ Finds the direct reports of a manager (by the manager's employee _id). """
+        collection = Employee.get_collection()
+        return slow_queries.find(collection, {'manager_id': ObjectId(manager_employee_id)}, projection,
+                                 source='Employee.find_by_manager')
+
+    @staticmethod
+    def leave_context(user_id):
+        """
+        Resolves what a leave request needs to know about its requester, walking
+        user -> employee record -> manager's employee record -> manager's user.
+
+        Returns:
+            dict: {'approver_id': manager's user _id, 'region': str, 'department': str};
+                  values are None where a link in the chain is missing.
+        """
+        context = {'approver_id': None, 'region': None, 'department': None}
+        db = get_db()
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'email': 1})
+        if not user:
+            return context
+        emp = Employee.find_for_user(user_id, user.get('email'), {'manager_id': 1, 'region': 1, 'department': 1})
+        if not emp:
+            return context
+        context['region'] = emp.get('region')
+        context['department'] = emp.get('department')
+        if not emp.get('manager_id'):
+            return context
+        manager = Employee.get_collection().find_one({'_id': ObjectId(emp['manager_id'])}, {'user_id': 1, 'email': 1})
+        if not manager:
+            return context
+        if manager.get('user_id'):
+            context['approver_id'] = ObjectId(manager['user_id'])
+        elif manager.get('email'):
+            manager_user = db.users.find_one({'email': manager['email']}, {'_id': 1})
+            context['approver_id'] = manager_user['_id'] if manager_user else None
+        return context
+
+    @staticmethod
+    def resolve_manager_user_id(user_id):
+        """ The user _id of a requester's manager, or None if any link in the chain is missing. """
+        return Employee.leave_context(user_id)['approver_id']
+
+    @staticmethod
+    def region_for_user(user_id, email=None):
+        """ The holiday-calendar region (office) of a user's employee record, or None. """
+        emp = Employee.find_for_user(user_id, email, {'region': 1})
+        return emp.get('region') if emp else None
+
+    # Add methods for specific queries: find_by_department etc.
\ No newline at end of file
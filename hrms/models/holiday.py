@@ -0,0 +1,53 @@
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from .. import get_db, slow_queries
+
+
+class Holiday:
+    # Fields: region (str, e.g. 'default', 'IN-BLR', 'US-NY'), date (datetime, midnight UTC),
+    # name (str), date_added (datetime)
+    # A region's calendar is the set of its holiday dates; working days per week come
+    # from Config.WORKWEEK_MASKS. See hrms/leave_duration.py for how they are used.
+
+    @staticmethod
+    def get_collection():
+        db = get_db()
+        return db.holidays
+
+    @staticmethod
+    def add(region, date, name):
+        """ Adds a holiday to a region's calendar. Returns False if that date already exists. """
+        collection = Holiday.get_collection()
+        day = datetime(date.year, date.month, date.day)
+        try:
+            collection.insert_one({'region': region, 'date': day, 'name': name, 'date_added': datetime.utcnow()})
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @staticmethod
+    def remove(region, date):
+        """ Removes a holiday from a region's calendar. """
+        collection = Holiday.get_collection()
+        day = datetime(date.year, date.month, date.day)
+        return collection.delete_one({'region': region, 'date': day}).deleted_count > 0
+
+    @staticmethod
+    def find_by_region(region, start=None, end=None):
+        """ Lists a region's holidays (optionally within [start, end]), oldest first. """
+        collection = Holiday.get_collection()
+        query = {'region': region}
+        if start or end:
+            query['date'] = {}
+            if start:
+                query['date']['$gte'] = start
+            if end:
+                query['date']['$lte'] = end
+        return slow_queries.find(collection, query, {'_id': 0, 'date': 1, 'name': 1}, sort=[('date', 1)],
+                                 source='Holiday.find_by_region')
+
+    @staticmethod
+    def dates_for_region(region):
+        """ All holiday dates of a region, as datetimes (served by the region/date index). """
+        collection = Holiday.get_collection()
+        return [doc['date'] for doc in collection.find({'region': region}, {'_id': 0, 'date': 1})]
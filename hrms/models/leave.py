@@ -1,14 +1,33 @@
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+import calendar
+from pymongo import UpdateOne, UpdateMany, ReturnDocument
 from .. import get_db
+from .employee import Employee
+from .leave_balance import LeaveBalance
+from .absence_report import AbsenceReport
+from .. import leave_duration, slow_queries
+from ..cache import TTLCache, MISSING
+from .pagination import fetch_keyset_page
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
 
 class LeaveRequest:
     # Fields: user_id (ObjectId), employee_id (ObjectId, if different from user),
     # leave_type (e.g., 'Annual', 'Sick', 'Unpaid'),
     # start_date (datetime), end_date (datetime), reason (string),
     # status ('Pending', 'Approved', 'Rejected', 'Cancelled'),
-    # requested_on (datetime), approved_by (ObjectId, optional), approved_on (datetime, optional),
-    # comments (string, optional)
+    # requested_on (datetime), approved_by (ObjectId, optional), approved_on (datetime, optional) - who
+    #   approved/rejected the request and when, cancelled_by (ObjectId, optional), cancelled_on (datetime, optional),
+    # comments (string, optional),
+    # approver_id (ObjectId, optional) - user _id of the requester's manager, resolved through the
+    #   employee hierarchy when the request is created; None means only HR/admin can see it
+    # region (str, optional) - requester's holiday calendar region at request time
+    # department (str, optional) - requester's department at request time (for team calendars)
+    # duration_days (int), days_by_year ({'2026': int}), days_by_month ({'2026-03': int}) - working days,
+    #   computed once at creation (days_by_month feeds the absence rollups, see AbsenceReport)
 
     @staticmethod
     def get_collection():
@@ -16,16 +35,53 @@ class LeaveRequest:
         return db.leave_requests
 
     @staticmethod
-    def create(data):
-        """ Creates a new leave request. """
+    def create(data, entitlements=None):
+        """
+        Creates a new leave request and reserves its days in the balance ledger.
+
+        Args:
+            data (dict): The request fields.
+            entitlements (dict, optional): {leave_type: days per year, or None for unlimited}.
+                When the request's type has an entitlement, the days are reserved with
+                LeaveBalance.reserve before the request is stored.
+
+        Raises:
+            InsufficientBalance: If the request would overdraw the balance (nothing is stored).
+        """
         collection = LeaveRequest.get_collection()
         # Add validation! Ensure dates are valid, user exists, etc.
         data['requested_on'] = datetime.utcnow()
         data['status'] = 'Pending' # Initial status
+        if data.get('user_id') and not all(key in data for key in ('approver_id', 'region', 'department')):
+            # Denormalized so each manager's queue and each team/department calendar is a
+            # single index range scan
+            context = Employee.leave_context(data['user_id'])
+            for key, value in context.items():
+                data.setdefault(key, value)
+        # Working days are stored so later ledger transitions reverse exactly what was booked,
+        # even if the holiday calendar changes in between
+        days_by_year = leave_duration.business_days_by_year(data.get('start_date'), data.get('end_date'), data.get('region'))
+        data['days_by_year'] = {str(year): days for year, days in days_by_year.items()}
+        data['duration_days'] = sum(days_by_year.values())
+        data['days_by_month'] = leave_duration.business_days_by_month(data.get('start_date'), data.get('end_date'),
+                                                                      data.get('region'))
         # Convert date strings to datetime objects if needed
         # data['start_date'] = datetime.strptime(data['start_date'], '%Y-%m-%d')
         # data['end_date'] = datetime.strptime(data['end_date'], '%Y-%m-%d')
-        result = collection.insert_one(data)
+        entitlement = (entitlements or {}).get(data.get('leave_type'))
+        if entitlement is not None and data.get('user_id'):
+            # Reserve first (atomically checked against the balance), release it if the insert fails
+            LeaveBalance.reserve(data, entitlement)
+            try:
+                result = collection.insert_one(data)
+            except Exception:
+                LeaveBalance.apply_transition(data, data['status'], None)
+                raise
+        else:
+            result = collection.insert_one(data)
+            # Reserve the days in the balance ledger
+            LeaveBalance.apply_transition(data, None, data['status'])
+        LeaveRequest.invalidate_calendar([data])
         return str(result.inserted_id)
 
     @staticmethod
@@ -33,22 +89,219 @@ class LeaveRequest:
         """ Finds leave requests for a specific user. """
         collection = LeaveRequest.get_collection()
         query = {'user_id': ObjectId(user_id)}
-        cursor = collection.find(query)
-        if sort:
-             cursor = cursor.sort(sort)
-        return list(cursor)
+        return slow_queries.find(collection, query, sort=sort, source='LeaveRequest.find_by_user')
+
+    # Sort order of a user's leave history; must match 'leave_user_history_idx' in initialize_database
+    HISTORY_SORT = [('requested_on', -1), ('_id', -1)]
+
+    @staticmethod
+    def find_history_page(user_id, status=None, leave_type=None, date_from=None, date_to=None,
+                          page_size=25, after=None, before=None):
+        """
+        Finds one page of a user's leave history, newest first, using keyset pagination.
+
+        Args:
+            user_id: The requester.
+            status (str, optional), leave_type (str, optional): Exact-match filters.
+            date_from, date_to (datetime, optional): Only requests whose leave starts in this range (inclusive days).
+            page_size (int), after (str), before (str): See pagination.fetch_keyset_page.
+
+        Returns:
+            dict: {'items': [...], 'next_cursor': str|None, 'prev_cursor': str|None}
+
+        Raises:
+            InvalidCursor: If a cursor cannot be decoded.
+        """
+        query = {'user_id': ObjectId(user_id)}
+        if status:
+            query['status'] = status
+        if leave_type:
+            query['leave_type'] = leave_type
+        if date_from or date_to:
+            query['start_date'] = {}
+            if date_from:
+                query['start_date']['$gte'] = date_from
+            if date_to:
+                query['start_date']['$lt'] = date_to + timedelta(days=1)
+        return fetch_keyset_page(LeaveRequest.get_collection(), query, LeaveRequest.HISTORY_SORT, page_size,
+                                 after=after, before=before, source='LeaveRequest.find_history_page')
+
+    # Fields offered by the leave export, in default column order
+    EXPORT_FIELDS = ['_id', 'user_id', 'leave_type', 'start_date', 'end_date', 'duration_days', 'status',
+                     'requested_on', 'approved_by', 'approved_on', 'reason', 'comments']
+
+    @staticmethod
+    def export_cursor(query=None, fields=None, batch_size=1000):
+        """
+        Returns a live, projected cursor over leave requests for streaming exports.
+        The cursor is NOT materialized into a list; the caller must iterate and close it.
+        """
+        collection = LeaveRequest.get_collection()
+        fields = fields or LeaveRequest.EXPORT_FIELDS
+        projection = {f: 1 for f in fields}
+        if '_id' not in fields:
+            projection['_id'] = 0
+        return collection.find(query or {}, projection, batch_size=batch_size)
 
     @staticmethod
     def find_pending_approvals(manager_id=None):
-        """ Finds leave requests needing approval. """
-        # This logic depends on your org structure (who approves?)
-        # Simplistic: Find all 'Pending' requests
+        """
+        Finds leave requests needing approval, oldest first.
+
+        With a manager_id (user _id), only requests whose approver is that manager are
+        returned - served by leave_status_approver_requested_idx. Without one (HR/admin),
+        every pending request is returned - served by leave_status_requested_idx.
+        """
+        collection = LeaveRequest.get_collection()
+        query = {'status': 'Pending'}
+        if manager_id:
+            query['approver_id'] = ObjectId(manager_id)
+        return slow_queries.find(collection, query, sort=[('requested_on', 1)], # Sort by oldest first
+                                 source='LeaveRequest.find_pending_approvals')
+
+    @staticmethod
+    def assign_approvers(user_ids=None, batch_size=500, only_missing=False):
+        """
+        (Re)resolves 'approver_id' on pending requests through the employee hierarchy,
+        e.g. after a reporting line changes or for requests created before approvers existed.
+
+        Args:
+            user_ids (list, optional): Only re-resolve requests of these requesters.
+            batch_size (int): Updates per bulk_write.
+            only_missing (bool): Only resolve requests that have no 'approver_id' field yet
+                (run by 'flask migrate-db' for requests created before approvers existed).
+
+        Returns:
+            int: Number of requests whose approver changed.
+        """
         collection = LeaveRequest.get_collection()
         query = {'status': 'Pending'}
-        # If manager specific approval needed, query based on manager_id associated with the requesting employee
-        # Add logic here based on Employee model structure (e.g., employee['manager_id'] == manager_id)
-        cursor = collection.find(query).sort([('requested_on', 1)]) # Sort by oldest first
-        return list(cursor)
+        if user_ids is not None:
+            query['user_id'] = {'$in': [ObjectId(uid) for uid in user_ids]}
+        if only_missing:
+            query['approver_id'] = {'$exists': False}
+
+        approver_cache = {} # requester user_id -> manager user_id, resolved once per requester
+        ops = []
+        moved = [] # Requests as routed before and after, for invalidating both teams' calendars
+        changed = 0
+
+        def flush():
+            result = collection.bulk_write(ops, ordered=False)
+            LeaveRequest.invalidate_calendar(moved)
+            return result.modified_count
+
+        projection = {'user_id': 1, 'approver_id': 1, 'start_date': 1, 'end_date': 1}
+        for req in collection.find(query, projection, batch_size=batch_size):
+            requester = req.get('user_id')
+            if requester not in approver_cache:
+                approver_cache[requester] = Employee.resolve_manager_user_id(requester) if requester else None
+            approver = approver_cache[requester]
+            if req.get('approver_id') != approver or 'approver_id' not in req:
+                ops.append(UpdateOne({'_id': req['_id'], 'status': 'Pending'}, {'$set': {'approver_id': approver}}))
+                moved.extend([req, dict(req, approver_id=approver)])
+            if len(ops) >= batch_size:
+                changed += flush()
+                ops, moved = [], []
+        if ops:
+            changed += flush()
+        return changed
+
+    @staticmethod
+    def backfill_departments(batch_size=500):
+        """
+        Stores the requester's department on leave requests created before it was
+        denormalized onto them, so department calendars include historical leave.
+        Requests of requesters without an employee record get department None, so
+        they are not looked at again.
+
+        The calendar cache of this process is cleared afterwards; other processes pick
+        the change up when their cached month views expire (CALENDAR_CACHE_TTL). The months
+        of the Approved requests that moved out of the 'Unassigned' department are queued
+        for the next absence rollup refresh.
+
+        Args:
+            batch_size (int): Requesters per bulk_write (one update_many each).
+
+        Returns:
+            int: Number of requests updated.
+        """
+        collection = LeaveRequest.get_collection()
+        query = {'department': {'$exists': False}}
+        approved = lambda field: {'$cond': [{'$eq': ['$status', 'Approved']}, field, None]}
+        requesters = collection.aggregate([
+            {'$match': query},
+            # The date range of each requester's Approved requests, for the rollup months to refresh
+            {'$group': {'_id': '$user_id', 'start_date': {'$min': approved('$start_date')},
+                        'end_date': {'$max': approved('$end_date')}}},
+        ], allowDiskUse=True)
+
+        ops = []
+        moved = [] # Approved date ranges whose rollup rows change department
+        updated = 0
+        for group in requesters:
+            requester = group['_id']
+            department = Employee.leave_context(requester)['department'] if requester else None
+            ops.append(UpdateMany(dict(query, user_id=requester), {'$set': {'department': department}}))
+            if department is not None and group.get('start_date') and group.get('end_date'):
+                moved.append(group)
+            if len(ops) >= batch_size:
+                updated += collection.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+        if updated:
+            LeaveRequest.calendar_cache.clear()
+        AbsenceReport.mark_dirty(moved)
+        log.info("Backfilled the department of %s leave request(s).", updated)
+        return updated
+
+    @staticmethod
+    def attach_requesters(requests):
+        """
+        Adds 'requester_username', 'requester_name' and 'requester_department' to each
+        leave request in place, using one batched $in query on 'users' and one on
+        'employees' for the whole list (instead of a lookup per request).
+
+        Employees are matched to users by their 'user_id' link, falling back to the
+        user's email address for employee records that were never linked.
+
+        Returns:
+            list: The same list, enriched.
+        """
+        user_ids = list({req['user_id'] for req in requests if req.get('user_id')})
+        if not user_ids:
+            return requests
+
+        db = get_db()
+        users = {u['_id']: u for u in slow_queries.find(db.users, {'_id': {'$in': user_ids}}, {'username': 1, 'email': 1},
+                                                        source='LeaveRequest.attach_requesters')}
+        emails = [u['email'] for u in users.values() if u.get('email')]
+
+        employees_by_user = {}
+        employees_by_email = {}
+        employee_query = {'$or': [{'user_id': {'$in': user_ids}}, {'email': {'$in': emails}}]}
+        employee_projection = {'user_id': 1, 'email': 1, 'first_name': 1, 'last_name': 1, 'department': 1}
+        for emp in slow_queries.find(db.employees, employee_query, employee_projection,
+                                     source='LeaveRequest.attach_requesters'):
+            if emp.get('user_id'):
+                employees_by_user[emp['user_id']] = emp
+            if emp.get('email'):
+                employees_by_email[emp['email']] = emp
+
+        for req in requests:
+            user = users.get(req.get('user_id'), {})
+            emp = employees_by_user.get(req.get('user_id')) or employees_by_email.get(user.get('email')) or {}
+            req['requester_username'] = user.get('username')
+            full_name = f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip()
+            req['requester_name'] = full_name or user.get('username')
+            req['requester_department'] = emp.get('department')
+        return requests
+
+    @staticmethod
+    def find_pending_approvals_enriched(manager_id=None):
+        """ Pending approvals with requester details attached (constant number of queries). """
+        return LeaveRequest.attach_requesters(LeaveRequest.find_pending_approvals(manager_id=manager_id))
 
     @staticmethod
     def find_by_id(request_id):
@@ -60,25 +313,291 @@ class LeaveRequest:
             return None
 
     @staticmethod
-    def update_status(request_id, status, approver_id=None, comments=None):
-        """ Updates the status of a leave request (Approve/Reject). """
+    def update_status(request_id, status, approver_id=None, comments=None, manager_id=None,
+                      from_statuses=None, user_id=None):
+        """
+        Updates the status of a leave request (Approve/Reject/Cancel) and moves its days
+        between the balance ledger buckets.
+
+        The status change is a conditional find_one_and_update that only matches when the
+        status actually changes, so concurrent clicks can't apply a ledger delta twice.
+
+        Args:
+            manager_id: If given, only applies when that manager is the request's approver.
+            from_statuses (list, optional): Only applies when the current status is one of these.
+            user_id: If given, only applies to that requester's own request (used for cancelling).
+
+        Approvals and rejections record approved_on/approved_by; cancelling records
+        cancelled_on/cancelled_by (user_id, or approver_id) and leaves the approval fields as they were.
+        """
+        collection = LeaveRequest.get_collection()
+        if status == 'Cancelled':
+            # Keep the approval fields: cancelling an approved request must not erase who approved it
+            update_data = {
+                'status': status,
+                'cancelled_on': datetime.utcnow(),
+                'cancelled_by': ObjectId(user_id or approver_id) if (user_id or approver_id) else None
+            }
+        else:
+            update_data = {
+                'status': status,
+                'approved_on': datetime.utcnow(),
+                'approved_by': ObjectId(approver_id) if approver_id else None
+            }
+        if comments:
+            update_data['comments'] = comments
+
+        try:
+            query = {'_id': ObjectId(request_id), 'status': {'$ne': status}}
+            if from_statuses:
+                query['status'] = {'$in': [s for s in from_statuses if s != status]}
+            if manager_id:
+                query['approver_id'] = ObjectId(manager_id)
+            if user_id:
+                query['user_id'] = ObjectId(user_id)
+            previous = collection.find_one_and_update(
+                query,
+                {'$set': update_data},
+                projection={'user_id': 1, 'leave_type': 1, 'start_date': 1, 'end_date': 1, 'status': 1,
+                            'region': 1, 'days_by_year': 1, 'department': 1, 'approver_id': 1,
+                            'approved_on': 1, 'approved_by': 1, 'comments': 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous is None:
+                return False
+            try:
+                LeaveBalance.apply_transition(previous, previous.get('status'), status)
+            except Exception as e:
+                # Put the request back as it was, so its status and the ledger stay consistent
+                log.error("Ledger update failed for leave request %s (%s -> %s); restoring its status: %s",
+                          request_id, previous.get('status'), status, e, exc_info=True)
+                restore = {key: previous[key] for key in update_data if key in previous}
+                restore['status'] = previous.get('status')
+                unset = {key: '' for key in update_data if key not in previous}
+                collection.update_one({'_id': previous['_id'], 'status': status},
+                                      dict({'$set': restore}, **({'$unset': unset} if unset else {})))
+                return False
+            LeaveRequest.invalidate_calendar([previous])
+            if 'Approved' in (previous.get('status'), status):
+                AbsenceReport.mark_dirty([previous])
+            return True
+        except Exception:
+             return False
+
+    # Per-item outcomes of bulk_decide
+    BULK_RESULT_MESSAGES = {
+        'ok': 'Done',
+        'invalid_id': 'Invalid request id',
+        'not_found': 'Request not found',
+        'not_pending': 'Request is no longer pending',
+        'not_permitted': 'You are not the approver of this request',
+        'failed': 'The leave balance could not be updated; the request is still pending',
+    }
+
+    @staticmethod
+    def bulk_decide(request_ids, status, approver_id, comments=None, manager_id=None):
+        """
+        Approves or rejects many pending requests in a constant number of round trips:
+        one $in read of the candidates, one unordered bulk_write of conditional updates
+        (status must still be 'Pending', and the approver must match for managers), one
+        read-back only if some updates lost a race, and one ledger bulk_write. If the ledger
+        write fails, the decided requests are put back to Pending and reported as 'failed'.
+
+        Args:
+            request_ids (list): Request id strings.
+            status (str): 'Approved' or 'Rejected'.
+            approver_id: User deciding.
+            comments (str, optional): Stored on every decided request.
+            manager_id: If given, only requests routed to this manager can be decided.
+
+        Returns:
+            dict: {request_id: result code} with codes from BULK_RESULT_MESSAGES.
+        """
         collection = LeaveRequest.get_collection()
+        results = dict.fromkeys(str(rid) for rid in request_ids) # De-duplicated, in input order
+        object_ids = {}
+        for rid in results:
+            try:
+                object_ids[ObjectId(rid)] = rid
+            except Exception:
+                results[rid] = 'invalid_id'
+        if not object_ids:
+            return results
+
+        projection = {'user_id': 1, 'leave_type': 1, 'start_date': 1, 'end_date': 1, 'status': 1,
+                      'region': 1, 'days_by_year': 1, 'approver_id': 1, 'department': 1,
+                      'approved_on': 1, 'approved_by': 1, 'comments': 1}
+        candidates = {doc['_id']: doc for doc in collection.find({'_id': {'$in': list(object_ids)}}, projection)}
+
+        decision_id = ObjectId() # Marks the documents this call actually changed
         update_data = {
             'status': status,
             'approved_on': datetime.utcnow(),
-            'approved_by': ObjectId(approver_id) if approver_id else None
+            'approved_by': ObjectId(approver_id) if approver_id else None,
+            'decision_id': decision_id,
         }
         if comments:
             update_data['comments'] = comments
 
+        ops = []
+        attempted = []
+        for oid, rid in object_ids.items():
+            doc = candidates.get(oid)
+            if doc is None:
+                results[rid] = 'not_found'
+            elif doc.get('status') != 'Pending':
+                results[rid] = 'not_pending'
+            elif manager_id and doc.get('approver_id') != ObjectId(manager_id):
+                results[rid] = 'not_permitted'
+            else:
+                query = {'_id': oid, 'status': 'Pending'}
+                if manager_id:
+                    query['approver_id'] = ObjectId(manager_id)
+                ops.append(UpdateOne(query, {'$set': update_data}))
+                attempted.append(oid)
+        if not ops:
+            return results
+
+        result = collection.bulk_write(ops, ordered=False)
+        if result.modified_count == len(ops):
+            applied = set(attempted)
+        else:
+            # Some requests changed status concurrently; find out which updates won
+            applied = {doc['_id'] for doc in collection.find({'decision_id': decision_id}, {'_id': 1})}
+
+        transitions = []
+        for oid in attempted:
+            if oid in applied:
+                results[object_ids[oid]] = 'ok'
+                transitions.append((candidates[oid], 'Pending', status))
+            else:
+                results[object_ids[oid]] = 'not_pending'
         try:
-            result = collection.update_one(
-                {'_id': ObjectId(request_id)},
-                {'$set': update_data}
-            )
-            return result.modified_count > 0
-        except Exception:
-             return False
+            LeaveBalance.apply_transitions(transitions)
+        except Exception as e:
+            # Put the decided requests back to Pending, as update_status does for one request
+            log.error("Ledger update failed for %d bulk %s leave request(s); restoring them to Pending: %s",
+                      len(transitions), status, e, exc_info=True)
+            restores = []
+            for request, _, _ in transitions:
+                restore = {key: request[key] for key in update_data if key in request}
+                restore['status'] = 'Pending'
+                unset = {key: '' for key in update_data if key not in request}
+                restores.append(UpdateOne({'_id': request['_id'], 'decision_id': decision_id},
+                                          dict({'$set': restore}, **({'$unset': unset} if unset else {}))))
+                results[object_ids[request['_id']]] = 'failed'
+            collection.bulk_write(restores, ordered=False)
+            return results
+        LeaveRequest.invalidate_calendar([req for req, _, _ in transitions])
+        if status == 'Approved':
+            AbsenceReport.mark_dirty([req for req, _, _ in transitions])
+        return results
+
+    @staticmethod
+    def cancel(request_id, user_id):
+        """ Cancels a user's own Pending or Approved request, releasing its days. """
+        return LeaveRequest.update_status(request_id, 'Cancelled', from_statuses=['Pending', 'Approved'],
+                                          user_id=user_id)
+
+    # --- Team / department leave calendar ---
+    # Statuses shown on the calendar (Pending ones are shown as tentative)
+    CALENDAR_STATUSES = ['Pending', 'Approved']
+    # Calendar scope -> field holding the scope key on a leave request
+    CALENDAR_SCOPES = {'department': 'department', 'team': 'approver_id'}
+
+    # Per-process cache of computed month views, keyed by (scope, key, year, month).
+    # Replaced with configured sizes by create_app (see configure_calendar).
+    calendar_cache = TTLCache(maxsize=256, ttl=120)
+    max_span_days = 366
+
+    @staticmethod
+    def configure_calendar(maxsize, ttl, max_span_days):
+        """Replaces the month view cache and sets the longest allowed request span."""
+        LeaveRequest.calendar_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        LeaveRequest.max_span_days = max_span_days
+
+    @staticmethod
+    def _months_between(start_date, end_date):
+        """Yields (year, month) for every month an inclusive date range touches."""
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @staticmethod
+    def invalidate_calendar(requests):
+        """Drops cached month views touched by these requests (department and team scopes)."""
+        for req in requests:
+            if not req.get('start_date') or not req.get('end_date'):
+                continue
+            keys = []
+            if req.get('department'):
+                keys.append(('department', req['department']))
+            if req.get('approver_id'):
+                keys.append(('team', str(req['approver_id'])))
+            for scope, key in keys:
+                for year, month in LeaveRequest._months_between(req['start_date'], req['end_date']):
+                    LeaveRequest.calendar_cache.invalidate((scope, key, year, month))
+
+    @staticmethod
+    def month_view(scope, key, year, month):
+        """
+        Who's out in a department or manager's team for one month.
+
+        The overlap query (start_date <= month end AND end_date >= month start) gets a lower
+        bound on start_date from the maximum request span, so it is a bounded range scan on
+        the (scope, start_date, end_date) index rather than a scan of all earlier leave.
+        Results are cached per process and invalidated when a request in the month changes.
+
+        Args:
+            scope (str): 'department' or 'team'.
+            key (str): Department name, or the manager's user id for 'team'.
+            year (int), month (int): The month to show.
+
+        Returns:
+            dict: JSON-ready {'scope', 'key', 'year', 'month', 'entries': [...],
+                  'days': {day_of_month: [entry index, ...]}}
+        """
+        cache_key = (scope, key, year, month)
+        cached = LeaveRequest.calendar_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
+        field = LeaveRequest.CALENDAR_SCOPES[scope]
+        month_start = datetime(year, month, 1)
+        month_end = datetime(year, month, calendar.monthrange(year, month)[1])
+        query = {
+            field: ObjectId(key) if scope == 'team' else key,
+            'start_date': {'$gte': month_start - timedelta(days=LeaveRequest.max_span_days), '$lte': month_end},
+            'end_date': {'$gte': month_start},
+            'status': {'$in': LeaveRequest.CALENDAR_STATUSES},
+        }
+        projection = {'user_id': 1, 'leave_type': 1, 'start_date': 1, 'end_date': 1, 'status': 1, 'department': 1}
+        collection = LeaveRequest.get_collection()
+        requests = LeaveRequest.attach_requesters(slow_queries.find(collection, query, projection, sort=[('start_date', 1)],
+                                                                    source='LeaveRequest.month_view'))
+
+        entries = []
+        days = {}
+        for req in requests:
+            first = max(req['start_date'], month_start)
+            last = min(req['end_date'], month_end)
+            index = len(entries)
+            entries.append({
+                'id': str(req['_id']),
+                'user_id': str(req.get('user_id')),
+                'name': req.get('requester_name') or str(req.get('user_id')),
+                'department': req.get('requester_department') or req.get('department'),
+                'leave_type': req.get('leave_type'),
+                'status': req.get('status'),
+                'start_date': req['start_date'].strftime('%Y-%m-%d'),
+                'end_date': req['end_date'].strftime('%Y-%m-%d'),
+            })
+            for day in range(first.day, last.day + 1):
+                days.setdefault(day, []).append(index)
+
+        view = {'scope': scope, 'key': key, 'year': year, 'month': month, 'entries': entries, 'days': days}
+        LeaveRequest.calendar_cache.set(cache_key, view)
+        return view
 
-    # Add method to cancel a request (by employee, if status is 'Pending')
-    # Add method to calculate leave days, check balance etc. (more complex)
\ No newline at end of file
+    # Leave days and balances live in LeaveBalance (models/leave_balance.py)
\ No newline at end of file
@@ -0,0 +1,255 @@
+from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from .. import get_db, slow_queries
+from .. import leave_duration
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Which ledger counter a leave request's days are held in, by request status.
+# Rejected/Cancelled requests hold no days.
+STATUS_BUCKETS = {
+    'Pending': 'pending',
+    'Approved': 'used',
+}
+
+
+class InsufficientBalance(Exception):
+    """Raised by LeaveBalance.reserve when a request would overdraw a year's balance."""
+
+
+class LeaveBalance:
+    # One ledger document per (user_id, year, leave_type):
+    #   used (number)    - days of Approved requests
+    #   pending (number) - days of Pending requests (reserved, not yet used)
+    #   updated_on (datetime)
+    # Entitlements are policy, not data: they come from Config.LEAVE_ENTITLEMENTS.
+    # The ledger is kept up to date incrementally by LeaveRequest.create/update_status,
+    # and can be recomputed from scratch with LeaveBalance.rebuild().
+
+    @staticmethod
+    def get_collection():
+        db = get_db()
+        return db.leave_balances
+
+    @staticmethod
+    def days_by_year(request):
+        """
+        Working days a leave request counts against each year's balance: the values stored
+        on the request at creation if present, otherwise computed from its region's calendar.
+        """
+        stored = request.get('days_by_year')
+        if stored is not None:
+            return {int(year): days for year, days in stored.items()}
+        return leave_duration.business_days_by_year(request.get('start_date'), request.get('end_date'),
+                                                    request.get('region'))
+
+    @staticmethod
+    def apply_transition(request, old_status, new_status):
+        """
+        Moves a request's days between ledger buckets when its status changes
+        (None -> Pending on create, Pending -> Approved, Approved -> Cancelled, ...).
+
+        Each ledger document is updated with a single atomic, upserting $inc. Callers
+        must make sure a given transition is applied exactly once (see update_status).
+        """
+        LeaveBalance.apply_transitions([(request, old_status, new_status)])
+
+    @staticmethod
+    def apply_transitions(transitions):
+        """
+        Batch form of apply_transition for a list of (request, old_status, new_status).
+        Deltas for the same ledger are combined and everything is written in one bulk_write.
+
+        If some ledger updates fail, the ones that succeeded are reversed before the
+        BulkWriteError is re-raised, so callers can undo the status changes as a whole.
+        """
+        deltas = {} # (user_id, year, leave_type) -> {bucket: delta}
+        for request, old_status, new_status in transitions:
+            old_bucket = STATUS_BUCKETS.get(old_status)
+            new_bucket = STATUS_BUCKETS.get(new_status)
+            if old_bucket == new_bucket or not request.get('user_id') or not request.get('leave_type'):
+                continue
+            for year, days in LeaveBalance.days_by_year(request).items():
+                inc = deltas.setdefault((ObjectId(request['user_id']), year, request['leave_type']), {})
+                if old_bucket:
+                    inc[old_bucket] = inc.get(old_bucket, 0) - days
+                if new_bucket:
+                    inc[new_bucket] = inc.get(new_bucket, 0) + days
+
+        now = datetime.utcnow()
+        changes = [({'user_id': user_id, 'year': year, 'leave_type': leave_type}, inc)
+                   for (user_id, year, leave_type), inc in deltas.items() if inc]
+        if not changes:
+            return
+        collection = LeaveBalance.get_collection()
+        try:
+            collection.bulk_write([UpdateOne(key, {'$inc': inc, '$set': {'updated_on': now}}, upsert=True)
+                                   for key, inc in changes], ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            undo = [UpdateOne(key, {'$inc': {bucket: -delta for bucket, delta in inc.items()},
+                                    '$set': {'updated_on': now}})
+                    for index, (key, inc) in enumerate(changes) if index not in failed]
+            if undo:
+                collection.bulk_write(undo, ordered=False)
+            raise
+
+    @staticmethod
+    def find_for_user(user_id, year):
+        """ Returns {leave_type: ledger document} for a user's year. """
+        collection = LeaveBalance.get_collection()
+        docs = slow_queries.find(collection, {'user_id': ObjectId(user_id), 'year': year}, source='LeaveBalance.find_for_user')
+        return {doc['leave_type']: doc for doc in docs}
+
+    @staticmethod
+    def summarize(user_id, year, entitlements):
+        """
+        Builds the balance table for a user's year.
+
+        Args:
+            entitlements (dict): {leave_type: days per year, or None for unlimited}.
+
+        Returns:
+            list: [{'leave_type', 'entitlement', 'used', 'pending', 'available'}], available
+                  is None for unlimited leave types.
+        """
+        ledgers = LeaveBalance.find_for_user(user_id, year)
+        rows = []
+        for leave_type, entitlement in entitlements.items():
+            ledger = ledgers.get(leave_type, {})
+            used = ledger.get('used', 0)
+            pending = ledger.get('pending', 0)
+            available = None if entitlement is None else entitlement - used - pending
+            rows.append({'leave_type': leave_type, 'entitlement': entitlement,
+                         'used': used, 'pending': pending, 'available': available})
+        return rows
+
+    @staticmethod
+    def reserve(request, entitlement):
+        """
+        Books a new request's days as 'pending', but only if every year it spans still has
+        that many days available. Each year is a conditional $inc that requires
+        used + pending + days <= entitlement on the ledger, so concurrent submissions
+        cannot both pass a check and overdraw the balance. If a later year fails, the
+        years already reserved are released again.
+
+        Args:
+            request (dict): The new request (user_id, leave_type, and days_by_year or dates and region).
+            entitlement (number): Days per year for the request's leave type.
+
+        Raises:
+            InsufficientBalance: With a message describing the shortfall.
+        """
+        collection = LeaveBalance.get_collection()
+        user_id, leave_type = ObjectId(request['user_id']), request['leave_type']
+        now = datetime.utcnow()
+        reserved = []
+        try:
+            for year, days in sorted(LeaveBalance.days_by_year(request).items()):
+                if not days:
+                    continue
+                key = {'user_id': user_id, 'year': year, 'leave_type': leave_type}
+                try:
+                    # Make sure the ledger exists, so the conditional update below has a document to test
+                    collection.update_one(key, {'$setOnInsert': {'used': 0, 'pending': 0, 'updated_on': now}},
+                                          upsert=True)
+                except DuplicateKeyError:
+                    pass # Created concurrently by another request
+                result = collection.update_one(
+                    dict(key, **{'$expr': {'$lte': [{'$add': [{'$ifNull': ['$used', 0]}, {'$ifNull': ['$pending', 0]}]},
+                                                    entitlement - days]}}),
+                    {'$inc': {'pending': days}, '$set': {'updated_on': now}}
+                )
+                if not result.modified_count:
+                    ledger = collection.find_one(key) or {}
+                    available = entitlement - ledger.get('used', 0) - ledger.get('pending', 0)
+                    raise InsufficientBalance(f"Insufficient {leave_type} leave balance for {year}: "
+                                              f"requested {days} day(s), available {max(available, 0)}.")
+                reserved.append((key, days))
+        except Exception:
+            for key, days in reserved:
+                collection.update_one(key, {'$inc': {'pending': -days}, '$set': {'updated_on': now}})
+            raise
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """
+        Recomputes every ledger from the Pending/Approved leave requests.
+
+        Requests are streamed in user order. Each counts the working days stored on it at
+        creation (days_by_year), the same days later status transitions reverse, so a
+        rebuild stays consistent with apply_transition even after holidays change. Only
+        requests without stored days are computed, with the current holiday calendars, one
+        vectorized chunk at a time. Ledgers are written per
+        batch of users with bulk upserts; ledgers not touched by this run are zeroed at the end.
+        Status changes made while a rebuild is running can be overwritten, so run it
+        during a quiet period (or re-run it).
+
+        Returns:
+            int: Number of ledger documents written.
+        """
+        db = get_db()
+        collection = LeaveBalance.get_collection()
+        run_started = datetime.utcnow()
+        projection = {'user_id': 1, 'leave_type': 1, 'start_date': 1, 'end_date': 1, 'status': 1, 'region': 1,
+                      'days_by_year': 1}
+        cursor = db.leave_requests.find(
+            {'status': {'$in': list(STATUS_BUCKETS)}}, projection, batch_size=batch_size
+        ).sort([('user_id', 1)])
+
+        totals = {} # (user_id, year, leave_type) -> {'used': n, 'pending': n}
+        written = 0
+        current_user = None
+
+        def flush():
+            ops = [UpdateOne(
+                {'user_id': user_id, 'year': year, 'leave_type': leave_type},
+                {'$set': {'used': counts['used'], 'pending': counts['pending'],
+                          'updated_on': run_started, 'rebuilt_on': run_started}},
+                upsert=True
+            ) for (user_id, year, leave_type), counts in totals.items()]
+            if ops:
+                collection.bulk_write(ops, ordered=False)
+            return len(ops)
+
+        def accumulate(chunk):
+            nonlocal totals, written, current_user
+            # Stored days where present (see days_by_year); compute only the rest, in one batch
+            missing = [req for req in chunk if req.get('days_by_year') is None]
+            computed = iter(leave_duration.business_days_for_requests(missing)) if missing else iter(())
+            for req in chunk:
+                stored = req.get('days_by_year')
+                days_by_year = ({int(year): days for year, days in stored.items()} if stored is not None
+                                else next(computed))
+                # Flush on user boundaries so a user's totals are never split across batches
+                if req['user_id'] != current_user and len(totals) >= batch_size:
+                    written += flush()
+                    totals = {}
+                current_user = req['user_id']
+                bucket = STATUS_BUCKETS[req['status']]
+                for year, days in days_by_year.items():
+                    counts = totals.setdefault((req['user_id'], year, req.get('leave_type')), {'used': 0, 'pending': 0})
+                    counts[bucket] += days
+
+        chunk = []
+        for req in cursor:
+            if not req.get('user_id'):
+                continue
+            chunk.append(req)
+            if len(chunk) >= batch_size:
+                accumulate(chunk)
+                chunk = []
+        accumulate(chunk)
+        written += flush()
+
+        # Ledgers with no matching requests any more
+        stale = collection.update_many(
+            {'$or': [{'rebuilt_on': {'$lt': run_started}}, {'rebuilt_on': {'$exists': False}}]},
+            {'$set': {'used': 0, 'pending': 0, 'updated_on': run_started, 'rebuilt_on': run_started}}
+        )
+        log.info(f"Rebuilt {written} leave balance ledger(s); zeroed {stale.modified_count} stale ledger(s).")
+        return written
@@ -0,0 +1,172 @@
+# hrms/models/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId, errors as bson_errors
+from .. import slow_queries
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor string cannot be decoded."""
+
+
+def _encode_value(value):
+    """Converts a sort key value into a JSON-safe tagged form."""
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    """
+    Reverses _encode_value. Cursors come from the query string, so only scalars and the two
+    tagged forms are accepted: any other dict or list could put query operators (e.g.
+    {'$ne': None}) into the filter built from the cursor.
+    """
+    if isinstance(value, dict):
+        if len(value) == 1 and isinstance(value.get('$oid'), str):
+            return ObjectId(value['$oid'])
+        if len(value) == 1 and isinstance(value.get('$date'), str):
+            return datetime.fromisoformat(value['$date'])
+        raise InvalidCursor("Cursor contains an unsupported value.")
+    if value is not None and not isinstance(value, (str, int, float)): # bool is an int
+        raise InvalidCursor("Cursor contains an unsupported value.")
+    return value
+
+
+def encode_cursor(doc, sort_keys):
+    """
+    Builds an opaque, URL-safe cursor string from the sort key values of a document.
+
+    Args:
+        doc (dict): The last (or first) document of a page.
+        sort_keys (list): Field names the page is sorted on, e.g. ['last_name', 'first_name', '_id'].
+
+    Returns:
+        str: The encoded cursor.
+    """
+    values = [_encode_value(doc.get(key)) for key in sort_keys]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_keys):
+    """
+    Decodes a cursor produced by encode_cursor back into a list of sort key values.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or does not match the sort keys.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            raise InvalidCursor("Cursor does not match the sort keys.")
+        return [_decode_value(v) for v in values]
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, bson_errors.InvalidId) as e:
+        log.warning("Could not decode pagination cursor '%s': %s", cursor, e)
+        raise InvalidCursor("Malformed pagination cursor.") from e
+
+
+def keyset_filter(sort, values, reverse=False):
+    """
+    Builds the range filter that selects documents strictly after a cursor position.
+
+    For sort [('a', 1), ('b', 1), ('_id', 1)] and values [x, y, z] this produces
+    {'$or': [{'a': {'$gt': x}}, {'a': x, 'b': {'$gt': y}}, {'a': x, 'b': y, '_id': {'$gt': z}}]},
+    which MongoDB answers with bounded scans over a matching compound index.
+
+    Null and missing values sort before everything else, but comparison operators never
+    match them ({'$gt': None} matches nothing, {'$lt': x} skips nulls). So after a None
+    cursor value in ascending order comes every non-null value, nothing comes after it in
+    descending order, and before a value in descending order (or going backwards) is
+    {'$not': {'$gte': x}}, which includes null and missing fields. The last (unique) field
+    is never null and keeps a plain '$lt'.
+
+    Args:
+        sort (list): List of (field, direction) tuples, the last field must be unique (normally '_id').
+        values (list): The cursor values for each sort field.
+        reverse (bool): Select documents *before* the cursor instead (for "previous page").
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        ascending = (direction == 1) != reverse
+        if values[i] is None and not ascending:
+            continue # Nothing sorts below null
+        clause = {sort[j][0]: values[j] for j in range(i)}
+        if values[i] is None:
+            clause[field] = {'$ne': None} # Also excludes missing fields, which sort as null
+        elif ascending:
+            clause[field] = {'$gt': values[i]}
+        elif i < len(sort) - 1:
+            clause[field] = {'$not': {'$gte': values[i]}} # '$lt', plus the nulls that sort below everything
+        else:
+            clause[field] = {'$lt': values[i]}
+        clauses.append(clause)
+    return {'$or': clauses} if len(clauses) > 1 else clauses[0]
+
+
+def fetch_keyset_page(collection, query, sort, page_size, projection=None, after=None, before=None, source=None):
+    """
+    Runs a keyset-paginated find and returns one page plus opaque next/previous cursors.
+
+    Only page_size + 1 documents are read from the cursor, so the cost of a page does not
+    depend on how deep into the result set it is.
+
+    Args:
+        collection: The PyMongo collection to query.
+        query (dict): Base filter.
+        sort (list): List of (field, direction) tuples ending in a unique field.
+        page_size (int): Number of documents per page.
+        projection (dict, optional): Projection; sort fields are always included.
+        after (str, optional): Cursor of the last document of the previous page.
+        before (str, optional): Cursor of the first document of the next page (go backwards).
+        source (str, optional): Calling model method, for the slow query log.
+
+    Returns:
+        dict: {'items': [...], 'next_cursor': str|None, 'prev_cursor': str|None}
+
+    Raises:
+        InvalidCursor: If 'after' or 'before' cannot be decoded.
+    """
+    sort_keys = [field for field, _ in sort]
+    query = dict(query or {})
+    backwards = bool(before) and not after
+
+    if after or before:
+        range_filter = keyset_filter(sort, decode_cursor(after or before, sort_keys), reverse=backwards)
+        query = {'$and': [query, range_filter]} if query else range_filter
+
+    if projection and all(projection.values()):
+        # Inclusion projection: sort fields are needed to build the cursors for the next request
+        projection = dict(projection)
+        for key in sort_keys:
+            projection.setdefault(key, 1)
+
+    effective_sort = [(field, -direction) for field, direction in sort] if backwards else sort
+    items = slow_queries.find(collection, query, projection, sort=effective_sort, limit=page_size + 1, source=source)
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+
+    next_cursor = prev_cursor = None
+    if items:
+        if backwards:
+            # We came from a later page, so there is always a next page
+            next_cursor = encode_cursor(items[-1], sort_keys)
+            prev_cursor = encode_cursor(items[0], sort_keys) if has_more else None
+        else:
+            next_cursor = encode_cursor(items[-1], sort_keys) if has_more else None
+            prev_cursor = encode_cursor(items[0], sort_keys) if after else None
+
+    return {'items': items, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
@@ -1,10 +1,13 @@
 # hrms/models/user.py
 
-from werkzeug.security import generate_password_hash, check_password_hash
+import copy
 from flask_login import UserMixin
 from bson import ObjectId, errors as bson_errors # Import bson errors specifically
 from pymongo import errors as pymongo_errors # Import pymongo errors specifically
 from .. import get_db # Use the get_db function from hrms/__init__.py
+from ..cache import TTLCache, MISSING
+from .. import passwords # Pluggable hashers, run on a bounded thread pool
+from .duplicates import duplicate_field
 import logging
 # import re # Import if using regex for searches later
 
@@ -18,6 +21,10 @@ class User(UserMixin):
     and properties required by Flask-Login.
     """
 
+    # Per-process cache of User objects for the Flask-Login user_loader, keyed by id string.
+    # Replaced with configured sizes by create_app (see configure_session_cache).
+    session_cache = TTLCache(maxsize=4096, ttl=60)
+
     def __init__(self, username, email, password_hash=None, role='employee', _id=None, is_active=True):
         """
         Initializes a User object.
@@ -53,20 +60,51 @@ class User(UserMixin):
     # -------------------------------------------------
 
     def set_password(self, password):
-        """Hashes the provided plain-text password and stores the hash."""
+        """
+        Hashes the provided plain-text password with the configured hasher and stores the hash.
+        Raises passwords.HasherBusy if the hashing pool is saturated.
+        """
         if password:
-            self.password_hash = generate_password_hash(password)
+            self.password_hash = passwords.hash_password(password)
         else:
             # Avoid storing hash for empty passwords, explicitly set to None
             self.password_hash = None
-            log.warning(f"Attempted to set an empty password for user '{self.username}'")
+            log.warning("Attempted to set an empty password for user '%s'", self.username)
 
     def check_password(self, password):
-        """Checks if the provided plain-text password matches the stored hash."""
+        """
+        Checks if the provided plain-text password matches the stored hash (any supported format).
+        Raises passwords.HasherBusy if the hashing pool is saturated.
+        """
         if not self.password_hash or not password:
             # No stored hash or no provided password means no match
             return False
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(password, self.password_hash)
+
+    def password_needs_upgrade(self):
+        """True if the stored hash uses an older hasher or cost than currently configured."""
+        return bool(self.password_hash) and passwords.needs_rehash(self.password_hash)
+
+    def upgrade_password_hash(self, password):
+        """
+        Re-hashes a just-verified password with the current hasher settings and stores it.
+        The update only applies if the stored hash is still the one that was verified, so it
+        can't overwrite a password change made concurrently.
+
+        Returns:
+            bool: True if the stored hash was replaced.
+        """
+        old_hash = self.password_hash
+        new_hash = passwords.hash_password(password)
+        result = User.get_collection().update_one(
+            {'_id': ObjectId(self.id), 'password_hash': old_hash},
+            {'$set': {'password_hash': new_hash}}
+        )
+        if result.modified_count:
+            self.password_hash = new_hash
+            User.session_cache.invalidate(self.id)
+            log.info("Upgraded password hash for user '%s' (ID: %s).", self.username, self.id)
+        return bool(result.modified_count)
 
     # --- Database Methods ---
     @staticmethod
@@ -77,16 +115,20 @@ class User(UserMixin):
             return db.users # Access the 'users' collection
         except Exception as e:
             # Log critical error if database handle cannot be obtained
-            log.critical(f"Failed to get database handle in User model: {e}", exc_info=True)
+            log.critical("Failed to get database handle in User model: %s", e, exc_info=True)
             # Raise a runtime error to indicate a severe problem
             raise RuntimeError("Could not get database handle.") from e
 
 
-    def save(self):
+    def save(self, raise_on_duplicate=False):
         """
         Saves the current user object to the MongoDB 'users' collection.
         Performs an insert if the user has no ID, or an update if an ID exists.
 
+        Args:
+            raise_on_duplicate (bool, optional): Re-raise DuplicateKeyError instead of returning None,
+                so callers can tell which unique field collided (see duplicate_field).
+
         Returns:
             str: The user's ID string upon successful save/update.
             None: If the save operation fails (e.g., duplicate key, DB error).
@@ -104,10 +146,10 @@ class User(UserMixin):
             }
 
             if self.id: # Update existing user (self.id was set during __init__)
-                log.debug(f"Attempting to update user with ID: {self.id}")
+                log.debug("Attempting to update user with ID: %s", self.id)
                 # Basic check before attempting update
                 if not self.username or not self.email:
-                    log.error(f"Attempted to update user {self.id} with missing username or email.")
+                    log.error("Attempted to update user %s with missing username or email.", self.id)
                     return None
 
                 # Perform the update operation using the user's ObjectId
@@ -117,17 +159,19 @@ class User(UserMixin):
                 )
                 # Check if any document was actually found and potentially modified
                 if update_result.matched_count == 0:
-                    log.warning(f"Attempted to update user ID {self.id}, but no document matched.")
+                    log.warning("Attempted to update user ID %s, but no document matched.", self.id)
                     return None # Indicate failure if no user found to update
+                # Drop the cached copy so the next request in this process sees the change
+                User.session_cache.invalidate(self.id)
                 # Log success, including whether data was actually changed
-                log.info(f"Updated user '{self.username}' (ID: {self.id}). Matched: {update_result.matched_count}, Modified: {update_result.modified_count}")
+                log.info("Updated user '%s' (ID: %s). Matched: %s, Modified: %s", self.username, self.id, update_result.matched_count, update_result.modified_count)
                 # Return the existing ID upon successful update attempt
                 return self.id
             else: # Insert new user (self.id is None)
-                log.debug(f"Attempting to insert new user: {self.username}")
+                log.debug("Attempting to insert new user: %s", self.username)
                 # Ensure essential fields for a new user are present
                 if not self.username or not self.email or not self.password_hash:
-                    log.error(f"Attempted to insert user with missing required fields: username='{self.username}', email='{self.email}', hash_present={bool(self.password_hash)}")
+                    log.error("Attempted to insert user with missing required fields: username='%s', email='%s', hash_present=%s", self.username, self.email, bool(self.password_hash))
                     return None
 
                 # Perform the insert operation
@@ -135,23 +179,61 @@ class User(UserMixin):
                 # Check if insert was acknowledged and retrieve the new ObjectId
                 if insert_result.acknowledged:
                     new_id = str(insert_result.inserted_id)
-                    log.info(f"Inserted new user '{self.username}' with ID: {new_id}")
+                    log.info("Inserted new user '%s' with ID: %s", self.username, new_id)
                     # Return the newly generated ID as a string
                     return new_id
                 else:
-                    log.error(f"MongoDB insert for user '{self.username}' was not acknowledged.")
+                    log.error("MongoDB insert for user '%s' was not acknowledged.", self.username)
                     return None
 
         except pymongo_errors.DuplicateKeyError as e:
-             # Handle violation of unique indexes (username or email)
-             log.error(f"Failed to save user '{self.username}': Duplicate key error. Details: {e.details}")
+             # Handle violation of unique indexes (username or email). An expected conflict, not
+             # a server error: callers that ask for the exception report it themselves.
+             if raise_on_duplicate:
+                 raise
+             log.warning("Failed to save user '%s': Duplicate key error. Details: %s", self.username, e.details)
              return None # Indicate failure due to duplication
         except Exception as e:
             # Catch any other unexpected database errors
-            log.error(f"Unexpected error during User.save for user '{self.username}': {e}", exc_info=True)
+            log.error("Unexpected error during User.save for user '%s': %s", self.username, e, exc_info=True)
             return None # Indicate general failure
 
 
+    # Unique index name -> user field (see initialize_database)
+    UNIQUE_INDEX_FIELDS = {
+        'username_uniq_idx': 'username',
+        'email_uniq_idx': 'email',
+    }
+
+    @staticmethod
+    def duplicate_field(details):
+        """
+        Maps a DuplicateKeyError's details to the user field that collided
+        ('username' or 'email'). Returns None if it cannot be determined.
+        """
+        return duplicate_field(details, User.UNIQUE_INDEX_FIELDS)
+
+    @staticmethod
+    def find_taken_fields(username, email):
+        """
+        Checks which of a username/email pair are already registered, in one $or query
+        served by the two unique indexes.
+
+        Returns:
+            set: Subset of {'username', 'email'}.
+        """
+        taken = set()
+        cursor = User.get_collection().find(
+            {'$or': [{'username': username}, {'email': email.lower()}]},
+            {'_id': 0, 'username': 1, 'email': 1}
+        ).limit(2)
+        for doc in cursor:
+            if doc.get('username') == username:
+                taken.add('username')
+            if doc.get('email') == email.lower():
+                taken.add('email')
+        return taken
+
     @staticmethod
     def _create_user_from_doc(user_data):
         """Internal helper method to create a User object from a MongoDB document."""
@@ -170,7 +252,7 @@ class User(UserMixin):
                 is_active=user_data.get('is_active', True) # Provide default active status
             )
         except Exception as e:
-            log.error(f"Error creating User object from document: {e}", exc_info=True)
+            log.error("Error creating User object from document: %s", e, exc_info=True)
             return None
 
 
@@ -187,12 +269,61 @@ class User(UserMixin):
             return User._create_user_from_doc(user_data)
         except bson_errors.InvalidId:
             # Handle cases where the provided user_id string is not a valid ObjectId
-            log.warning(f"Invalid ObjectId format passed to get_by_id: '{user_id}'")
+            log.warning("Invalid ObjectId format passed to get_by_id: '%s'", user_id)
         except Exception as e:
-            log.error(f"Error in get_by_id for ID '{user_id}': {e}", exc_info=True)
+            log.error("Error in get_by_id for ID '%s': %s", user_id, e, exc_info=True)
         return None # Return None if not found or error occurs
 
 
+    @staticmethod
+    def configure_session_cache(maxsize, ttl):
+        """Replaces the user_loader cache with one of the given size/TTL."""
+        User.session_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def load_for_session(user_id):
+        """
+        Loads the user for Flask-Login's user_loader, from the per-process cache when possible.
+
+        Unknown ids are cached too (as None) so a stale session cookie doesn't cost a query per
+        request. Deactivated users are treated as logged out. Each call returns a copy, so request
+        code modifying current_user can't change the cached object. Changes saved by other worker
+        processes show up within the cache TTL.
+        """
+        if not user_id:
+            return None
+        user = User.session_cache.get(user_id)
+        if user is MISSING:
+            user = User.get_by_id(user_id)
+            User.session_cache.set(user_id, user)
+        if user is None or not user.is_active:
+            return None
+        return copy.copy(user)
+
+    @staticmethod
+    def set_active(user_id, active):
+        """
+        Activates or deactivates a user account and drops it from the user_loader cache.
+        A deactivated user is logged out by Flask-Login on their next request (in this process;
+        other processes within the cache TTL).
+
+        Returns:
+            bool: True if a user was found.
+        """
+        try:
+            result = User.get_collection().update_one({'_id': ObjectId(user_id)}, {'$set': {'is_active': bool(active)}})
+        except bson_errors.InvalidId:
+            log.warning("Invalid ObjectId format passed to set_active: '%s'", user_id)
+            return False
+        User.session_cache.invalidate(str(user_id))
+        log.info("Set is_active=%s for user ID %s.", bool(active), user_id)
+        return result.matched_count > 0
+
+    @staticmethod
+    def deactivate(user_id):
+        """Deactivates a user account (see set_active)."""
+        return User.set_active(user_id, False)
+
     @staticmethod
     def get_by_username(username):
         """Finds a user by their username (case-sensitive)."""
@@ -206,7 +337,7 @@ class User(UserMixin):
             # Use the helper to create the User object
             return User._create_user_from_doc(user_data)
         except Exception as e:
-            log.error(f"Error in get_by_username for username '{username}': {e}", exc_info=True)
+            log.error("Error in get_by_username for username '%s': %s", username, e, exc_info=True)
         return None
 
 
@@ -222,7 +353,7 @@ class User(UserMixin):
             # Use the helper to create the User object
             return User._create_user_from_doc(user_data)
         except Exception as e:
-            log.error(f"Error in get_by_email for email '{email}': {e}", exc_info=True)
+            log.error("Error in get_by_email for email '%s': %s", email, e, exc_info=True)
         return None
 
 
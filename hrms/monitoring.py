@@ -0,0 +1,223 @@
+# hrms/monitoring.py
+
+"""
+MongoDB driver event listeners.
+
+PoolMetrics counts what the connection pool does (connections opened/closed, checkouts,
+time spent waiting for a connection, checkouts that failed because the pool stayed
+exhausted for waitQueueTimeoutMS) so MONGO_MAX_POOL_SIZE can be sized from real data.
+CommandMetrics keeps latency histograms of every command by collection and command name.
+The listeners are registered on the MongoClient in create_app; numbers are per process
+and exported on /metrics (see hrms/metrics.py).
+"""
+
+import threading
+from bisect import bisect_left
+from pymongo import monitoring
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000]
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Thread-safe counters of connection pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pools_created = 0
+            self.pools_cleared = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts_started = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.checkout_failures = {} # reason -> count ('timeout' means the pool was exhausted)
+            self.checked_out = 0 # Connections currently in use
+            self.max_checked_out = 0 # High-water mark of connections in use
+            self.wait_total = 0.0 # Seconds spent waiting for connections, summed
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def _record_wait(self, seconds):
+        # Caller holds the lock
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if ms <= bound:
+                self.wait_buckets[i] += 1
+                return
+        self.wait_buckets[-1] += 1
+
+    # --- ConnectionPoolListener callbacks (called by the driver, must be fast) ---
+    def pool_created(self, event):
+        with self._lock:
+            self.pools_created += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+        log.warning("MongoDB connection pool for %s was cleared.", event.address)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.checkouts_started += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self._record_wait(getattr(event, 'duration', 0.0) or 0.0)
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            log.warning("MongoDB connection pool exhausted: checkout from %s timed out.", event.address)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self._record_wait(getattr(event, 'duration', 0.0) or 0.0)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def stats(self):
+        """Returns a JSON-ready snapshot of the counters."""
+        with self._lock:
+            waits = self.checkouts + sum(self.checkout_failures.values())
+            buckets = {f'le_{bound}ms': count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets['inf'] = self.wait_buckets[-1]
+            return {
+                'pools_created': self.pools_created,
+                'pools_cleared': self.pools_cleared,
+                'connections_created': self.connections_created,
+                'connections_closed': self.connections_closed,
+                'connections_open': self.connections_created - self.connections_closed,
+                'checkouts_started': self.checkouts_started,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'checkout_failures': dict(self.checkout_failures),
+                'pool_exhausted': self.checkout_failures.get(monitoring.ConnectionCheckOutFailedReason.TIMEOUT, 0),
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'wait_avg_ms': round(1000 * self.wait_total / waits, 3) if waits else 0.0,
+                'wait_max_ms': round(1000 * self.wait_max, 3),
+                'wait_histogram': buckets,
+            }
+
+
+class Histogram:
+    """
+    Thread-safe latency histograms keyed by a tuple of label values, with fixed bucket
+    upper bounds (seconds). An observation is one bisect and a few additions under a lock.
+    """
+
+    def __init__(self, label_names, buckets):
+        self.label_names = tuple(label_names)
+        self.buckets = list(buckets)
+        self._lock = threading.Lock()
+        self._series = {} # labels -> [per-bucket counts (last = +Inf), sum, count]
+
+    def observe(self, labels, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def snapshot(self):
+        """Returns {labels: (cumulative bucket counts, sum, count)}."""
+        with self._lock:
+            items = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        result = {}
+        for labels, counts, total, count in items:
+            cumulative, running = [], 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            result[labels] = (cumulative, total, count)
+        return result
+
+
+class Counter:
+    """Thread-safe counters keyed by a tuple of label values."""
+
+    def __init__(self, label_names):
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+# Bucket bounds (seconds) for MongoDB command latency
+COMMAND_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Latency histograms and failure counts of MongoDB commands, by collection and command."""
+
+    def __init__(self):
+        self.durations = Histogram(('collection', 'command'), COMMAND_BUCKETS)
+        self.failures = Counter(('collection', 'command'))
+        self._collections = {} # (connection_id, request_id) -> collection of an in-flight command
+
+    @staticmethod
+    def _collection_of(event):
+        # {'find': 'users', ...}; getMore carries the collection separately
+        if event.command_name == 'getMore':
+            return event.command.get('collection', '')
+        target = event.command.get(event.command_name)
+        return target if isinstance(target, str) else ''
+
+    def started(self, event):
+        self._collections[(event.connection_id, event.request_id)] = self._collection_of(event)
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        self.durations.observe((collection, event.command_name), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), '')
+        self.durations.observe((collection, event.command_name), event.duration_micros / 1e6)
+        self.failures.inc((collection, event.command_name))
+
+
+# Listeners shared by the application's MongoClient (see create_app)
+pool_metrics = PoolMetrics()
+command_metrics = CommandMetrics()
@@ -0,0 +1,230 @@
+# hrms/passwords.py
+
+"""
+Password hashing.
+
+Hashes are produced by the configured hasher (bcrypt by default) and verified by
+whichever hasher recognises the stored format, so existing werkzeug PBKDF2/scrypt
+hashes keep working and are upgraded on the next successful login (see needs_rehash).
+
+Hashing is deliberately slow, so it runs on a small per-process thread pool instead
+of the request thread. bcrypt and hashlib release the GIL while hashing, so the pool
+size is the number of CPU cores a worker can spend on hashing at once; a burst of
+logins queues for the pool (up to a limit) instead of starving every other request.
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+import logging
+
+try:
+    import bcrypt
+except ImportError: # Only needed when PASSWORD_HASHER is 'bcrypt' or bcrypt hashes are stored
+    bcrypt = None
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+
+class HasherBusy(RuntimeError):
+    """Raised when too many hashing jobs are already queued, or one timed out."""
+
+
+class BcryptHasher:
+    """bcrypt with a configurable cost (log2 rounds)."""
+    name = 'bcrypt'
+    PREFIXES = ('$2a$', '$2b$', '$2y$')
+    DEFAULT_ROUNDS = 12
+    MIN_ROUNDS = 10 # Lower costs are refused: every stored hash would be upgraded down to them
+    MAX_ROUNDS = 31 # bcrypt's limit
+
+    def __init__(self, rounds=DEFAULT_ROUNDS):
+        if bcrypt is None:
+            raise RuntimeError("PASSWORD_HASHER is 'bcrypt' but the bcrypt package is not installed.")
+        self.rounds = self.validate(rounds)
+
+    @classmethod
+    def validate(cls, rounds):
+        """Returns rounds as an int, or raises ValueError if it is outside the safe range."""
+        rounds = int(rounds)
+        if not cls.MIN_ROUNDS <= rounds <= cls.MAX_ROUNDS:
+            raise ValueError(f"PASSWORD_HASH_BCRYPT_ROUNDS must be between {cls.MIN_ROUNDS} and {cls.MAX_ROUNDS}, "
+                             f"got {rounds}.")
+        return rounds
+
+    @staticmethod
+    def _secret(password):
+        # bcrypt only uses the first 72 bytes (and bcrypt>=5 rejects longer input), so
+        # longer passwords are pre-hashed to keep every character significant
+        secret = password.encode('utf-8')
+        if len(secret) > 72:
+            secret = base64.b64encode(hashlib.sha256(secret).digest())
+        return secret
+
+    def identify(self, password_hash):
+        return password_hash.startswith(self.PREFIXES)
+
+    def hash(self, password):
+        return bcrypt.hashpw(self._secret(password), bcrypt.gensalt(self.rounds)).decode('ascii')
+
+    def verify(self, password, password_hash):
+        return bcrypt.checkpw(self._secret(password), password_hash.encode('ascii'))
+
+    def needs_rehash(self, password_hash):
+        # Format: $2b$<cost>$<salt+hash>
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class WerkzeugHasher:
+    """werkzeug's PBKDF2-SHA256 with a configurable iteration count; also verifies its scrypt hashes."""
+    name = 'pbkdf2'
+    PREFIXES = ('pbkdf2:', 'scrypt:')
+    DEFAULT_ITERATIONS = 600000
+    MIN_ITERATIONS = 100000 # Lower counts are refused: every stored hash would be upgraded down to them
+
+    def __init__(self, iterations=DEFAULT_ITERATIONS):
+        self.method = f'pbkdf2:sha256:{self.validate(iterations)}'
+
+    @classmethod
+    def validate(cls, iterations):
+        """Returns iterations as an int, or raises ValueError if it is below the safe floor."""
+        iterations = int(iterations)
+        if iterations < cls.MIN_ITERATIONS:
+            raise ValueError(f"PASSWORD_HASH_PBKDF2_ITERATIONS must be at least {cls.MIN_ITERATIONS}, got {iterations}.")
+        return iterations
+
+    def identify(self, password_hash):
+        return password_hash.startswith(self.PREFIXES)
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, password, password_hash):
+        return check_password_hash(password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Format: <method>$<salt>$<hash>
+        return password_hash.split('$', 1)[0] != self.method
+
+
+# PASSWORD_HASHER name -> hasher class
+HASHERS = {
+    BcryptHasher.name: BcryptHasher,
+    WerkzeugHasher.name: WerkzeugHasher,
+}
+
+# Settings, replaced from Config by configure() in create_app
+_settings = {
+    'hasher': 'bcrypt',
+    'bcrypt_rounds': BcryptHasher.DEFAULT_ROUNDS,
+    'pbkdf2_iterations': WerkzeugHasher.DEFAULT_ITERATIONS,
+    'workers': 2,
+    'max_pending': 32,
+    'timeout': 10.0,
+}
+_state = {'hasher': None, 'executor': None, 'slots': None, 'pid': None}
+_lock = threading.Lock()
+
+
+def configure(hasher='bcrypt', bcrypt_rounds=BcryptHasher.DEFAULT_ROUNDS,
+              pbkdf2_iterations=WerkzeugHasher.DEFAULT_ITERATIONS, workers=2, max_pending=32, timeout=10.0):
+    """
+    Applies configuration; the hasher and executor are (re)created on first use.
+
+    Each hasher has its own cost setting, and both are checked against a safe floor here,
+    so a misconfiguration fails at startup instead of weakening hashes at the next login.
+
+    Raises:
+        ValueError: For an unknown hasher or a cost below the floor.
+    """
+    if hasher not in HASHERS:
+        raise ValueError(f"Unknown PASSWORD_HASHER '{hasher}'. Choose from: {', '.join(HASHERS)}")
+    bcrypt_rounds = BcryptHasher.validate(bcrypt_rounds)
+    pbkdf2_iterations = WerkzeugHasher.validate(pbkdf2_iterations)
+    with _lock:
+        _settings.update(hasher=hasher, bcrypt_rounds=bcrypt_rounds, pbkdf2_iterations=pbkdf2_iterations,
+                         workers=workers, max_pending=max_pending, timeout=timeout)
+        if _state['executor'] is not None and _state['pid'] == os.getpid():
+            _state['executor'].shutdown(wait=False)
+        _state.update(hasher=None, executor=None, slots=None, pid=None)
+
+
+def _get_state():
+    """Returns (hasher, executor, slots), creating them in this process if needed (threads don't survive fork)."""
+    if _state['pid'] != os.getpid():
+        with _lock:
+            if _state['pid'] != os.getpid():
+                if _settings['hasher'] == BcryptHasher.name:
+                    hasher = BcryptHasher(_settings['bcrypt_rounds'])
+                else:
+                    hasher = WerkzeugHasher(_settings['pbkdf2_iterations'])
+                executor = ThreadPoolExecutor(max_workers=_settings['workers'], thread_name_prefix='password-hash')
+                # Jobs running or waiting in this process; beyond this new logins fail fast
+                slots = threading.BoundedSemaphore(_settings['workers'] + _settings['max_pending'])
+                _state.update(hasher=hasher, executor=executor, slots=slots, pid=os.getpid())
+    return _state['hasher'], _state['executor'], _state['slots']
+
+
+def _hasher_for(password_hash):
+    """The hasher that understands a stored hash's format, or None."""
+    current = _get_state()[0]
+    if current.identify(password_hash):
+        return current
+    for name, cls in HASHERS.items():
+        if name != current.name:
+            other = cls() if name != BcryptHasher.name or bcrypt is not None else None
+            if other is not None and other.identify(password_hash):
+                return other
+    return None
+
+
+def _run(func, *args):
+    """Runs func(*args) on the hashing pool, waiting at most the configured timeout."""
+    _, executor, slots = _get_state()
+    if not slots.acquire(blocking=False):
+        log.warning("Password hashing queue is full; rejecting request.")
+        raise HasherBusy("Too many password checks in progress.")
+    try:
+        future = executor.submit(func, *args)
+    except Exception:
+        slots.release()
+        raise
+    # The slot is held until the job itself finishes (or is cancelled before it starts), so
+    # jobs still running after their caller timed out keep counting against max_pending
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_settings['timeout'])
+    except FutureTimeout:
+        future.cancel()
+        log.warning("Password hashing did not finish within %ss.", _settings['timeout'])
+        raise HasherBusy("Password check timed out.")
+
+
+def hash_password(password):
+    """Hashes a password with the configured hasher (on the hashing pool)."""
+    hasher = _get_state()[0]
+    return _run(hasher.hash, password)
+
+
+def verify_password(password, password_hash):
+    """Checks a password against a stored hash of any supported format (on the hashing pool)."""
+    if not password or not password_hash:
+        return False
+    hasher = _hasher_for(password_hash)
+    if hasher is None:
+        log.error("Stored password hash has an unrecognised format.")
+        return False
+    return _run(hasher.verify, password, password_hash)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made by another hasher or with a different cost than configured."""
+    hasher = _get_state()[0]
+    return not hasher.identify(password_hash) or hasher.needs_rehash(password_hash)
@@ -4,6 +4,9 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 # No need to import check_password_hash here, use user.check_password()
 from ..models.user import User
+from pymongo.errors import DuplicateKeyError
+from ..passwords import HasherBusy
+from .. import throttle
 # from bson import ObjectId # Not needed here currently
 # from .. import get_db # Not needed here currently
 import logging
@@ -13,13 +16,19 @@ log = logging.getLogger(__name__)
 
 auth_bp = Blueprint('auth', __name__)
 
+# Registration messages for a username/email that is already taken, by field
+DUPLICATE_MESSAGES = {
+    'username': "Username '{value}' is already taken. Please choose another.",
+    'email': "Email '{value}' is already registered. Please use another.",
+}
+
 
 # --- LOGIN ROUTE ---
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Handles user login."""
     if current_user.is_authenticated:
-        log.debug(f"User '{current_user.username}' already authenticated. Redirecting to dashboard.")
+        log.debug("User '%s' already authenticated. Redirecting to dashboard.", current_user.username)
         return redirect(url_for('main.dashboard'))
 
     if request.method == 'POST':
@@ -27,42 +36,70 @@ def login():
         password = request.form.get('password')
         remember = True if request.form.get('remember') else False
 
-        log.info(f"Login attempt for username: '{username}'")
+        log.debug("Login attempt for username: '%s'", username) # The outcome is logged below
 
         if not username or not password:
              flash('Please enter both username and password.', 'warning')
              return render_template('auth/login.html', title="Login")
 
+        # Throttle per username and per client IP before any DB lookup or hash check.
+        # request.remote_addr is the proxy's address unless the app is wrapped in ProxyFix.
+        allowed, retry_after = throttle.check_login(username, request.remote_addr)
+        if not allowed:
+            log.warning("Login throttled for username '%s' from %s.", username, request.remote_addr)
+            flash('Too many login attempts. Please wait a moment and try again.', 'danger')
+            response = current_app.make_response((render_template('auth/login.html', title="Login"), 429))
+            response.headers['Retry-After'] = str(max(1, int(retry_after + 0.5)))
+            return response
+
         # Find user by username
         user = User.get_by_username(username)
 
+        # Verify the password on the hashing pool; when it's saturated, ask the user to retry
+        # rather than tying up this worker thread
+        try:
+            password_ok = bool(user) and user.check_password(password)
+        except HasherBusy:
+            log.warning("Login for '%s' rejected: password hashing is saturated.", username)
+            flash('The server is busy. Please try again in a few seconds.', 'warning')
+            return render_template('auth/login.html', title="Login"), 503
+
         # Validate user and password
         if not user:
-            log.warning(f"Login failed: Username '{username}' not found.")
+            log.warning("Login failed: Username '%s' not found.", username)
             flash('Invalid username or password. Please try again.', 'danger')
-        elif not user.check_password(password):
-            log.warning(f"Login failed: Incorrect password for username '{username}'.")
+        elif not password_ok:
+            log.warning("Login failed: Incorrect password for username '%s'.", username)
             flash('Invalid username or password. Please try again.', 'danger')
         elif not user.is_active:
-             log.warning(f"Login failed: Account for username '{username}' is inactive.")
+             log.warning("Login failed: Account for username '%s' is inactive.", username)
              flash('Your account is inactive. Please contact HR/Admin.', 'warning')
         else:
+            # Transparently move old hashes (werkzeug PBKDF2/scrypt, or an outdated cost) to the
+            # current hasher settings, while we have the plain-text password
+            if user.password_needs_upgrade():
+                try:
+                    user.upgrade_password_hash(password)
+                except Exception as e:
+                    # Never fail a valid login over this; it is retried on the next login
+                    log.warning("Could not upgrade password hash for '%s': %s", username, e)
             # Login successful
+            throttle.reset_username(username)
             login_user(user, remember=remember)
-            log.info(f"User '{username}' logged in successfully.")
+            log.info("User '%s' logged in successfully.", username)
             flash(f'Welcome back, {user.username}!', 'success')
 
             # Redirect to originally requested page or dashboard
             next_page = request.args.get('next')
             if next_page:
-                 log.debug(f"Redirecting logged in user '{username}' to originally requested page: {next_page}")
+                 log.debug("Redirecting logged in user '%s' to originally requested page: %s", username, next_page)
                  # Basic check to prevent open redirect vulnerability
                  # More robust checks might involve urlparse or Werkzeug's safe_redirect
                  if not next_page.startswith('/'):
                      next_page = url_for('main.dashboard') # Fallback if next_page seems unsafe
                  return redirect(next_page)
             else:
-                 log.debug(f"Redirecting logged in user '{username}' to dashboard.")
+                 log.debug("Redirecting logged in user '%s' to dashboard.", username)
                  return redirect(url_for('main.dashboard'))
 
         # If any checks failed, re-render login page
@@ -78,7 +115,7 @@ def register():
     """Handles user registration."""
     if current_user.is_authenticated:
         # If user is already logged in, redirect them away
-        log.debug(f"Authenticated user '{current_user.username}' attempted to access register page. Redirecting.")
+        log.debug("Authenticated user '%s' attempted to access register page. Redirecting.", current_user.username)
         return redirect(url_for('main.dashboard'))
 
     # Optional: Check if self-registration is allowed via config
@@ -100,7 +137,7 @@ def register():
         form_data['username'] = username
         form_data['email'] = email
 
-        log.info(f"Registration attempt: username='{username}', email='{email}'")
+        log.info("Registration attempt: username='%s', email='%s'", username, email)
 
         # --- Input Validation ---
         error = False
@@ -111,22 +148,17 @@ def register():
         if password != password2: flash('Passwords do not match.', 'warning'); error = True
         # Add password complexity rules if desired
 
-        # DB Checks (only if basic validation passed)
-        if not error:
+        # Uniqueness is enforced by the username/email unique indexes on insert. The optional
+        # pre-check (one $or query) reports both conflicts at once and skips hashing for them.
+        if not error and current_app.config.get('REGISTRATION_PRECHECK', False):
             try:
-                # Check for existing username
-                if User.get_by_username(username):
-                    log.warning(f"Registration failed: Username '{username}' already exists.")
-                    flash(f"Username '{username}' is already taken. Please choose another.", 'danger')
-                    error = True
-                # Check for existing email
-                if User.get_by_email(email):
-                    log.warning(f"Registration failed: Email '{email}' already exists.")
-                    flash(f"Email '{email}' is already registered. Please use another.", 'danger')
+                for field in sorted(User.find_taken_fields(username, email)):
+                    log.warning("Registration failed: %s '%s' already exists.", field, form_data[field])
+                    flash(DUPLICATE_MESSAGES[field].format(value=form_data[field]), 'danger')
                     error = True
             except Exception as e:
                 # Catch potential DB errors during checks
-                log.error(f"Database error during registration check for '{username}': {e}", exc_info=True)
+                log.error("Database error during registration check for '%s': %s", username, e, exc_info=True)
                 flash('Error checking existing user data. Please try again later.', 'danger')
                 error = True # Treat DB error as validation failure for this attempt
 
@@ -140,23 +172,37 @@ def register():
             new_user = User(username=username, email=email, role=role)
             new_user.set_password(password) # Hash the password
 
-            # Call save() and check the returned ID
-            new_user_id = new_user.save() # Calls the updated save() method
+            # Call save() and check the returned ID; duplicates surface as DuplicateKeyError
+            new_user_id = new_user.save(raise_on_duplicate=True)
 
             if new_user_id: # Check if save() succeeded (returned a valid ID string)
-                log.info(f"Successfully created user '{username}' with ID {new_user_id}")
+                log.info("Successfully created user '%s' with ID %s", username, new_user_id)
                 flash(f'Account created successfully for {username}! Please log in.', 'success')
                 return redirect(url_for('auth.login'))
             else:
                 # Handle the case where save() returned None (internal model error, maybe duplicate key)
-                log.error(f"User.save() failed for username '{username}' (returned None). Check model logs for specific error (e.g., duplicate key).")
+                log.error("User.save() failed for username '%s' (returned None). Check model logs for specific error (e.g., duplicate key).", username)
                 # Provide a slightly more informative message if possible, but avoid exposing too much detail
                 flash('Could not save account details. The username or email might already be in use, or an internal error occurred.', 'danger')
                 return render_template('auth/register.html', title="Register", **form_data)
 
+        except DuplicateKeyError as e:
+            field = User.duplicate_field(e.details or {'errmsg': str(e)})
+            log.warning("Registration failed: duplicate %s for '%s'.", field or 'unique key', username)
+            if field in DUPLICATE_MESSAGES:
+                flash(DUPLICATE_MESSAGES[field].format(value=form_data[field]), 'danger')
+            else:
+                flash('The username or email is already in use.', 'danger')
+            return render_template('auth/register.html', title="Register", **form_data)
+
+        except HasherBusy:
+            log.warning("Registration for '%s' rejected: password hashing is saturated.", username)
+            flash('The server is busy. Please try again in a few seconds.', 'warning')
+            return render_template('auth/register.html', title="Register", **form_data), 503
+
         except Exception as e:
             # Catch any other unexpected errors during user creation/saving process
-            log.error(f"Unexpected error during registration save process for username '{username}': {e}", exc_info=True)
+            log.error("Unexpected error during registration save process for username '%s': %s", username, e, exc_info=True)
             flash('An unexpected error occurred while creating your account. Please try again later or contact support.', 'danger')
             return render_template('auth/register.html', title="Register", **form_data)
 
@@ -172,6 +218,6 @@ def logout():
     """Handles user logout."""
     username = current_user.username # Get username before logging out
     logout_user()
-    log.info(f"User '{username}' logged out.")
+    log.info("User '%s' logged out.", username)
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('auth.login')) # Redirect to login page after logout
\ No newline at end of file
@@ -1,6 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, abort, jsonify
 from flask_login import login_required, current_user # Protect routes
 from ..models.employee import Employee
+from ..models.pagination import InvalidCursor
+from ..export import parse_export_args, date_range_filter, stream_export
+from ..importer import import_employees
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId # Import ObjectId
 
 employee_bp = Blueprint('employee', __name__)
@@ -20,14 +24,101 @@ def role_required(role):
     return decorator
 
 
+def get_page_size():
+    """Reads 'page_size' from the query string, clamped to 1..MAX_PAGE_SIZE."""
+    default = current_app.config.get('DEFAULT_PAGE_SIZE', 25)
+    max_size = current_app.config.get('MAX_PAGE_SIZE', 200)
+    page_size = request.args.get('page_size', default, type=int) or default
+    return max(1, min(page_size, max_size))
+
+
 @employee_bp.route('/')
 @login_required # Must be logged in
 # @role_required(['admin', 'hr', 'manager']) # Example: Only admins, HR, or managers can view list
 def list_employees():
-    """List all employees."""
-    # Add pagination later
-    employees = Employee.find_all(sort=[('last_name', 1), ('first_name', 1)])
-    return render_template('employee/list.html', employees=employees, title="Employees")
+    """List employees, one keyset-paginated page at a time."""
+    page_size = get_page_size()
+    after = request.args.get('after')
+    before = request.args.get('before')
+    try:
+        page = Employee.find_page(page_size=page_size, after=after, before=before)
+    except InvalidCursor:
+        flash('Invalid page link. Showing the first page.', 'warning')
+        return redirect(url_for('employee.list_employees', page_size=page_size))
+    return render_template('employee/list.html', employees=page['items'], title="Employees",
+                           page_size=page_size, next_cursor=page['next_cursor'], prev_cursor=page['prev_cursor'],
+                           page_size_choices=current_app.config.get('PAGE_SIZE_CHOICES', []))
+
+@employee_bp.route('/search')
+@login_required
+def search():
+    """Typeahead search endpoint. Returns JSON: {"results": [{id, name, email, employee_code, department}]}."""
+    term = request.args.get('q', '')
+    limit = request.args.get('limit', type=int)
+    results = [{
+        'id': str(emp['_id']),
+        'name': f"{emp.get('first_name', '')} {emp.get('last_name', '')}".strip(),
+        'email': emp.get('email'),
+        'employee_code': emp.get('employee_code'),
+        'department': emp.get('department'),
+        'url': url_for('employee.detail', id=emp['_id']),
+    } for emp in Employee.search(term, limit=limit)]
+    return jsonify(results=results)
+
+
+@employee_bp.route('/export')
+@login_required
+@role_required(['admin', 'hr']) # Payroll/HR data dumps only
+def export_employees():
+    """
+    Streams employees as CSV or NDJSON.
+
+    Query parameters:
+        format: 'csv' (default) or 'ndjson'
+        fields: comma-separated column list (see Employee.EXPORT_FIELDS)
+        from / to: YYYY-MM-DD bounds on 'last_updated' (for incremental dumps)
+        department: only employees of this department
+    """
+    try:
+        export_format, fields, date_from, date_to = parse_export_args(
+            request.args, Employee.EXPORT_FIELDS, Employee.EXPORT_FIELDS)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    query = date_range_filter('last_updated', date_from, date_to)
+    if request.args.get('department'):
+        query['department'] = request.args['department']
+
+    cursor = Employee.export_cursor(query, fields)
+    return stream_export(cursor, fields, export_format, 'employees')
+
+
+@employee_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+@role_required(['admin', 'hr'])
+def import_employees_upload():
+    """Bulk-import employees from an uploaded CSV or JSONL file."""
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV or JSONL file to import.', 'warning')
+            return render_template('employee/import.html', title="Import Employees")
+
+        file_format = 'jsonl' if upload.filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+        try:
+            report = import_employees(upload.stream, file_format=file_format).to_dict()
+        except Exception as e:
+            current_app.logger.error(f"Employee import of '{upload.filename}' failed: {e}", exc_info=True)
+            flash(f"Error importing employees: {e}", 'danger')
+            return render_template('employee/import.html', title="Import Employees")
+
+        category = 'success' if report['inserted'] and not report['errors'] else 'warning'
+        flash(f"Imported {report['inserted']} of {report['total_rows']} rows "
+              f"({report['rows_per_second']} rows/s).", category)
+
+    return render_template('employee/import.html', title="Import Employees", report=report)
+
 
 @employee_bp.route('/<id>')
 @login_required
@@ -67,16 +158,22 @@ def add_employee():
             flash('First Name, Last Name, and Email are required.', 'warning')
             return render_template('employee/form.html', title="Add Employee", employee=form_data) # Pass data back
 
-        # Check if employee code or email already exists (if they should be unique)
-        if Employee.find_by_employee_code(form_data['employee_code']):
-             flash(f"Employee code '{form_data['employee_code']}' already exists.", 'danger')
-             return render_template('employee/form.html', title="Add Employee", employee=form_data)
+        # Uniqueness of employee code and email is enforced by the unique indexes
+        # (emp_code_uniq_idx / emp_email_uniq_idx), so no lookup round trip is needed first.
+        # Blank optional codes are dropped so the sparse index doesn't see them as duplicates.
+        if not form_data['employee_code']:
+            form_data.pop('employee_code')
 
         # --- Create Employee ---
         try:
             employee_id = Employee.create(form_data)
             flash(f"Employee '{form_data['first_name']} {form_data['last_name']}' added successfully!", 'success')
             return redirect(url_for('employee.detail', id=employee_id))
+        except DuplicateKeyError as e:
+            field = Employee.duplicate_field(e.details)
+            label = {'employee_code': 'Employee code', 'email': 'Email'}.get(field, 'A unique field')
+            flash(f"{label} '{form_data.get(field, '')}' already exists.", 'danger')
+            return render_template('employee/form.html', title="Add Employee", employee=form_data)
         except Exception as e:
             flash(f"Error adding employee: {e}", 'danger')
             # Log the error e
@@ -1,15 +1,24 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, jsonify
 from flask_login import login_required, current_user
 from ..models.leave import LeaveRequest
+from ..models.leave_balance import LeaveBalance, InsufficientBalance
+from ..models.absence_report import AbsenceReport
 from ..models.employee import Employee # May need employee details
+from ..export import parse_export_args, date_range_filter, stream_export
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+import calendar
 
 # Import role decorator if needed
-# from .employee import role_required
+from .employee import role_required, get_page_size
+from ..models.pagination import InvalidCursor
 
 leave_bp = Blueprint('leave', __name__)
 
+# Years the leave calendar can be opened for
+CALENDAR_FIRST_YEAR = 1900
+CALENDAR_LAST_YEAR = 9998
+
 
 @leave_bp.route('/request', methods=['GET', 'POST'])
 @login_required
@@ -33,18 +42,29 @@ def request_leave():
             if start_date > end_date:
                  flash('Start date cannot be after end date.', 'warning')
                  return render_template('leave/request_form.html', title="Request Leave", form_data=request.form)
+            max_span = current_app.config['LEAVE_MAX_SPAN_DAYS']
+            if (end_date - start_date).days + 1 > max_span:
+                 flash(f'A single leave request cannot span more than {max_span} days.', 'warning')
+                 return render_template('leave/request_form.html', title="Request Leave", form_data=request.form)
 
-            # Check leave balance (Requires more logic based on Employee model and leave policies)
-
+            entitlements = current_app.config['LEAVE_ENTITLEMENTS']
+            region = Employee.region_for_user(current_user.get_id(), current_user.email)
             data = {
                 'user_id': ObjectId(current_user.get_id()),
+                'region': region,
                 # 'employee_id': find employee id associated with user_id if needed
                 'leave_type': leave_type,
                 'start_date': start_date,
                 'end_date': end_date,
                 'reason': reason,
             }
-            leave_id = LeaveRequest.create(data)
+            # The balance is checked and the days reserved in one atomic ledger update per year
+            try:
+                leave_id = LeaveRequest.create(data, entitlements)
+            except InsufficientBalance as e:
+                flash(str(e), 'warning')
+                return render_template('leave/request_form.html', title="Request Leave", form_data=request.form,
+                                       leave_types=list(entitlements), balances=_current_balances())
             flash('Leave request submitted successfully!', 'success')
             return redirect(url_for('leave.view_history'))
 
@@ -58,18 +78,71 @@ def request_leave():
 
 
     # GET request
-    # Fetch leave types from config or DB maybe
-    leave_types = ['Annual', 'Sick', 'Unpaid', 'Maternity', 'Paternity'] # Example
-    return render_template('leave/request_form.html', title="Request Leave", leave_types=leave_types)
+    # Leave types come from the configured leave policy
+    leave_types = list(current_app.config['LEAVE_ENTITLEMENTS'])
+    return render_template('leave/request_form.html', title="Request Leave", leave_types=leave_types,
+                           balances=_current_balances())
+
+
+def _current_balances():
+    """ The current user's balance table for this year. """
+    return LeaveBalance.summarize(current_user.get_id(), datetime.utcnow().year,
+                                  current_app.config['LEAVE_ENTITLEMENTS'])
+
+
+@leave_bp.route('/balances')
+@login_required
+def view_balances():
+    """ Shows the current user's leave balances for a year (read from the ledger). """
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    balances = LeaveBalance.summarize(current_user.get_id(), year, current_app.config['LEAVE_ENTITLEMENTS'])
+    return render_template('leave/balances.html', title="My Leave Balances", balances=balances, year=year)
+
+
+@leave_bp.route('/cancel/<request_id>', methods=['POST'])
+@login_required
+def cancel_leave(request_id):
+    """ Lets an employee cancel their own Pending or Approved request. """
+    if LeaveRequest.cancel(request_id, current_user.get_id()):
+        flash('Leave request cancelled.', 'success')
+    else:
+        flash('Failed to cancel leave request.', 'danger')
+    return redirect(url_for('leave.view_history'))
 
 
 @leave_bp.route('/history')
 @login_required
 def view_history():
-    """ Shows the current user's leave request history. """
+    """ Shows the current user's leave request history, filtered and keyset-paginated. """
     user_id = current_user.get_id()
-    requests = LeaveRequest.find_by_user(user_id, sort=[('requested_on', -1)]) # Newest first
-    return render_template('leave/history.html', title="My Leave History", requests=requests)
+    page_size = get_page_size()
+    filters = {
+        'status': request.args.get('status') or None,
+        'leave_type': request.args.get('leave_type') or None,
+        'from': request.args.get('from') or None,
+        'to': request.args.get('to') or None,
+    }
+    try:
+        date_from = datetime.strptime(filters['from'], '%Y-%m-%d') if filters['from'] else None
+        date_to = datetime.strptime(filters['to'], '%Y-%m-%d') if filters['to'] else None
+    except ValueError:
+        flash('Invalid date filter. Please use YYYY-MM-DD.', 'warning')
+        return redirect(url_for('leave.view_history'))
+
+    try:
+        page = LeaveRequest.find_history_page(
+            user_id, status=filters['status'], leave_type=filters['leave_type'],
+            date_from=date_from, date_to=date_to, page_size=page_size,
+            after=request.args.get('after'), before=request.args.get('before'))
+    except InvalidCursor:
+        flash('Invalid page link. Showing the first page.', 'warning')
+        return redirect(url_for('leave.view_history', page_size=page_size, **{k: v for k, v in filters.items() if v}))
+
+    return render_template('leave/history.html', title="My Leave History", requests=page['items'],
+                           filters=filters, statuses=['Pending', 'Approved', 'Rejected', 'Cancelled'],
+                           leave_types=list(current_app.config['LEAVE_ENTITLEMENTS']),
+                           page_size=page_size, page_size_choices=current_app.config.get('PAGE_SIZE_CHOICES', []),
+                           next_cursor=page['next_cursor'], prev_cursor=page['prev_cursor'])
 
 
 @leave_bp.route('/approvals')
@@ -82,23 +155,45 @@ def view_approvals():
         flash('You do not have permission to view leave approvals.', 'danger')
         return redirect(url_for('main.dashboard'))
 
-    # Adapt based on approval workflow (e.g., manager approves own team)
+    # Managers see the requests of their reports (approver resolved through the
+    # employee hierarchy); HR/admin see the whole company's queue
     manager_id = None
     if current_user.role == 'manager':
-        manager_id = current_user.get_id() # Assuming manager's user_id is used
-
-    pending_requests = LeaveRequest.find_pending_approvals(manager_id=manager_id)
+        manager_id = current_user.get_id()
 
-    # Enhance: Fetch employee names for display
-    # enriched_requests = []
-    # for req in pending_requests:
-    #     user = User.get_by_id(req['user_id']) # Fetch user details
-    #     req['requester_name'] = user.username if user else 'Unknown User'
-    #     enriched_requests.append(req)
+    # Requester names/departments are resolved for the whole page in batched queries
+    pending_requests = LeaveRequest.find_pending_approvals_enriched(manager_id=manager_id)
 
     return render_template('leave/approvals.html', title="Leave Approvals", requests=pending_requests)
 
 
+@leave_bp.route('/export')
+@login_required
+@role_required(['admin', 'hr']) # Payroll/HR data dumps only
+def export_leave():
+    """
+    Streams leave requests as CSV or NDJSON.
+
+    Query parameters:
+        format: 'csv' (default) or 'ndjson'
+        fields: comma-separated column list (see LeaveRequest.EXPORT_FIELDS)
+        from / to: YYYY-MM-DD bounds on 'start_date' (served by leave_startdate_idx)
+        status: only requests with this status (e.g. 'Approved')
+    """
+    try:
+        export_format, fields, date_from, date_to = parse_export_args(
+            request.args, LeaveRequest.EXPORT_FIELDS, LeaveRequest.EXPORT_FIELDS)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    query = date_range_filter('start_date', date_from, date_to)
+    if request.args.get('status'):
+        query['status'] = request.args['status']
+
+    cursor = LeaveRequest.export_cursor(query, fields)
+    return stream_export(cursor, fields, export_format, 'leave_requests')
+
+
 @leave_bp.route('/approve/<request_id>', methods=['POST'])
 @login_required
 # @role_required(['manager', 'hr', 'admin'])
@@ -107,9 +202,11 @@ def approve_leave(request_id):
         flash('Permission denied.', 'danger')
         return redirect(url_for('leave.view_approvals'))
 
-    # Add check: Does this manager ACTUALLY have permission to approve THIS request?
+    # Managers may only decide requests routed to them; HR/admin may decide any
+    manager_id = current_user.get_id() if current_user.role == 'manager' else None
 
-    success = LeaveRequest.update_status(request_id, 'Approved', current_user.get_id())
+    success = LeaveRequest.update_status(request_id, 'Approved', current_user.get_id(), manager_id=manager_id,
+                                          from_statuses=['Pending'])
     if success:
         flash('Leave request approved.', 'success')
         # Add notification logic here (e.g., email employee)
@@ -126,10 +223,12 @@ def reject_leave(request_id):
         flash('Permission denied.', 'danger')
         return redirect(url_for('leave.view_approvals'))
 
-    # Add check: Does this manager ACTUALLY have permission to reject THIS request?
+    # Managers may only decide requests routed to them; HR/admin may decide any
+    manager_id = current_user.get_id() if current_user.role == 'manager' else None
 
     comments = request.form.get('rejection_reason', '') # Optional reason from form
-    success = LeaveRequest.update_status(request_id, 'Rejected', current_user.get_id(), comments)
+    success = LeaveRequest.update_status(request_id, 'Rejected', current_user.get_id(), comments,
+                                          manager_id=manager_id, from_statuses=['Pending'])
     if success:
         flash('Leave request rejected.', 'success')
         # Add notification logic here
@@ -137,5 +236,171 @@ def reject_leave(request_id):
         flash('Failed to reject leave request.', 'danger')
     return redirect(url_for('leave.view_approvals'))
 
-# Add routes for cancelling a request (by employee)
-# Add route for viewing leave balances
\ No newline at end of file
+
+@leave_bp.route('/bulk-decision', methods=['POST'])
+@login_required
+def bulk_decision():
+    """
+    Approves or rejects many requests at once.
+
+    Form (or JSON) fields:
+        request_ids: one or more request ids
+        decision: 'approve' or 'reject'
+        comments: optional, stored on every decided request
+
+    Returns per-item results as JSON for JSON/AJAX callers; otherwise flashes a
+    summary and redirects back to the approvals page.
+    """
+    wants_json = request.is_json or request.accept_mimetypes.best == 'application/json'
+    if current_user.role not in ['manager', 'hr', 'admin']:
+        if wants_json:
+            return jsonify(error='Permission denied.'), 403
+        flash('Permission denied.', 'danger')
+        return redirect(url_for('leave.view_approvals'))
+
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            payload = {}
+        request_ids = payload.get('request_ids') or []
+        decision = payload.get('decision') or ''
+        comments = payload.get('comments') or None
+    else:
+        request_ids = request.form.getlist('request_ids')
+        decision = request.form.get('decision', '')
+        comments = request.form.get('comments') or None
+    # JSON bodies can hold any type: a string here would be iterated character by character
+    valid_ids = isinstance(request_ids, list) and all(isinstance(rid, str) for rid in request_ids)
+    status = {'approve': 'Approved', 'reject': 'Rejected'}.get(decision.lower()) if isinstance(decision, str) else None
+
+    limit = current_app.config.get('BULK_DECISION_LIMIT', 1000)
+    error = None
+    if not valid_ids:
+        error = 'request_ids must be a list of request id strings.'
+    elif comments is not None and not isinstance(comments, str):
+        error = 'comments must be a string.'
+    elif not status:
+        error = "Decision must be 'approve' or 'reject'."
+    elif not request_ids:
+        error = 'Select at least one request.'
+    elif len(request_ids) > limit:
+        error = f'At most {limit} requests can be decided at once.'
+    if error:
+        if wants_json:
+            return jsonify(error=error), 400
+        flash(error, 'warning')
+        return redirect(url_for('leave.view_approvals'))
+
+    # Managers may only decide requests routed to them; HR/admin may decide any
+    manager_id = current_user.get_id() if current_user.role == 'manager' else None
+    results = LeaveRequest.bulk_decide(request_ids, status, current_user.get_id(), comments, manager_id=manager_id)
+
+    if wants_json:
+        return jsonify(status=status, results=[
+            {'id': rid, 'result': code, 'message': LeaveRequest.BULK_RESULT_MESSAGES.get(code, code)}
+            for rid, code in results.items()
+        ])
+
+    done = sum(1 for code in results.values() if code == 'ok')
+    failed = len(results) - done
+    flash(f"{done} request(s) {status.lower()}." + (f" {failed} could not be updated." if failed else ''),
+          'success' if not failed else 'warning')
+    return redirect(url_for('leave.view_approvals'))
+
+
+def _calendar_args():
+    """
+    Resolves and authorizes the calendar scope from the query string.
+
+    Returns:
+        tuple: (scope, key, year, month), or (None, error message, None, None).
+    """
+    today = datetime.utcnow()
+    try:
+        month_arg = request.args.get('month') or today.strftime('%Y-%m')
+        month_date = datetime.strptime(month_arg, '%Y-%m')
+    except ValueError:
+        return None, 'Month must be in YYYY-MM format.', None, None
+    # Leaves room for the previous/next month links and the month view's look-back window
+    if not CALENDAR_FIRST_YEAR <= month_date.year <= CALENDAR_LAST_YEAR:
+        return None, f'Month must be between {CALENDAR_FIRST_YEAR} and {CALENDAR_LAST_YEAR}.', None, None
+
+    privileged = current_user.role in ['hr', 'admin']
+    scope = request.args.get('scope') or ('team' if current_user.role == 'manager' else 'department')
+    if scope not in LeaveRequest.CALENDAR_SCOPES:
+        return None, "Scope must be 'department' or 'team'.", None, None
+
+    key = request.args.get('key')
+    if scope == 'team':
+        # Managers see their own team; HR/admin may pick any manager's team
+        if not key or not privileged:
+            key = current_user.get_id()
+        if not privileged and current_user.role != 'manager':
+            return None, 'Only managers have a team calendar.', None, None
+        try:
+            ObjectId(key)
+        except Exception:
+            return None, 'Invalid team.', None, None
+    else:
+        own = Employee.find_for_user(current_user.get_id(), current_user.email, {'department': 1}) or {}
+        if not key or not privileged:
+            key = own.get('department')
+        if not key:
+            return None, 'No department is recorded for your employee profile.', None, None
+    return scope, key, month_date.year, month_date.month
+
+
+@leave_bp.route('/calendar')
+@login_required
+def view_calendar():
+    """ "Who's out" month calendar for a department or a manager's team. """
+    scope, key, year, month = _calendar_args()
+    if scope is None:
+        flash(key, 'warning')
+        return redirect(url_for('main.dashboard'))
+    view = LeaveRequest.month_view(scope, key, year, month)
+    prev_month = (datetime(year, month, 1) - timedelta(days=1)).strftime('%Y-%m')
+    next_month = (datetime(year, month, 28) + timedelta(days=4)).strftime('%Y-%m')
+    return render_template('leave/calendar.html', title="Leave Calendar", view=view,
+                           weeks=calendar.monthcalendar(year, month), month_name=calendar.month_name[month],
+                           prev_month=prev_month, next_month=next_month)
+
+
+@leave_bp.route('/calendar/data')
+@login_required
+def calendar_data():
+    """ JSON form of the leave calendar (same parameters as view_calendar). """
+    scope, key, year, month = _calendar_args()
+    if scope is None:
+        return jsonify(error=key), 400
+    return jsonify(LeaveRequest.month_view(scope, key, year, month))
+
+
+def _absence_report():
+    """ Builds the absence report for the 'year' and 'department' query parameters. """
+    if current_app.config.get('ABSENCE_REFRESH_ON_READ', False):
+        # Cheap when nothing changed: one read of the (usually empty) queue
+        AbsenceReport.refresh_dirty(max_span_days=current_app.config['LEAVE_MAX_SPAN_DAYS'])
+    year = request.args.get('year', datetime.utcnow().year, type=int)
+    department = request.args.get('department') or None
+    return year, department, AbsenceReport.year_report(year, department,
+                                                       current_app.config.get('DEFAULT_HOLIDAY_REGION'))
+
+
+@leave_bp.route('/reports/absence')
+@login_required
+@role_required(['admin', 'hr'])
+def absence_report():
+    """ Absence rate by department and month, with leave type breakdown and monthly trend. """
+    year, department, report = _absence_report()
+    return render_template('leave/absence_report.html', title="Absence Report", year=year,
+                           department=department, report=report)
+
+
+@leave_bp.route('/reports/absence/data')
+@login_required
+@role_required(['admin', 'hr'])
+def absence_report_data():
+    """ JSON form of the absence report (same parameters as absence_report). """
+    year, department, report = _absence_report()
+    return jsonify(year=year, department=department, **report)
@@ -1,5 +1,14 @@
-from flask import Blueprint, render_template, redirect, url_for
+from flask import Blueprint, render_template, redirect, url_for, jsonify
 from flask_login import login_required, current_user
+from .employee import role_required
+from ..models.user import User
+from ..models.employee import Employee
+from ..models.leave import LeaveRequest
+from .. import leave_duration
+from .. import throttle
+from .. import slow_queries
+from ..monitoring import pool_metrics
+import os
 
 main_bp = Blueprint('main', __name__)
 
@@ -32,6 +41,25 @@ def dashboard():
         total_employees=total_employees
     )
 
+@main_bp.route('/admin/cache-stats')
+@login_required
+@role_required(['admin'])
+def cache_stats():
+    """ This worker process's cache hit/miss, login throttle and MongoDB connection pool counters (JSON). """
+    return jsonify(pid=os.getpid(), caches={
+        'user_loader': User.session_cache.stats(),
+        'employee_search': Employee.search_cache.stats(),
+        'leave_calendar': LeaveRequest.calendar_cache.stats(),
+        'holiday_calendars': leave_duration.cache_stats(),
+    }, login_throttle=throttle.stats(), mongo_pool=pool_metrics.stats())
+
+@main_bp.route('/admin/slow-queries')
+@login_required
+@role_required(['admin'])
+def slow_query_log():
+    """ This worker process's recent slow model queries with their explain() summaries (JSON). """
+    return jsonify(pid=os.getpid(), stats=slow_queries.stats(), queries=slow_queries.recent())
+
 # You might have a public landing page if the root is not the dashboard
 # @main_bp.route('/welcome')
 # def welcome():
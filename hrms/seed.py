@@ -0,0 +1,484 @@
+# hrms/seed.py
+
+"""
+Synthetic HR data for staging environments and performance tests ('flask seed').
+
+Generates users, employees and multi-year leave histories:
+  - Employees are spread over departments of realistic (uneven) sizes. Each department
+    is a management tree: a head, managers with up to FANOUT reports, and so on down, so
+    approvals, team calendars and manager chains behave as in a real organisation.
+  - Every employee has a login; managers and department heads get the 'manager' role,
+    Human Resources staff the 'hr' role.
+  - Leave histories follow seasonal patterns (summer and December holidays, winter
+    sickness), per-person sickness propensity, annual leave budgeted against the entitlement,
+    rare unpaid/parental leave, and status mixes that depend on whether the leave is in
+    the past (mostly Approved) or the future (mostly Pending).
+
+Output is deterministic: each chunk of employees draws from its own RNG seeded with
+(seed, chunk number), and ObjectIds are derived from counters, so the same seed, volumes
+and chunk size produce the same documents whatever the number of worker processes
+(dates are relative to the day of the run). Running it again with the same seed therefore
+inserts nothing: every document hits the unique _id index and is counted as a duplicate
+instead of failing the run. A different seed writes new documents; give it its own
+--domain and --code-prefix so usernames, emails and employee codes don't collide with
+the first run's (collisions are skipped by the unique indexes, too).
+
+Documents are written with unordered insert_many in batches, optionally from a pool of
+worker processes each with its own MongoDB client.
+
+Seeding refuses to run against a database whose users or employees include documents it
+did not generate (recognised by their ObjectIds, see object_id), so it is not run against
+production by mistake; pass force=True or set SEED_ALLOWED to seed such a database anyway.
+Unless a password is given, the users inserted by a run share a random one, returned in the
+totals; users inserted by earlier runs keep the password they were created with.
+"""
+
+import math
+import multiprocessing
+import random
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# (name, share of headcount in %, job title of individual contributors); shares sum to 100
+DEPARTMENTS = [
+    ('Engineering', 28, 'Software Engineer'),
+    ('Sales', 16, 'Account Executive'),
+    ('Operations', 12, 'Operations Specialist'),
+    ('Support', 10, 'Support Specialist'),
+    ('Marketing', 7, 'Marketing Specialist'),
+    ('Product', 6, 'Product Manager'),
+    ('Finance', 5, 'Accountant'),
+    ('Human Resources', 4, 'HR Generalist'),
+    ('Design', 4, 'Designer'),
+    ('Legal', 3, 'Counsel'),
+    ('Procurement', 3, 'Buyer'),
+    ('Facilities', 2, 'Facilities Coordinator'),
+]
+HR_DEPARTMENT = 'Human Resources'
+FANOUT = 8 # Direct reports per manager
+
+FIRST_NAMES = ['James', 'Mary', 'Ahmed', 'Fatima', 'Wei', 'Mei', 'Carlos', 'Sofia', 'Ivan', 'Olga', 'Raj',
+               'Priya', 'John', 'Aisha', 'Kenji', 'Yuki', 'Liam', 'Emma', 'Noah', 'Chloe', 'Omar', 'Layla',
+               'Lucas', 'Ana', 'Mateo', 'Elena', 'David', 'Sara', 'Daniel', 'Nadia', 'Samuel', 'Grace',
+               'Hassan', 'Zara', 'Tom', 'Ingrid', 'Kwame', 'Amara', 'Pedro', 'Hana']
+LAST_NAMES = ['Smith', 'Khan', 'Wang', 'Garcia', 'Ivanov', 'Patel', 'Brown', 'Nakamura', 'Jones', 'Haddad',
+              'Silva', 'Kim', 'Muller', 'Rossi', 'Nguyen', 'Okafor', 'Cohen', 'Larsen', 'Hughes', 'Moreau',
+              'Novak', 'Sato', 'Fernandes', 'Ali', 'Johansson', 'Mensah', 'Dubois', 'Kowalski', 'Reyes',
+              'Schmidt', 'Chen', 'Singh', 'Taylor', 'Lopez', 'Yilmaz', 'Andersen', 'Costa', 'Park']
+
+# Relative weights of the month (Jan..Dec) a leave starts in
+ANNUAL_SEASON = [4, 5, 6, 7, 8, 10, 15, 15, 7, 6, 5, 12]
+SICK_SEASON = [14, 13, 10, 8, 6, 5, 5, 5, 6, 8, 10, 12]
+
+# Yearly averages per employee (before --leave-rate scaling)
+ANNUAL_TRIPS_PER_YEAR = 4.0
+SICK_SPELLS_PER_YEAR = 2.0
+UNPAID_CHANCE_PER_YEAR = 0.03
+PARENTAL_CHANCE_PER_YEAR = 0.02
+
+# (business days, weight) of annual leave trips: long weekends to two-week holidays
+ANNUAL_LENGTHS = [(1, 30), (2, 10), (3, 15), (4, 10), (5, 20), (10, 15)]
+SICK_LENGTHS = [(1, 55), (2, 25), (3, 12), (5, 8)]
+
+# How far ahead leave is booked
+BOOKING_HORIZON_DAYS = 90
+
+ID_KINDS = {'user': 1, 'employee': 2, 'leave': 3}
+# Timestamp part of every generated ObjectId. Fixed (not the run date) so a re-run on a
+# later day produces the same _ids and is skipped as duplicates.
+ID_EPOCH = 1577836800 # 2020-01-01T00:00:00Z
+
+
+def object_id(kind, seed, n):
+    """Deterministic ObjectId: fixed 4-byte timestamp, 1-byte kind, 2-byte seed, 5-byte counter."""
+    return ObjectId(ID_EPOCH.to_bytes(4, 'big') + bytes([ID_KINDS[kind]]) + (seed % 65536).to_bytes(2, 'big')
+                    + n.to_bytes(5, 'big'))
+
+
+class SeedRefused(Exception):
+    """Raised when the database holds users or employees that were not generated by seeding."""
+
+
+def foreign_documents(db):
+    """
+    Counts users and employees whose _id was not produced by object_id (at most one of each).
+
+    Returns:
+        dict: Collection name -> 0 or 1.
+    """
+    found = {}
+    for collection, kind in (('users', 'user'), ('employees', 'employee')):
+        prefix = ID_EPOCH.to_bytes(4, 'big') + bytes([ID_KINDS[kind]])
+        lowest, highest = ObjectId(prefix + bytes(7)), ObjectId(prefix + b'\xff' * 7)
+        found[collection] = len(list(db[collection].find(
+            {'$or': [{'_id': {'$lt': lowest}}, {'_id': {'$gt': highest}}]}, {'_id': 1}).limit(1)))
+    return found
+
+
+class OrgChart:
+    """
+    Arithmetic organisation chart of N employees, so any chunk of employees can be generated
+    independently: employee i's department, rank in it and manager are computed, not looked up.
+
+    Departments repeat in a fixed pattern of 100 slots (slot counts = headcount shares).
+    Within a department, rank 0 is the head and rank r > 0 reports to rank (r - 1) // FANOUT.
+    """
+
+    def __init__(self, employees, departments=DEPARTMENTS, fanout=FANOUT):
+        self.employees = employees
+        self.departments = departments
+        self.fanout = fanout
+        shares = [share for _, share, _ in departments]
+        self.period = sum(shares)
+        # Spread each department's slots evenly over the pattern (largest deficit first)
+        self.pattern = []
+        for k in range(self.period):
+            given = [self.pattern.count(d) for d in range(len(departments))]
+            deficits = [shares[d] * (k + 1) / self.period - given[d] for d in range(len(departments))]
+            self.pattern.append(max(range(len(departments)), key=lambda d: deficits[d]))
+        self.slots = {d: [k for k, dd in enumerate(self.pattern) if dd == d] for d in range(len(departments))}
+        self.slot_rank = [self.slots[d].index(k) for k, d in enumerate(self.pattern)]
+
+    def department(self, i):
+        return self.pattern[i % self.period]
+
+    def rank(self, i):
+        d = self.department(i)
+        return (i // self.period) * len(self.slots[d]) + self.slot_rank[i % self.period]
+
+    def size(self, d):
+        full, rest = divmod(self.employees, self.period)
+        return full * len(self.slots[d]) + sum(1 for k in self.slots[d] if k < rest)
+
+    def index(self, d, rank):
+        """Inverse of (department, rank): the employee number."""
+        block, within = divmod(rank, len(self.slots[d]))
+        return block * self.period + self.slots[d][within]
+
+    def manager(self, i):
+        """Employee number of i's manager, or None for a department head."""
+        rank = self.rank(i)
+        return None if rank == 0 else self.index(self.department(i), (rank - 1) // self.fanout)
+
+    def has_reports(self, i):
+        return self.rank(i) * self.fanout + 1 < self.size(self.department(i))
+
+    def level(self, i):
+        """0 for the head, 1 for its reports, ..."""
+        rank, level = self.rank(i), 0
+        while rank:
+            rank = (rank - 1) // self.fanout
+            level += 1
+        return level
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _poisson(rng, mean):
+    """Poisson-distributed count (Knuth's method; means here are small)."""
+    limit, k, p = math.exp(-mean), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _add_business_days(start, days):
+    """Calendar end date of a leave of 'days' working days (Mon-Fri) starting on 'start'."""
+    end, remaining = start, days - 1
+    while remaining > 0:
+        end += timedelta(days=1)
+        if end.weekday() < 5:
+            remaining -= 1
+    return end
+
+
+def _start_in_month(rng, year, month, first, last, monday=False):
+    """A random weekday (optionally a Monday) in year/month within [first, last], or None."""
+    month_start = datetime(year, month, 1)
+    month_end = (datetime(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+    low, high = max(month_start, first), min(month_end, last)
+    if low > high:
+        return None
+    day = low + timedelta(days=rng.randrange((high - low).days + 1))
+    shift = (7 - day.weekday()) % 7 if monday else (7 - day.weekday() if day.weekday() >= 5 else 0)
+    day += timedelta(days=shift)
+    return day if day <= last else None
+
+
+def _employee(plan, org, rng, i, now):
+    """Builds the user and employee documents of employee number i."""
+    from .models.employee import Employee
+    d = org.department(i)
+    department, _, title = org.departments[d]
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f"{first}.{last}.{i}@{plan['domain']}".lower()
+    level, has_reports = org.level(i), org.has_reports(i)
+    if level == 0:
+        designation = f'Head of {department}'
+    elif has_reports:
+        designation = 'Manager' if level == 1 else 'Team Lead'
+    else:
+        designation = f'Senior {title}' if rng.random() < 0.3 else title
+    status = _weighted(rng, [('active', 95), ('inactive', 2), ('terminated', 3)])
+    # Heads and managers have been around longer
+    tenure_days = int(rng.triangular(30, 365 * 12, 365 * (6 if has_reports else 2)))
+    manager = org.manager(i)
+    user_id = object_id('user', plan['seed'], i)
+    user = {
+        '_id': user_id, 'username': f'{first}.{last}{i}'.lower(), 'email': email,
+        'password_hash': plan['password_hash'],
+        'role': 'manager' if has_reports else ('hr' if department == HR_DEPARTMENT else 'employee'),
+        'is_active': status != 'terminated',
+    }
+    employee = {
+        '_id': object_id('employee', plan['seed'], i), 'user_id': user_id,
+        'employee_code': f"{plan['code_prefix']}{i:07d}", 'first_name': first, 'last_name': last,
+        'email': email, 'contact_no': f'+1-555-{rng.randrange(10000000):07d}',
+        'department': department, 'designation': designation,
+        'date_of_joining': now - timedelta(days=tenure_days),
+        'manager_id': object_id('employee', plan['seed'], manager) if manager is not None else None,
+        'region': plan['regions'][i % len(plan['regions'])], 'status': status,
+        'date_added': now, 'last_updated': now,
+    }
+    employee['search_keys'] = Employee.build_search_keys(employee)
+    return user, employee
+
+
+def _leave_history(plan, org, rng, i, employee, now):
+    """Generates employee i's leave requests from joining (or the history start) until the booking horizon."""
+    entitlements = plan['entitlements']
+    manager = org.manager(i)
+    # Department heads' requests go to HR (approver None), decided by the head of HR
+    approver = object_id('user', plan['seed'], manager) if manager is not None else None
+    decider = approver or plan['hr_head_user_id']
+    horizon = now + timedelta(days=BOOKING_HORIZON_DAYS)
+    first_day = max(employee['date_of_joining'], now - timedelta(days=365 * plan['years']))
+    sickliness = min(rng.lognormvariate(0, 0.6), 4.0) # Some people are rarely ill, a few often
+    rate = plan['leave_rate']
+    requests = []
+
+    def add(leave_type, start, days, booked_ahead):
+        # Maternity leave is counted in calendar days, everything else in working days
+        end = start + timedelta(days=days - 1) if leave_type == 'Maternity' else _add_business_days(start, days)
+        requested_on = start - timedelta(days=booked_ahead, minutes=rng.randrange(8 * 60, 18 * 60))
+        if requested_on > now or start < first_day:
+            return # Not requested yet / before the history starts
+        if start > now:
+            status = _weighted(rng, [('Pending', 75), ('Approved', 25)])
+        elif leave_type == 'Sick':
+            status = _weighted(rng, [('Approved', 97), ('Cancelled', 3)])
+        else:
+            status = _weighted(rng, [('Approved', 88), ('Rejected', 4), ('Cancelled', 8)])
+        doc = {
+            '_id': object_id('leave', plan['seed'], (i << 12) + len(requests)),
+            'user_id': employee['user_id'], 'leave_type': leave_type, 'start_date': start, 'end_date': end,
+            'reason': leave_type + ' leave', 'status': status, 'requested_on': requested_on,
+            'approver_id': approver, 'region': employee['region'], 'department': employee['department'],
+        }
+        if status in ('Approved', 'Rejected'):
+            decided = min(requested_on + timedelta(hours=rng.randrange(1, 96)), now)
+            doc.update(approved_by=decider, approved_on=decided)
+            if status == 'Rejected':
+                doc['comments'] = 'Team coverage'
+        requests.append(doc)
+
+    for year in range(first_day.year, horizon.year + 1):
+        year_first = max(first_day, datetime(year, 1, 1))
+        year_last = min(horizon, datetime(year, 12, 31))
+        if year_first > year_last:
+            continue
+        share = ((year_last - year_first).days + 1) / 365.0
+
+        # Annual leave: seasonal trips within the year's entitlement
+        budget = entitlements.get('Annual') or 25
+        for _ in range(_poisson(rng, ANNUAL_TRIPS_PER_YEAR * share * rate)):
+            days = _weighted(rng, ANNUAL_LENGTHS)
+            if days > budget:
+                continue
+            month = rng.choices(range(1, 13), ANNUAL_SEASON)[0]
+            start = _start_in_month(rng, year, month, year_first, year_last, monday=days >= 5)
+            if start:
+                budget -= days
+                add('Annual', start, days, rng.randint(7, 60))
+
+        # Sickness: short winter-heavy spells, reported on the day (or after)
+        for _ in range(_poisson(rng, SICK_SPELLS_PER_YEAR * share * rate * sickliness)):
+            month = rng.choices(range(1, 13), SICK_SEASON)[0]
+            start = _start_in_month(rng, year, month, year_first, min(year_last, now))
+            if start:
+                add('Sick', start, _weighted(rng, SICK_LENGTHS), -rng.randint(0, 1))
+
+        if rng.random() < UNPAID_CHANCE_PER_YEAR * rate:
+            start = _start_in_month(rng, year, rng.randint(1, 12), year_first, year_last, monday=True)
+            if start:
+                add('Unpaid', start, rng.randint(5, 20), rng.randint(20, 90))
+
+        if rng.random() < PARENTAL_CHANCE_PER_YEAR * rate:
+            leave_type = rng.choice(['Maternity', 'Paternity'])
+            start = _start_in_month(rng, year, rng.randint(1, 12), year_first, year_last, monday=True)
+            if start:
+                days = 126 if leave_type == 'Maternity' else entitlements.get('Paternity') or 10
+                add(leave_type, start, days, rng.randint(30, 90))
+    return requests
+
+
+def _insert(collection, docs, totals, key):
+    """Unordered insert_many; documents rejected by a unique index are counted, not raised."""
+    if not docs:
+        return
+    try:
+        totals[key] += len(collection.insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        duplicates = sum(1 for err in errors if err.get('code') == 11000)
+        if duplicates != len(errors):
+            raise
+        totals[key] += e.details.get('nInserted', 0)
+        totals['duplicates'] += duplicates
+
+
+def seed_chunk(plan, chunk):
+    """
+    Generates and inserts one chunk of employees (users, employees and their leave).
+    Runs in the calling process or in a pool worker.
+
+    Returns:
+        dict: Inserted counts and duplicates skipped.
+    """
+    from . import get_db, leave_duration
+    db = get_db()
+    now = plan['now']
+    org = OrgChart(plan['employees'])
+    rng = random.Random(f"{plan['seed']}:{chunk}")
+    first = chunk * plan['chunk_size']
+    last = min(first + plan['chunk_size'], plan['employees'])
+    totals = {'users': 0, 'employees': 0, 'leave_requests': 0, 'duplicates': 0}
+
+    users, employees, leave = [], [], []
+    for i in range(first, last):
+        user, employee = _employee(plan, org, rng, i, now)
+        users.append(user)
+        employees.append(employee)
+        leave.extend(_leave_history(plan, org, rng, i, employee, now))
+    _insert(db.users, users, totals, 'users')
+    _insert(db.employees, employees, totals, 'employees')
+
+    # Working days as LeaveRequest.create stores them, computed per batch with the vectorized helpers
+    for start in range(0, len(leave), plan['batch_size']):
+        batch = leave[start:start + plan['batch_size']]
+        by_year = leave_duration.business_days_for_requests(batch)
+        by_month = leave_duration.business_days_for_requests(batch, unit='M')
+        for doc, years, months in zip(batch, by_year, by_month):
+            doc['days_by_year'] = {str(year): days for year, days in years.items()}
+            doc['duration_days'] = sum(years.values())
+            doc['days_by_month'] = months
+        _insert(db.leave_requests, batch, totals, 'leave_requests')
+    return totals
+
+
+def _init_worker(start_method):
+    # Forked workers inherit the configured app state (get_db() opens a client per process);
+    # spawned ones start empty and build it from Config
+    if start_method != 'fork':
+        from . import create_app
+        create_app()
+
+
+def seed_database(employees=1000, years=3, seed=42, workers=1, chunk_size=1000, batch_size=5000,
+                  leave_rate=1.0, password=None, regions=None, domain='example.com',
+                  code_prefix='EMP-', rebuild=True, progress=None, force=False):
+    """
+    Generates the dataset (call within an app context).
+
+    Args:
+        employees (int): Number of employees (each with a user account).
+        years (int): Years of leave history before today.
+        seed (int): Random seed.
+        workers (int): Worker processes (1 = generate in this process).
+        chunk_size (int): Employees per unit of work; part of what makes output reproducible.
+        batch_size (int): Leave requests per insert_many.
+        leave_rate (float): Multiplier on the average amount of leave.
+        password (str, optional): Password of the users this run inserts (hashed once); random if not given.
+        regions (list, optional): Holiday regions assigned round-robin (default: DEFAULT_HOLIDAY_REGION).
+        domain (str), code_prefix (str): Email domain and employee_code prefix.
+        rebuild (bool): Rebuild leave balance ledgers and absence rollups afterwards.
+        progress (callable, optional): Called with (chunks done, chunks total, totals so far).
+        force (bool): Seed even if the database holds users or employees not generated here.
+
+    Returns:
+        dict: Inserted counts, duplicates skipped, elapsed seconds, documents per second and
+            the generated users' password.
+
+    Raises:
+        SeedRefused: If the database holds non-generated users or employees, unless force
+            or SEED_ALLOWED.
+    """
+    from flask import current_app
+    from . import get_db, passwords
+    from .models.leave_balance import LeaveBalance
+    from .models.absence_report import AbsenceReport
+
+    if not force and not current_app.config.get('SEED_ALLOWED'):
+        found = [name for name, count in foreign_documents(get_db()).items() if count]
+        if found:
+            raise SeedRefused(f"The database already holds {' and '.join(found)} that were not generated by "
+                              f"seeding; refusing to add synthetic data to it.")
+    if password is None:
+        password = secrets.token_urlsafe(12)
+
+    started = time.perf_counter()
+    now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    org = OrgChart(employees)
+    hr = next(d for d, (name, _, _) in enumerate(DEPARTMENTS) if name == HR_DEPARTMENT)
+    plan = {
+        'employees': employees, 'years': years, 'seed': seed, 'chunk_size': chunk_size, 'batch_size': batch_size,
+        'leave_rate': leave_rate, 'domain': domain, 'code_prefix': code_prefix, 'now': now,
+        'regions': list(regions or [current_app.config['DEFAULT_HOLIDAY_REGION']]),
+        'entitlements': dict(current_app.config['LEAVE_ENTITLEMENTS']),
+        'password_hash': passwords.hash_password(password),
+        'hr_head_user_id': object_id('user', seed, org.index(hr, 0)) if org.size(hr) else None,
+    }
+    chunks = (employees + chunk_size - 1) // chunk_size
+    totals = {'users': 0, 'employees': 0, 'leave_requests': 0, 'duplicates': 0}
+
+    def collect(result, done):
+        for key, value in result.items():
+            totals[key] += value
+        if progress:
+            progress(done, chunks, totals)
+
+    if workers <= 1 or chunks <= 1:
+        for chunk in range(chunks):
+            collect(seed_chunk(plan, chunk), chunk + 1)
+    else:
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(start_method)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(start_method,)) as pool:
+            futures = [pool.submit(seed_chunk, plan, chunk) for chunk in range(chunks)]
+            for done, future in enumerate(as_completed(futures), 1):
+                collect(future.result(), done)
+
+    generated_seconds = time.perf_counter() - started
+    if rebuild:
+        totals['ledgers'] = LeaveBalance.rebuild()
+        totals['rollups'] = AbsenceReport.refresh(max_span_days=current_app.config['LEAVE_MAX_SPAN_DAYS'])
+    inserted = totals['users'] + totals['employees'] + totals['leave_requests']
+    totals['elapsed_seconds'] = round(time.perf_counter() - started, 1)
+    totals['docs_per_second'] = round(inserted / generated_seconds) if generated_seconds else 0
+    totals['password'] = password
+    log.info(f"Seeded {totals['users']} users, {totals['employees']} employees and {totals['leave_requests']} "
+             f"leave requests in {totals['elapsed_seconds']}s ({totals['duplicates']} duplicates skipped).")
+    return totals
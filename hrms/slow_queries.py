@@ -0,0 +1,303 @@
+# hrms/slow_queries.py
+
+"""
+Slow query recorder.
+
+Model methods run their reads through find() and aggregate() here. They time the query
+including fetching every result (the models materialize lists anyway), and anything slower
+than SLOW_QUERY_THRESHOLD_MS is logged with its filter *shape* (values replaced by their
+type, so no personal data reaches the logs), sort, collection, calling model method and
+duration.
+
+For a slow query, explain("executionStats") is re-run on a background thread and
+summarized: the stages of the winning plan, the index used, whether it was a COLLSCAN or
+needed an in-memory SORT, and keys/documents examined versus returned. When the plan
+shows a COLLSCAN or in-memory sort, an index following the equality-sort-range rule is
+suggested, which is usually what initialize_database is missing. Explains are rate-limited
+to one per query shape every SLOW_QUERY_EXPLAIN_INTERVAL seconds and one at a time per
+process, since each explain runs the query again.
+
+The most recent slow queries of this process are kept in memory for /admin/slow-queries.
+"""
+
+import json
+import threading
+import time
+from collections import deque, OrderedDict
+from datetime import datetime
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+# Settings, replaced from Config by configure() in create_app
+_settings = {
+    'enabled': True,
+    'threshold': 0.1, # seconds
+    'explain': True,
+    'explain_interval': 300, # seconds between explains of the same query shape
+}
+_lock = threading.Lock()
+_recent = deque(maxlen=100) # Most recent slow queries, newest last
+_last_explained = OrderedDict() # shape key -> monotonic time of its last explain
+_explaining = threading.Semaphore(1) # At most one explain running in this process
+_counts = {'slow': 0, 'explained': 0, 'explain_skipped': 0, 'explain_errors': 0}
+
+# Operators whose operand is matched for equality (first in an ESR index)
+EQUALITY_OPERATORS = {'$eq', '$in'}
+# Operators that make a field a range predicate (last in an ESR index)
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$regex', '$exists'}
+
+
+def configure(enabled=True, threshold_ms=100, explain=True, explain_interval=300, history=100):
+    """Applies configuration from Config."""
+    global _recent
+    with _lock:
+        _settings.update(enabled=enabled, threshold=threshold_ms / 1000.0, explain=explain,
+                         explain_interval=explain_interval)
+        _recent = deque(_recent, maxlen=history)
+
+
+def query_shape(value):
+    """
+    Replaces the values of a filter (or pipeline) with their type names, keeping field names,
+    operators and structure, e.g. {'user_id': ObjectId(..), 'start_date': {'$gte': datetime(..)}}
+    -> {'user_id': 'ObjectId', 'start_date': {'$gte': 'datetime'}}.
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Arrays of scalars ($in lists) collapse to one entry; arrays of clauses ($or) keep each
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return type(value).__name__
+
+
+def suggest_index(query, sort=None):
+    """
+    Suggests an index for a find using the equality-sort-range rule: fields matched for
+    equality first, then the sort keys, then fields with range predicates.
+
+    Returns:
+        list: (field, direction) tuples, or [] if nothing can be suggested (e.g. $or at the top).
+    """
+    equality, ranges = [], []
+    for field, condition in (query or {}).items():
+        if field.startswith('$'):
+            continue # $or / $and / $text need their own analysis
+        if isinstance(condition, dict) and any(op.startswith('$') for op in condition):
+            operators = set(condition)
+            if operators <= EQUALITY_OPERATORS:
+                equality.append(field)
+            elif operators & RANGE_OPERATORS:
+                ranges.append(field)
+        else:
+            equality.append(field)
+    keys = [(field, 1) for field in equality]
+    for field, direction in sort or []:
+        if field not in equality and isinstance(direction, int):
+            keys.append((field, direction))
+    keys += [(field, 1) for field in ranges if field not in dict(keys)]
+    return keys
+
+
+def summarize_explain(explain):
+    """
+    Condenses explain("executionStats") output to what matters for indexing.
+
+    Works for find and aggregate explains, and for both the classic and slot-based
+    (queryPlanner.winningPlan.queryPlan) plan layouts. Rejected plans are ignored.
+    """
+    stages, indexes = [], []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, item in node.items():
+                if key in ('rejectedPlans', 'allPlansExecution', 'executionStages', 'slotBasedPlan'):
+                    continue
+                if key == 'stage' and isinstance(item, str):
+                    stages.append(item)
+                elif key == 'indexName' and isinstance(item, str) and item not in indexes:
+                    indexes.append(item)
+                else:
+                    walk(item)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(explain.get('queryPlanner') or explain.get('stages') or explain)
+    stats = explain.get('executionStats', {})
+    if not stats:
+        # Aggregations nest the query stage's stats under the first $cursor stage
+        for stage in explain.get('stages', []):
+            if '$cursor' in stage:
+                stats = stage['$cursor'].get('executionStats', {})
+                break
+    return {
+        'stages': stages,
+        'indexes': indexes,
+        'collscan': 'COLLSCAN' in stages,
+        'in_memory_sort': 'SORT' in stages,
+        'returned': stats.get('nReturned'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'execution_ms': stats.get('executionTimeMillis'),
+    }
+
+
+def _to_json(value):
+    # Shapes and summaries are plain, but sort specs may contain {'$meta': ..} dicts and tuples
+    return json.dumps(value, default=str, sort_keys=True)
+
+
+def _claim_explain(shape_key):
+    """True if an explain of this shape may run now (rate limit per shape, one at a time)."""
+    now = time.monotonic()
+    with _lock:
+        last = _last_explained.get(shape_key)
+        if last is not None and now - last < _settings['explain_interval']:
+            _counts['explain_skipped'] += 1
+            return False
+        if not _explaining.acquire(blocking=False):
+            _counts['explain_skipped'] += 1
+            return False
+        _last_explained[shape_key] = now
+        _last_explained.move_to_end(shape_key)
+        while len(_last_explained) > 1000:
+            _last_explained.popitem(last=False)
+        return True
+
+
+def _explain(collection, command, entry):
+    """Runs the explain command and attaches its summary to the recorded entry (background thread)."""
+    try:
+        result = collection.database.command('explain', command, verbosity='executionStats')
+        summary = summarize_explain(result)
+        with _lock:
+            entry['explain'] = summary
+            _counts['explained'] += 1
+        message = (f"Explain of slow {entry['operation']} on '{entry['collection']}' ({entry['source']}): "
+                   f"stages={summary['stages']} indexes={summary['indexes']} "
+                   f"keys_examined={summary['keys_examined']} docs_examined={summary['docs_examined']} "
+                   f"returned={summary['returned']}")
+        if summary['collscan'] or summary['in_memory_sort']:
+            problem = 'COLLSCAN' if summary['collscan'] else 'in-memory SORT'
+            log.warning(f"{message}. {problem}: consider an index on {entry.get('suggested_index') or '(no suggestion)'} "
+                        f"in initialize_database.")
+        else:
+            log.info(message)
+    except Exception as e:
+        with _lock:
+            entry['explain_error'] = str(e)
+            _counts['explain_errors'] += 1
+        log.error(f"Could not explain slow {entry['operation']} on '{entry['collection']}': {e}")
+    finally:
+        _explaining.release()
+
+
+def record(collection, operation, command, duration, source=None, query=None, sort=None):
+    """
+    Records a query that took 'duration' seconds if it was over the threshold.
+
+    Args:
+        collection: The PyMongo collection queried.
+        operation (str): 'find' or 'aggregate'.
+        command (dict): The equivalent database command, used for explain().
+        duration (float): Seconds, including fetching all results.
+        source (str, optional): The model method that ran the query.
+        query (dict, optional): The find filter (or the aggregate pipeline).
+        sort (list, optional): The find sort.
+    """
+    if not _settings['enabled'] or duration < _settings['threshold']:
+        return
+    shape = query_shape(query or {})
+    entry = {
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+        'collection': collection.name,
+        'operation': operation,
+        'source': source,
+        'shape': shape,
+        'sort': [list(key) for key in sort] if sort else None,
+        'duration_ms': round(duration * 1000, 1),
+    }
+    if operation == 'find':
+        suggestion = suggest_index(query, sort)
+        entry['suggested_index'] = suggestion or None
+    with _lock:
+        _counts['slow'] += 1
+        _recent.append(entry)
+    log.warning("Slow %s on '%s' (%s) took %s ms: filter=%s sort=%s", operation, collection.name, source or 'unknown',
+                entry['duration_ms'], _to_json(shape), _to_json(entry['sort']))
+
+    if _settings['explain']:
+        if operation == 'aggregate' and any(('$out' in stage or '$merge' in stage) for stage in command['pipeline']):
+            return # Writing pipelines cannot be explained with executionStats
+        shape_key = (collection.full_name, operation, _to_json(shape), _to_json(entry['sort']))
+        if _claim_explain(shape_key):
+            threading.Thread(target=_explain, args=(collection, command, entry),
+                             name='slow-query-explain', daemon=True).start()
+
+
+def find(collection, query, projection=None, sort=None, limit=0, source=None, **kwargs):
+    """
+    Runs collection.find() and returns all matching documents as a list, recording the
+    query if it was slow.
+
+    Args:
+        collection: The PyMongo collection.
+        query (dict): Filter.
+        projection (dict, optional), sort (list of (field, direction), optional), limit (int, optional).
+        source (str, optional): The calling model method, shown in the slow query log.
+        **kwargs: Passed on to collection.find().
+
+    Returns:
+        list: The documents.
+    """
+    started = time.perf_counter()
+    cursor = collection.find(query, projection, **kwargs)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    docs = list(cursor)
+    duration = time.perf_counter() - started
+    if _settings['enabled'] and duration >= _settings['threshold']:
+        command = {'find': collection.name, 'filter': query}
+        if projection:
+            command['projection'] = projection
+        if sort:
+            command['sort'] = dict(sort)
+        if limit:
+            command['limit'] = limit
+        record(collection, 'find', command, duration, source=source, query=query, sort=sort)
+    return docs
+
+
+def aggregate(collection, pipeline, source=None, **kwargs):
+    """
+    Runs collection.aggregate() and returns all results as a list, recording the
+    pipeline if it was slow.
+    """
+    started = time.perf_counter()
+    docs = list(collection.aggregate(pipeline, **kwargs))
+    duration = time.perf_counter() - started
+    if _settings['enabled'] and duration >= _settings['threshold']:
+        command = {'aggregate': collection.name, 'pipeline': pipeline, 'cursor': {}}
+        record(collection, 'aggregate', command, duration, source=source, query=pipeline)
+    return docs
+
+
+def recent():
+    """The most recent slow queries of this process (newest first) with their explain summaries."""
+    with _lock:
+        return [dict(entry) for entry in reversed(_recent)]
+
+
+def stats():
+    """Counters of slow queries and explains in this process."""
+    with _lock:
+        return dict(_counts, threshold_ms=_settings['threshold'] * 1000, enabled=_settings['enabled'])
@@ -32,4 +32,4 @@ def calculate_age(birth_date):
 # - Password strength checker
 # - Slugify function for generating URL-friendly strings
 # - Currency formatting
-# - Function to calculate leave duration (considering weekends/holidays)
\ No newline at end of file
+# (Leave duration considering weekends/holidays lives in hrms/leave_duration.py)
\ No newline at end of file
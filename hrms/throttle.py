@@ -0,0 +1,178 @@
+# hrms/throttle.py
+
+"""
+Login throttling.
+
+Every login attempt takes a token from two limits - one per username, one per
+client IP - before the user lookup and password check run, so a credential-stuffing
+burst is turned away at the cost of a dictionary (or one MongoDB) lookup instead
+of a bcrypt verification.
+
+Backends:
+    'memory' - token buckets in this process (default; limits are per worker process)
+    'mongo'  - sliding-window counters in the 'login_throttle' collection, shared by all
+               workers and hosts
+    'package.module:Class' - any class with the same hit()/reset() methods
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from werkzeug.utils import import_string
+import logging
+
+# Get a logger instance specifically for this module
+log = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Per-process token buckets: 'limit' tokens, refilled evenly over 'window' seconds."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict() # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """
+        Takes one token from key's bucket.
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        now = time.monotonic()
+        rate = limit / window
+        with self._lock:
+            tokens, last = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class MongoBackend:
+    """
+    Sliding-window counters shared through MongoDB: one document per key and fixed window,
+    expired by the TTL index on 'expires_at'. The count over the last 'window' seconds is
+    estimated as current + previous x (unelapsed share of the previous window).
+    """
+
+    def __init__(self, collection_name='login_throttle'):
+        self.collection_name = collection_name
+
+    def _collection(self):
+        from . import get_db # Imported late: hrms/__init__ imports this module's users
+        return get_db()[self.collection_name]
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        window_start = int(now // window) * window
+        collection = self._collection()
+        current = collection.find_one_and_update(
+            {'_id': f'{key}:{window_start}'},
+            {'$inc': {'count': 1},
+             '$setOnInsert': {'expires_at': datetime.utcfromtimestamp(window_start) + timedelta(seconds=2 * window)}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        previous = collection.find_one({'_id': f'{key}:{window_start - window}'}, {'count': 1}) or {}
+        weight = 1 - (now - window_start) / window
+        estimate = current['count'] + previous.get('count', 0) * weight
+        if estimate <= limit:
+            return True, 0.0
+        return False, window_start + window - now
+
+    def reset(self, key):
+        self._collection().delete_many({'_id': {'$regex': f'^{re.escape(key)}:'}})
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'mongo': MongoBackend,
+}
+
+# Settings, replaced from Config by configure() in create_app
+_settings = {
+    'enabled': True,
+    'username_limit': 10,
+    'username_window': 300,
+    'ip_limit': 50,
+    'ip_window': 60,
+}
+_state = {'backend': MemoryBackend()}
+_metrics_lock = threading.Lock()
+_metrics = {'attempts': 0, 'throttled_username': 0, 'throttled_ip': 0, 'backend_errors': 0}
+
+
+def configure(enabled=True, backend='memory', username_limit=10, username_window=300, ip_limit=50, ip_window=60):
+    """Applies configuration and creates the backend ('memory', 'mongo' or a 'module:Class' path)."""
+    cls = BACKENDS.get(backend) or import_string(backend)
+    _state['backend'] = cls()
+    _settings.update(enabled=enabled, username_limit=username_limit, username_window=username_window,
+                     ip_limit=ip_limit, ip_window=ip_window)
+
+
+def _count(name):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def check_login(username, ip):
+    """
+    Records a login attempt and decides whether it may proceed.
+
+    The IP limit is checked first so a single client spraying many usernames doesn't also
+    use up those users' own allowances. If the backend fails, the attempt is allowed.
+
+    Returns:
+        tuple: (allowed, retry_after_seconds)
+    """
+    if not _settings['enabled']:
+        return True, 0.0
+    _count('attempts')
+    backend = _state['backend']
+    try:
+        if ip:
+            allowed, retry_after = backend.hit(f'ip:{ip}', _settings['ip_limit'], _settings['ip_window'])
+            if not allowed:
+                _count('throttled_ip')
+                return False, retry_after
+        if username:
+            allowed, retry_after = backend.hit(f'user:{username.strip().lower()}',
+                                               _settings['username_limit'], _settings['username_window'])
+            if not allowed:
+                _count('throttled_username')
+                return False, retry_after
+    except Exception as e:
+        # Fail open: a broken shared backend must not lock everyone out
+        _count('backend_errors')
+        log.error("Login throttle backend error: %s", e)
+    return True, 0.0
+
+
+def reset_username(username):
+    """Clears a username's limit after a successful login."""
+    if not _settings['enabled'] or not username:
+        return
+    try:
+        _state['backend'].reset(f'user:{username.strip().lower()}')
+    except Exception as e:
+        _count('backend_errors')
+        log.error("Login throttle backend error: %s", e)
+
+
+def stats():
+    """Counters of login attempts seen and rejected by this process."""
+    with _metrics_lock:
+        return dict(_metrics, backend=type(_state['backend']).__name__, enabled=_settings['enabled'])
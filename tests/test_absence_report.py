@@ -0,0 +1,67 @@
+# tests/test_absence_report.py
+
+"""Rollup refreshes end in $merge, which mongomock does not implement: these tests need a real MongoDB."""
+
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from hrms.models.absence_report import AbsenceReport
+
+pytestmark = pytest.mark.mongodb
+
+MONTH = '2031-03'
+
+
+@pytest.fixture
+def approved(db):
+    """One approved request of 3 working days in MONTH."""
+    return db.leave_requests.insert_one({
+        'user_id': ObjectId(), 'leave_type': 'Annual', 'status': 'Approved', 'department': 'Engineering',
+        'start_date': datetime(2031, 3, 3), 'end_date': datetime(2031, 3, 5), 'days_by_month': {MONTH: 3},
+    }).inserted_id
+
+
+def _merge(db, refreshed_on):
+    db.leave_requests.aggregate(AbsenceReport.rollup_pipeline([MONTH], ObjectId(), 366, refreshed_on))
+
+
+def _rows(db):
+    return list(db.absence_rollups.find({'month': MONTH}))
+
+
+def test_older_refresh_does_not_replace_rows_of_a_newer_one(db, approved):
+    started = datetime(2031, 4, 1, 12, 0, 0)
+    _merge(db, started)
+    db.leave_requests.update_one({'_id': approved}, {'$set': {'days_by_month': {MONTH: 2}}})
+
+    _merge(db, started - timedelta(seconds=5)) # Started earlier, finished later: must not win
+    [row] = _rows(db)
+    assert (row['days'], row['refreshed_on']) == (3, started)
+
+    _merge(db, started + timedelta(seconds=5))
+    [row] = _rows(db)
+    assert (row['days'], row['refreshed_on']) == (2, started + timedelta(seconds=5))
+
+
+def test_refresh_removes_groups_without_approved_leave(db, approved):
+    assert AbsenceReport.refresh([MONTH]) == 1
+    db.leave_requests.update_one({'_id': approved}, {'$set': {'status': 'Cancelled'}})
+    assert AbsenceReport.refresh([MONTH]) == 0
+    assert _rows(db) == []
+
+
+def test_refresh_keeps_rows_written_by_a_later_refresh(db, approved):
+    later = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+    db.absence_rollups.insert_one({'_id': {'department': 'Sales', 'month': MONTH, 'leave_type': 'Annual'},
+                                   'department': 'Sales', 'month': MONTH, 'leave_type': 'Annual',
+                                   'days': 1, 'requests': 1, 'employees': 1, 'refreshed_on': later})
+    AbsenceReport.refresh([MONTH])
+    assert {row['department'] for row in _rows(db)} == {'Engineering', 'Sales'}
+
+
+def test_refresh_dirty_refreshes_and_clears_queued_months(db, approved):
+    AbsenceReport.mark_dirty([db.leave_requests.find_one({'_id': approved})])
+    assert AbsenceReport.refresh_dirty() == 1
+    assert db.absence_rollup_dirty.count_documents({}) == 0
+    [row] = _rows(db)
+    assert (row['department'], row['days'], row['requests'], row['employees']) == ('Engineering', 3, 1, 1)
@@ -0,0 +1,115 @@
+# tests/test_bulk_decide.py
+
+from datetime import datetime
+from unittest import mock
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from hrms.models.leave import LeaveRequest
+from hrms.models.leave_balance import LeaveBalance
+
+ENTITLEMENTS = {'Annual': 20, 'Sick': 10}
+
+
+class InterceptedCollection:
+    """Wraps a collection, running a hook in place of (or before) its first bulk_write."""
+
+    def __init__(self, collection, hook):
+        self._collection = collection
+        self._hook = hook
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def bulk_write(self, ops, **kwargs):
+        hook, self._hook = self._hook, None
+        if hook:
+            return hook(self._collection, ops, **kwargs)
+        return self._collection.bulk_write(ops, **kwargs)
+
+
+@pytest.fixture
+def requester(db):
+    return db.users.insert_one({'username': 'requester', 'email': 'requester@example.com'}).inserted_id
+
+
+@pytest.fixture
+def pending(db, requester):
+    """Three pending requests: two Annual (5 days in total) and one Sick (1 day)."""
+    return [LeaveRequest.create({'user_id': requester, 'leave_type': leave_type, 'start_date': start,
+                                 'end_date': end, 'reason': 'Holiday'}, ENTITLEMENTS)
+            for leave_type, start, end in [('Annual', datetime(2031, 1, 6), datetime(2031, 1, 7)),
+                                           ('Annual', datetime(2031, 1, 13), datetime(2031, 1, 15)),
+                                           ('Sick', datetime(2031, 3, 3), datetime(2031, 3, 3))]]
+
+
+def _ledgers(db):
+    return {doc['leave_type']: (doc.get('pending', 0), doc.get('used', 0)) for doc in db.leave_balances.find()}
+
+
+def test_decides_pending_requests_and_reports_the_rest(db, pending):
+    missing, invalid = str(ObjectId()), 'not-an-id'
+    LeaveRequest.cancel(pending[2], db.leave_requests.find_one({'_id': ObjectId(pending[2])})['user_id'])
+    results = LeaveRequest.bulk_decide(pending + [missing, invalid], 'Approved', ObjectId())
+    assert results == {pending[0]: 'ok', pending[1]: 'ok', pending[2]: 'not_pending',
+                       missing: 'not_found', invalid: 'invalid_id'}
+    assert _ledgers(db) == {'Annual': (0, 5), 'Sick': (0, 0)}
+
+
+def test_managers_only_decide_requests_routed_to_them(db, pending):
+    results = LeaveRequest.bulk_decide(pending[:1], 'Approved', ObjectId(), manager_id=ObjectId())
+    assert results == {pending[0]: 'not_permitted'}
+    assert db.leave_requests.find_one({'_id': ObjectId(pending[0])})['status'] == 'Pending'
+
+
+def test_request_decided_concurrently_is_not_applied_twice(db, pending):
+    def concurrent_cancel(collection, ops, **kwargs):
+        # Another user cancels the first request between the candidate read and the bulk write
+        collection.update_one({'_id': ObjectId(pending[0])}, {'$set': {'status': 'Cancelled'}})
+        return collection.bulk_write(ops, **kwargs)
+
+    collection = LeaveRequest.get_collection()
+    with mock.patch.object(LeaveRequest, 'get_collection', return_value=InterceptedCollection(collection, concurrent_cancel)):
+        results = LeaveRequest.bulk_decide(pending, 'Approved', ObjectId())
+    assert results == {pending[0]: 'not_pending', pending[1]: 'ok', pending[2]: 'ok'}
+    assert db.leave_requests.find_one({'_id': ObjectId(pending[0])})['status'] == 'Cancelled'
+    # Only the two requests this call approved moved to 'used' (the cancel's own release is not simulated)
+    assert _ledgers(db) == {'Annual': (2, 3), 'Sick': (0, 1)}
+
+
+def test_ledger_failure_puts_the_requests_back_to_pending(db, pending):
+    with mock.patch.object(LeaveBalance, 'apply_transitions', side_effect=RuntimeError('ledger unavailable')):
+        results = LeaveRequest.bulk_decide(pending, 'Approved', ObjectId(), comments='Enjoy')
+    assert results == dict.fromkeys(pending, 'failed')
+    for doc in db.leave_requests.find():
+        assert doc['status'] == 'Pending'
+        assert not {'approved_on', 'approved_by', 'decision_id', 'comments'} & set(doc)
+    assert _ledgers(db) == {'Annual': (5, 0), 'Sick': (1, 0)}
+    assert LeaveRequest.bulk_decide(pending, 'Approved', ObjectId()) == dict.fromkeys(pending, 'ok')
+
+
+def test_partial_ledger_failure_is_reversed(db, pending):
+    def fail_second_ledger(collection, ops, **kwargs):
+        collection.bulk_write(ops[:1], **kwargs)
+        raise BulkWriteError({'writeErrors': [{'index': i, 'code': 1, 'errmsg': 'failed'} for i in range(1, len(ops))]})
+
+    collection = LeaveBalance.get_collection()
+    with mock.patch.object(LeaveBalance, 'get_collection', return_value=InterceptedCollection(collection, fail_second_ledger)):
+        results = LeaveRequest.bulk_decide(pending, 'Approved', ObjectId())
+    assert results == dict.fromkeys(pending, 'failed')
+    assert _ledgers(db) == {'Annual': (5, 0), 'Sick': (1, 0)}
+    assert db.leave_requests.count_documents({'status': 'Pending'}) == 3
+
+
+@pytest.mark.parametrize('payload', [
+    {'request_ids': 'abc', 'decision': 'approve'},
+    {'request_ids': [1, 2], 'decision': 'approve'},
+    {'request_ids': ['abc'], 'decision': ['approve']},
+    {'request_ids': ['abc'], 'decision': 'approve', 'comments': {'$set': 1}},
+    ['abc'],
+])
+def test_bulk_decision_rejects_malformed_json(login, payload):
+    client, _ = login('hr')
+    response = client.post('/leave/bulk-decision', json=payload)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,91 @@
+# tests/test_leave_balance.py
+
+from datetime import datetime
+from unittest import mock
+import pytest
+from bson import ObjectId
+from hrms.models.leave import LeaveRequest
+from hrms.models.leave_balance import InsufficientBalance, LeaveBalance
+
+ENTITLEMENTS = {'Annual': 10, 'Unpaid': None}
+
+
+@pytest.fixture
+def requester(db):
+    return db.users.insert_one({'username': 'requester', 'email': 'requester@example.com'}).inserted_id
+
+
+def _request(user_id, start, end, leave_type='Annual'):
+    """A request from start to end (both datetimes, in 2031 where every weekday is a working day)."""
+    return LeaveRequest.create({'user_id': user_id, 'leave_type': leave_type, 'start_date': start,
+                                'end_date': end, 'reason': 'Holiday'}, ENTITLEMENTS)
+
+
+def _ledger(db, user_id, year):
+    doc = db.leave_balances.find_one({'user_id': user_id, 'year': year, 'leave_type': 'Annual'}) or {}
+    return doc.get('pending', 0), doc.get('used', 0)
+
+
+def test_create_reserves_pending_days(db, requester):
+    _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 10))
+    assert _ledger(db, requester, 2031) == (5, 0)
+
+
+def test_create_refuses_to_overdraw_and_stores_nothing(db, requester):
+    _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 17))
+    with pytest.raises(InsufficientBalance):
+        _request(requester, datetime(2031, 1, 20), datetime(2031, 1, 20))
+    assert _ledger(db, requester, 2031) == (10, 0)
+    assert db.leave_requests.count_documents({}) == 1
+
+
+def test_failed_reservation_releases_earlier_years(db, requester):
+    _request(requester, datetime(2032, 1, 5), datetime(2032, 1, 16)) # Uses up 2032
+    with pytest.raises(InsufficientBalance):
+        _request(requester, datetime(2031, 12, 29), datetime(2032, 1, 2)) # 3 days in 2031, 2 in 2032
+    assert _ledger(db, requester, 2031) == (0, 0)
+    assert _ledger(db, requester, 2032) == (10, 0)
+
+
+def test_unlimited_leave_types_are_not_checked(db, requester):
+    _request(requester, datetime(2031, 1, 6), datetime(2031, 3, 28), leave_type='Unpaid')
+    assert db.leave_requests.count_documents({'leave_type': 'Unpaid'}) == 1
+
+
+def test_approve_moves_days_from_pending_to_used(db, requester):
+    request_id = _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 10))
+    assert LeaveRequest.update_status(request_id, 'Approved', requester, from_statuses=['Pending'])
+    assert _ledger(db, requester, 2031) == (0, 5)
+
+
+def test_cancelled_request_cannot_be_approved(db, requester):
+    request_id = _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 10))
+    assert LeaveRequest.cancel(request_id, requester)
+    assert not LeaveRequest.update_status(request_id, 'Approved', requester, from_statuses=['Pending'])
+    assert _ledger(db, requester, 2031) == (0, 0)
+
+
+def test_ledger_failure_restores_the_request(db, requester):
+    request_id = _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 10))
+    with mock.patch.object(LeaveBalance, 'apply_transition', side_effect=RuntimeError('ledger unavailable')):
+        assert not LeaveRequest.update_status(request_id, 'Approved', requester, from_statuses=['Pending'])
+    doc = db.leave_requests.find_one({'_id': ObjectId(request_id)})
+    assert doc['status'] == 'Pending'
+    assert 'approved_on' not in doc and 'approved_by' not in doc
+    assert _ledger(db, requester, 2031) == (5, 0)
+    # The request can still be decided once the ledger is back
+    assert LeaveRequest.update_status(request_id, 'Approved', requester, from_statuses=['Pending'])
+    assert _ledger(db, requester, 2031) == (0, 5)
+
+
+def test_cancel_keeps_who_approved(db, requester):
+    approver = ObjectId()
+    request_id = _request(requester, datetime(2031, 1, 6), datetime(2031, 1, 10))
+    LeaveRequest.update_status(request_id, 'Approved', approver, from_statuses=['Pending'])
+    approved = db.leave_requests.find_one({'_id': ObjectId(request_id)})
+    assert LeaveRequest.cancel(request_id, requester)
+    doc = db.leave_requests.find_one({'_id': ObjectId(request_id)})
+    assert doc['status'] == 'Cancelled'
+    assert (doc['approved_by'], doc['approved_on']) == (approver, approved['approved_on'])
+    assert doc['cancelled_by'] == requester
+    assert _ledger(db, requester, 2031) == (0, 0)
@@ -0,0 +1,82 @@
+# tests/test_pagination.py
+
+import base64
+import json
+import pytest
+from bson import ObjectId
+from hrms.models.employee import Employee
+from hrms.models.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def _cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+@pytest.fixture
+def employees(db):
+    """Employees whose last names include null and missing values, which sort first."""
+    docs = [{'first_name': f'F{i}', 'last_name': name}
+            for i, name in enumerate(['Smith', None, 'Adams', 'Smith', None, 'Brown', 'Zhang'])]
+    docs += [{'first_name': 'NoLast'}, {'first_name': 'NoLastEither'}]
+    db.employees.insert_many(docs)
+    return db.employees
+
+
+def _sort_key(doc):
+    return (doc.get('last_name') is not None, doc.get('last_name') or '', doc.get('first_name'), doc['_id'])
+
+
+def test_pages_forward_cover_every_employee_once_in_order(employees):
+    expected = [doc['_id'] for doc in sorted(employees.find(), key=_sort_key)]
+    seen, after = [], None
+    while True:
+        page = Employee.find_page(page_size=2, after=after)
+        seen += [doc['_id'] for doc in page['items']]
+        after = page['next_cursor']
+        if not after:
+            break
+    assert seen == expected
+
+
+def test_pages_backward_mirror_pages_forward(employees):
+    forward, after = [], None
+    while True:
+        page = Employee.find_page(page_size=2, after=after)
+        forward.append([doc['_id'] for doc in page['items']])
+        if not page['next_cursor']:
+            break
+        after = page['next_cursor']
+
+    backward, before = [forward[-1]], Employee.find_page(page_size=2, after=after)['prev_cursor']
+    while before:
+        page = Employee.find_page(page_size=2, before=before)
+        backward.insert(0, [doc['_id'] for doc in page['items']])
+        before = page['prev_cursor']
+    assert backward == forward
+
+
+def test_cursor_round_trips_tagged_values():
+    doc = {'last_name': 'Smith', 'first_name': None, '_id': ObjectId()}
+    keys = ['last_name', 'first_name', '_id']
+    assert decode_cursor(encode_cursor(doc, keys), keys) == ['Smith', None, doc['_id']]
+
+
+@pytest.mark.parametrize('value', [
+    {'$ne': None},
+    {'$regex': '.*'},
+    {'$oid': '0' * 24, '$ne': None},
+    {'$oid': 5},
+    ['Smith'],
+])
+def test_tampered_cursor_values_are_rejected(value):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor([value, 'F0', {'$oid': '0' * 24}]), ['last_name', 'first_name', '_id'])
+
+
+def test_tampered_cursor_falls_back_to_the_first_page(employees, login):
+    client, _ = login('hr')
+    response = client.get('/employees/', query_string={
+        'after': _cursor([{'$ne': None}, {'$ne': None}, {'$oid': '0' * 24}])})
+    assert response.status_code == 302
+    assert 'after' not in response.headers['Location']
+    assert client.get(response.headers['Location']).status_code == 200
@@ -0,0 +1,7 @@
+# wsgi.py
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# (run.py starts Flask's development server and is for local development only)
+
+from hrms import create_app
+
+app = create_app()